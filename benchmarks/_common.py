@@ -0,0 +1,92 @@
+'''Shared helpers to run benchmarks against a temporary leantask project.
+
+Run the benchmarks from the repository root, e.g. `python benchmarks/bench_dag.py`.
+'''
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+def setup_project() -> Path:
+    '''Create a temporary project and make it the current leantask project.
+
+    It should be called before anything from leantask is imported.
+    '''
+    if 'leantask' in sys.modules:
+        raise RuntimeError('Benchmark project should be set up before importing leantask.')
+
+    project_dir = Path(tempfile.mkdtemp(prefix='leantask_bench_')).resolve()
+    os.chdir(project_dir)
+    sys.path.insert(0, str(ROOT_DIR))
+
+    from leantask.cli.main.init import create_metadata_database
+    from leantask.context import GlobalContext
+
+    GlobalContext.metadata_dir().mkdir(parents=True, exist_ok=True)
+    create_metadata_database(project_name='benchmark')
+    return project_dir
+
+
+def load_flow(project_dir: Path, name: str, source: str):
+    '''Write the flow source to the project and import its flow.'''
+    from leantask.flow.context import FlowContext
+    from leantask.utils.script import import_lib
+
+    flow_path = project_dir / f'{name}.py'
+    flow_path.write_text(source)
+
+    FlowContext.__defined__ = None
+    import_lib(name, flow_path)
+    return FlowContext.__defined__
+
+
+def layered_dag_source(
+        name: str,
+        layers: int,
+        width: int,
+        fan_in: int
+    ) -> str:
+    '''Source of a flow with layers of tasks where each task requires
+    'fan_in' tasks from its previous layer.
+    '''
+    return (
+        'from leantask import Flow, python_task\n'
+        '\n'
+        '\n'
+        '@python_task\n'
+        'def noop():\n'
+        '    pass\n'
+        '\n'
+        '\n'
+        f"with Flow('{name}') as flow:\n"
+        '    previous_layer = []\n'
+        f'    for layer in range({layers}):\n'
+        '        current_layer = []\n'
+        f'        for i in range({width}):\n'
+        "            task = noop(task_name=f'task_{layer}_{i}')\n"
+        f'            for j in range(min({fan_in}, len(previous_layer))):\n'
+        '                task.requires(previous_layer[(i + j) % len(previous_layer)])\n'
+        '            current_layer.append(task)\n'
+        '        previous_layer = current_layer\n'
+    )
+
+
+def measure(func: Callable, repeat: int = 5) -> Tuple[float, float]:
+    '''Return best and mean seconds of calling the function.'''
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return min(durations), sum(durations) / len(durations)
+
+
+def report(label: str, durations: Tuple[float, float]) -> None:
+    best, mean = durations
+    print(f'{label:<48} best {best * 1000:10.3f} ms   mean {mean * 1000:10.3f} ms')
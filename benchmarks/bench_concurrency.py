@@ -0,0 +1,154 @@
+'''Benchmark concurrent writers and readers on the project databases.
+
+Worker processes update their own flow run and insert its log rows, while reader
+processes query the flow runs, similar to flow processes and CLI commands running
+alongside the scheduler. The rollback journal setup is compared with the default WAL setup.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from _common import ROOT_DIR, setup_project
+
+SETUPS = {
+    'rollback journal': {
+        'LEANTASK_DATABASE_JOURNAL_MODE': 'delete',
+        'LEANTASK_DATABASE_SYNCHRONOUS': 'full',
+        'LEANTASK_DATABASE_BUSY_RETRIES': '0'
+    },
+    'wal (default)': {}
+}
+
+
+def run_setup(writers: int) -> None:
+    project_dir = setup_project()
+
+    from leantask.database import FlowModel, FlowRunModel
+    from leantask.enum import FlowRunStatus
+
+    flow_model = FlowModel.create(name='bench', path='bench.py', checksum='0' * 32)
+    flow_run_ids = [
+        FlowRunModel.create(flow=flow_model.id, status=FlowRunStatus.PENDING).id
+        for _ in range(writers)
+    ]
+    print(json.dumps({'project_dir': str(project_dir), 'flow_run_ids': flow_run_ids}))
+
+
+def run_writer(flow_run_id: str, writes: int) -> None:
+    from peewee import OperationalError
+    from leantask.database import FlowRunModel, FlowRunLogModel, database, log_database
+    from leantask.enum import FlowRunStatus
+
+    statuses = list(FlowRunStatus)
+    errors = 0
+    start = time.perf_counter()
+    for i in range(writes):
+        try:
+            with database.atomic():
+                (
+                    FlowRunModel.update(status=statuses[i % len(statuses)])
+                    .where(FlowRunModel.id == flow_run_id)
+                    .execute()
+                )
+            with log_database.atomic():
+                FlowRunLogModel.create(
+                    ref_id=flow_run_id,
+                    ref_flow=flow_run_id,
+                    status=statuses[i % len(statuses)]
+                )
+        except OperationalError:
+            errors += 1
+
+    print(json.dumps({'seconds': time.perf_counter() - start, 'errors': errors}))
+
+
+def run_reader(reads: int) -> None:
+    from peewee import OperationalError
+    from leantask.database import FlowRunModel, set_read_only
+
+    set_read_only()
+
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(reads):
+        try:
+            list(FlowRunModel.select().order_by(FlowRunModel.modified_datetime.desc()).limit(20))
+        except OperationalError:
+            errors += 1
+
+    print(json.dumps({'seconds': time.perf_counter() - start, 'errors': errors}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--reads', type=int, default=500)
+    parser.add_argument('--worker', choices=('setup', 'writer', 'reader'), help=argparse.SUPPRESS)
+    parser.add_argument('--flow-run-id', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == 'setup':
+        run_setup(args.writers)
+        return
+
+    elif args.worker is not None:
+        sys.path.insert(0, str(ROOT_DIR))
+        if args.worker == 'writer':
+            run_writer(args.flow_run_id, args.writes)
+        else:
+            run_reader(args.reads)
+        return
+
+    for label, setup_env in SETUPS.items():
+        env = {**os.environ, **setup_env}
+        setup = json.loads(subprocess.run(
+            [sys.executable, __file__, '--worker', 'setup', '--writers', str(args.writers)],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True
+        ).stdout.strip().splitlines()[-1])
+        project_dir = setup['project_dir']
+        flow_run_ids = setup['flow_run_ids']
+
+        start = time.perf_counter()
+        processes = [
+            subprocess.Popen(
+                [sys.executable, __file__, '--worker', 'writer', '--flow-run-id', flow_run_id,
+                 '--writes', str(args.writes)],
+                cwd=project_dir,
+                env=env,
+                stdout=subprocess.PIPE,
+                text=True
+            )
+            for flow_run_id in flow_run_ids
+        ] + [
+            subprocess.Popen(
+                [sys.executable, __file__, '--worker', 'reader', '--reads', str(args.reads)],
+                cwd=project_dir,
+                env=env,
+                stdout=subprocess.PIPE,
+                text=True
+            )
+            for _ in range(args.readers)
+        ]
+        results = [json.loads(process.communicate()[0].strip().splitlines()[-1]) for process in processes]
+        total_seconds = time.perf_counter() - start
+
+        writer_results = results[:args.writers]
+        reader_results = results[args.writers:]
+        total_writes = args.writers * args.writes
+        print(
+            f'{label:<20} {total_writes / total_seconds:10.1f} writes/s'
+            f"   write errors {sum(result['errors'] for result in writer_results):5d}"
+            f"   read errors {sum(result['errors'] for result in reader_results):5d}"
+            f'   total {total_seconds:6.2f} s'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+'''Benchmark DAG traversals and lookups on a 10k-task layered flow.'''
+import argparse
+
+from _common import layered_dag_source, load_flow, measure, report, setup_project
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--layers', type=int, default=100)
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--fan-in', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    project_dir = setup_project()
+    flow = load_flow(
+        project_dir,
+        'layered_dag',
+        layered_dag_source('layered_dag', args.layers, args.width, args.fan_in)
+    )
+    tasks = flow.tasks_sorted
+    first_layer = [flow.get_task(f'task_0_{i}') for i in range(args.width)]
+    root_task = first_layer[0]
+    print(f'Flow with {len(tasks)} tasks in {args.layers} layers of {args.width} tasks.')
+
+    def build_index():
+        flow.invalidate_dag_index()
+        flow.dag_index.descendants(root_task)
+
+    report('Build DAG index with downstream bitsets', measure(build_index, args.repeat))
+    report(
+        'Iterate downstream of root task (index)',
+        measure(lambda: sum(1 for _ in flow.dag_index.iter_descendants(root_task)), args.repeat)
+    )
+    report(
+        'Iterate downstream of root task (walk)',
+        measure(lambda: sum(1 for _ in root_task.iter_downstream()), args.repeat)
+    )
+    report(
+        f'Iterate downstream of {len(first_layer)} tasks (index)',
+        measure(lambda: [sum(1 for _ in flow.dag_index.iter_descendants(task)) for task in first_layer], args.repeat)
+    )
+    names = [task.name for task in tasks]
+    report(
+        f'Get {len(names)} tasks by name',
+        measure(lambda: [flow.get_task(name) for name in names], args.repeat)
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+'''Benchmark flow run startup on a 2k-task flow.'''
+import argparse
+
+from _common import layered_dag_source, load_flow, measure, report, setup_project
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--layers', type=int, default=20)
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--fan-in', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    project_dir = setup_project()
+    flow = load_flow(
+        project_dir,
+        'flow_run_startup',
+        layered_dag_source('flow_run_startup', args.layers, args.width, args.fan_in)
+    )
+    flow.index()
+    print(f'Flow with {len(flow.tasks)} tasks.')
+
+    from leantask.context import GlobalContext
+    from leantask.enum import FlowRunStatus
+    from leantask.flow import FlowRun
+
+    GlobalContext.LOG_QUIET = True
+
+    def create_flow_run():
+        flow_run = FlowRun(flow, status=FlowRunStatus.PENDING)
+        flow_run.create_task_runs()
+        return flow_run
+
+    report('Create flow run with its task runs', measure(create_flow_run, args.repeat))
+
+    for status_journal in (False, True):
+        GlobalContext.STATUS_JOURNAL = status_journal
+        report(
+            f'Run flow run (status journal: {status_journal})',
+            measure(lambda: create_flow_run().execute(), 1)
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+'''Benchmark memory retained by flow runs, reported per 10k task runs.'''
+import argparse
+import gc
+import tracemalloc
+
+from _common import layered_dag_source, load_flow, setup_project
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--layers', type=int, default=10)
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    project_dir = setup_project()
+    flow = load_flow(
+        project_dir,
+        'memory',
+        layered_dag_source('memory', args.layers, args.width, 2)
+    )
+    flow.index()
+
+    from leantask.enum import FlowRunStatus
+    from leantask.flow import FlowRun
+
+    def create_flow_run():
+        flow_run = FlowRun(flow, status=FlowRunStatus.PENDING)
+        flow_run.create_task_runs()
+
+    # Warm up caches, e.g. loggers and database connection.
+    create_flow_run()
+    gc.collect()
+
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    for _ in range(args.runs):
+        create_flow_run()
+    gc.collect()
+    end_size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_task_runs = args.runs * len(flow.tasks)
+    retained_size = end_size - start_size
+    print(f'Created {args.runs} flow runs with {total_task_runs} task runs in total.')
+    print(f'Retained memory: {retained_size / 1024 ** 2:.2f} MiB'
+          f' ({retained_size / total_task_runs * 10_000 / 1024 ** 2:.2f} MiB per 10k task runs)')
+    print(f'Peak memory: {(peak_size - start_size) / 1024 ** 2:.2f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+'''Benchmark topological sorting of 100k-node graphs.'''
+import argparse
+import sys
+
+from _common import ROOT_DIR, measure, report
+
+sys.path.insert(0, str(ROOT_DIR))
+
+from leantask.utils.tree import DAGIndex, sort_tree_levels  # noqa: E402
+
+
+class Node:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.children = []
+
+
+def layered_nodes(layers: int, width: int, fan_in: int):
+    nodes = []
+    previous_layer = []
+    for layer in range(layers):
+        current_layer = []
+        for i in range(width):
+            node = Node(f'node_{layer}_{i}')
+            for j in range(min(fan_in, len(previous_layer))):
+                previous_layer[(i + j) % len(previous_layer)].children.append(node)
+            current_layer.append(node)
+
+        nodes.extend(current_layer)
+        previous_layer = current_layer
+
+    return nodes
+
+
+def chain_nodes(total: int):
+    nodes = [Node(f'node_{i}') for i in range(total)]
+    for node, child_node in zip(nodes, nodes[1:]):
+        node.children.append(child_node)
+
+    return nodes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--total', type=int, default=100_000)
+    parser.add_argument('--width', type=int, default=1_000)
+    parser.add_argument('--fan-in', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    get_name = lambda node: node.name
+
+    nodes = layered_nodes(args.total // args.width, args.width, args.fan_in)
+    report(
+        f'Sort {len(nodes)} layered nodes into levels',
+        measure(lambda: sort_tree_levels(set(nodes), 'children', key=get_name), args.repeat)
+    )
+    report(
+        f'Build DAG index of {len(nodes)} layered nodes',
+        measure(lambda: DAGIndex(set(nodes), 'children', key_attr='name'), args.repeat)
+    )
+
+    nodes = chain_nodes(args.total)
+    report(
+        f'Sort chain of {len(nodes)} nodes',
+        measure(lambda: sort_tree_levels(set(nodes), 'children', key=get_name), args.repeat)
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import logging
+from array import array
+from leantask import python_task, Flow
+
+
+@python_task(output_array=True)
+def generate_values(size: int, logger: logging.Logger):
+    '''This task output is stored on disk instead of being kept in memory.'''
+    logger.info(f'Generate {size} values.')
+    return {
+        'index': array('q', range(size)),
+        'value': array('d', (i * 0.5 for i in range(size)))
+    }
+
+
+@python_task
+def sum_values(inputs, logger: logging.Logger):
+    '''Inputs are read-only memory-mapped views of the upstream output.'''
+    values = inputs['generate_values'].get()['value'].cast('d')
+    logger.info(f'Sum of values: {sum(values)}')
+
+
+with Flow(
+        'task_array_output',
+        description='Example of using memory-mapped array output between tasks.'
+    ) as flow:
+    task_1 = generate_values(size=1_000_000)
+    task_2 = sum_values()
+
+    task_1 >> task_2
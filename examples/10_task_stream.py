@@ -0,0 +1,34 @@
+import logging
+from leantask import python_task, Flow
+
+
+@python_task
+def read_records(total: int, batch_size: int, logger: logging.Logger):
+    '''Task that yields will stream its output to the downstream task batch by batch.'''
+    for start in range(0, total, batch_size):
+        logger.info(f'Produce records from {start}.')
+        yield [
+            {'id': i, 'value': i * 2}
+            for i in range(start, min(start + batch_size, total))
+        ]
+
+
+@python_task
+def sum_records(inputs, logger: logging.Logger):
+    '''Batches are consumed while the upstream task is still producing them.'''
+    total_value = 0
+    for records in inputs['read_records']:
+        total_value += sum(record['value'] for record in records)
+
+    logger.info(f'Total value: {total_value}')
+    return total_value
+
+
+with Flow(
+        'task_stream',
+        description='Example of streaming output between tasks.'
+    ) as flow:
+    task_1 = read_records(total=10_000, batch_size=1_000)
+    task_2 = sum_records()
+
+    task_1 >> task_2
@@ -0,0 +1,31 @@
+import logging
+from leantask import python_task, Flow
+
+
+@python_task
+def list_files(total: int):
+    return [f'file_{i:04d}.csv' for i in range(total)]
+
+
+@python_task
+def process_file(item: str, logger: logging.Logger):
+    '''Mapped task function is called once for each item of the upstream output.'''
+    logger.debug(f'Process {item}.')
+    return len(item)
+
+
+@python_task
+def summarize(inputs, logger: logging.Logger):
+    sizes = inputs['process_file'].get()
+    logger.info(f'Processed {len(sizes)} file(s) with total size of {sum(sizes)}.')
+
+
+with Flow(
+        'task_map',
+        description='Example of mapping a task over items of upstream output.'
+    ) as flow:
+    task_1 = list_files(total=1_000)
+    task_2 = process_file().map(task_1, batch_size=100, max_workers=4)
+    task_3 = summarize()
+
+    task_2 >> task_3
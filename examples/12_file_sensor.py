@@ -0,0 +1,25 @@
+import logging
+from datetime import timedelta
+from leantask import python_task, FileSensor, Flow
+
+
+@python_task
+def load_sales(inputs, logger: logging.Logger):
+    '''Sensor output is the list of matched files.'''
+    paths = inputs['wait_for_sales'].get()
+    logger.info(f'Load {len(paths)} sales file(s).')
+
+
+with Flow(
+        'file_sensor',
+        description='Example of waiting for files without holding a worker.'
+    ) as flow:
+    task_1 = FileSensor(
+        'wait_for_sales',
+        path='data/sales_*.csv',
+        newer_than=timedelta(days=1),
+        timeout=6 * 60 * 60
+    )
+    task_2 = load_sales()
+
+    task_1 >> task_2
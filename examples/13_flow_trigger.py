@@ -0,0 +1,16 @@
+import logging
+from leantask import python_task, Flow
+
+
+@python_task
+def report(run_params, logger: logging.Logger):
+    '''Flow run params contain the trigger and the id of the upstream flow run.'''
+    logger.info(f"Triggered by '{run_params.get('trigger')}' from run '{run_params.get('trigger_run_id')}'.")
+
+
+with Flow(
+        'flow_trigger',
+        description='Example of running a flow once its upstream flow is done.',
+        triggers=['hello_world']
+    ) as flow:
+    task_1 = report()
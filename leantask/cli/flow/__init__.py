@@ -16,6 +16,8 @@ from .tasks import add_tasks_parser
 if TYPE_CHECKING:
     from ...flow import Flow
 
+READ_ONLY_COMMANDS = ('info', 'status', 'log', 'tasks')
+
 
 def parse_args(
         description: str
@@ -48,6 +50,13 @@ def run_cli(flow: Flow) -> None:
     if 'project_dir' in args and args.project_dir is not None:
         GlobalContext.set_project_dir(Path(args.project_dir).resolve())
 
+    if args.command in READ_ONLY_COMMANDS:
+        from ...database import set_read_only
+        from ...database.archive import attach_archives
+
+        set_read_only()
+        attach_archives(getattr(args, 'run_id', None))
+
     if args.command == 'tasks': 
         command_runners[args.command][args.tasks_command](args, flow)
 
@@ -30,6 +30,7 @@ def show_info(
         [
             ('Name', flow.name),
             ('Description', flow.description),
+            ('Triggers', ', '.join(flow.triggers) if len(flow.triggers) > 0 else None),
         ],
         tablefmt='simple_outline'
     ))
@@ -45,6 +45,7 @@ def show_log(
         flow: Flow
     ) -> None:
     from ...database import FlowRunModel
+    from ...database.common import get_by_short_id
 
     log_dir = (
         GlobalContext.log_dir()
@@ -53,15 +54,7 @@ def show_log(
     )
 
     if args.run_id is not None:
-        try:
-            keyword = args.run_id.replace('.', '') + '*'
-            run_model = (
-                flow._model.flow_runs
-                .where(FlowRunModel.id.like(keyword))
-                .get()
-            )
-        except:
-            raise IndexError(f"No run with id of '{args.run_id}'.")
+        run_model = get_by_short_id(flow._model.flow_runs, FlowRunModel.id, args.run_id)
 
     elif args.datetime is not None:
         try:
@@ -45,6 +45,16 @@ def add_run_arguments(parser: argparse.ArgumentParser) -> None:
         action='store_true',
         help='Rerun failed or canceled run.'
     )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Resume failed or canceled run by only running its unfinished tasks.'
+    )
+    parser.add_argument(
+        '--profile',
+        choices=('cpu', 'mem'),
+        help='Profile each task run with cProfile (cpu) or tracemalloc (mem).'
+    )
     parser.add_argument(
         '--force', '-F',
         action='store_true',
@@ -77,6 +87,7 @@ def run_flow(
     logger.info(f"Run command: {' '.join([quote(sys.executable)] + sys.argv)}")
 
     GlobalContext.LOCAL_RUN = args.local
+    GlobalContext.PROFILE = args.profile
     GlobalContext.SCHEDULER_SESSION_ID = args.scheduler_session_id
 
     if args.run_id is not None:
@@ -84,6 +95,7 @@ def run_flow(
             flow,
             run_id=args.run_id,
             rerun=args.rerun,
+            resume=args.resume,
             force=args.force
         )
 
@@ -139,9 +151,12 @@ def prepare_flow_from_database(
         flow: Flow,
         run_id: str,
         rerun: bool,
-        force: bool
+        force: bool,
+        resume: bool = False
     ):
+    import json
     from ...database import FlowRunModel
+    from ...database.common import get_by_short_id
     from ...flow import FlowRun
 
     if not force and not flow.active:
@@ -149,17 +164,13 @@ def prepare_flow_from_database(
         raise SystemExit(FlowRunStatus.CANCELED.value)
 
     try:
-        keyword = run_id.replace('.', '') + '*'
-        flow_run_model = (
-            FlowRunModel.select()
-            .where(FlowRunModel.id.like(keyword))
-            .order_by(FlowRunModel.created_datetime)
-            .limit(1)
-            [0]
-        )
+        flow_run_model = get_by_short_id(flow._model.flow_runs, FlowRunModel.id, run_id)
     except IndexError:
         logger.error('No run was found.')
         raise SystemExit(FlowRunStatus.UNKNOWN.value)
+    except ValueError as exc:
+        logger.error(str(exc))
+        raise SystemExit(FlowRunStatus.UNKNOWN.value)
 
     if flow.name != flow_run_model.flow.name:
         logger.error(
@@ -177,8 +188,27 @@ def prepare_flow_from_database(
         )
         raise SystemExit(FlowRunStatus.UNKNOWN.value)
 
+    if resume and flow_run_model.status not in (
+            FlowRunStatus.FAILED,
+            FlowRunStatus.FAILED_TIMEOUT_DELAY,
+            FlowRunStatus.FAILED_TIMEOUT_RUN,
+            FlowRunStatus.CANCELED,
+            FlowRunStatus.CANCELED_BY_USER
+        ):
+        logger.error(f"Only failed or canceled run could be resumed, not '{flow_run_model.status.name}'.")
+        raise SystemExit(FlowRunStatus.UNKNOWN.value)
+
     try:
-        if rerun:
+        if resume:
+            logger.debug('Prepare flow run to resume from database.')
+            flow_run = FlowRun(
+                flow,
+                params=json.loads(flow_run_model.params) if flow_run_model.params is not None else None,
+                status=FlowRunStatus.PENDING,
+                schedule_datetime=flow_run_model.schedule_datetime
+            )
+
+        elif rerun:
             logger.debug('Prepare flow run duplicate from database.')
             flow_run = FlowRun(
                 flow,
@@ -193,6 +223,9 @@ def prepare_flow_from_database(
 
         flow_run.create_task_runs()
 
+        if resume:
+            flow_run.resume_task_runs(flow_run_model)
+
     except:
         logger.error('An error occured while preparing flow run.', exc_info=True)
         raise SystemExit(FlowRunStatus.UNKNOWN.value)
@@ -152,7 +152,7 @@ def update_schedule(
             )
 
             if flow_run_model.status in (
-                    FlowRunStatus.CANCELED.name, FlowRunStatus.CANCELED_BY_USER,
+                    FlowRunStatus.CANCELED, FlowRunStatus.CANCELED_BY_USER,
                     FlowRunStatus.DONE, FlowRunStatus.FAILED
                     ):
                 logger.info('There was old schedule that has been executed and has not been removed.')
@@ -163,7 +163,7 @@ def update_schedule(
                 logger.warning(
                     'Flow has been scheduled'
                     + (' by scheduler'
-                        if flow_run_model.status == FlowRunStatus.SCHEDULED.name
+                        if flow_run_model.status == FlowRunStatus.SCHEDULED
                         else ' manually')
                     + ' at '
                     + repr(flow_run_model.schedule_datetime.isoformat(sep=' ', timespec='minutes'))
@@ -175,7 +175,7 @@ def update_schedule(
                 logger.warning(
                     'Flow has been scheduled'
                     + (' by scheduler'
-                        if flow_run_model.status == FlowRunStatus.SCHEDULED.name
+                        if flow_run_model.status == FlowRunStatus.SCHEDULED
                         else ' manually')
                     + ' at '
                     + repr(flow_run_model.schedule_datetime.isoformat(sep=' ', timespec='minutes'))
@@ -185,7 +185,7 @@ def update_schedule(
                 for task_run_model in flow_run_model.task_runs:
                     task_run_model.status = TaskRunStatus.FAILED_TIMEOUT_DELAY
                     task_run_model.save()
-                flow_run_model.status == FlowRunStatus.FAILED_TIMEOUT_DELAY
+                flow_run_model.status = FlowRunStatus.FAILED_TIMEOUT_DELAY
                 flow_run_model.save()
                 flow_schedule_model.delete_instance()
 
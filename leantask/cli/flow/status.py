@@ -7,9 +7,10 @@ from tabulate import tabulate
 from typing import Callable, List, TYPE_CHECKING
 
 from ...enum import FlowRunStatus, TaskRunStatus
+from ...utils.string import align_prefixes
 
 if TYPE_CHECKING:
-    from ...database import FlowRunModel
+    from ...database import FlowRunModel, TaskRunModel
     from ...flow import Flow
 
 
@@ -36,6 +37,11 @@ def add_status_arguments(parser: argparse.ArgumentParser) -> None:
         action='store_true',
         help='Show all task stasuses.'
     )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Show time breakdown of each task run. Only used along with --tasks.'
+    )
     parser.add_argument(
         '--run-id', '-I',
         help='Filter by run id.'
@@ -61,15 +67,10 @@ def show_run_statuses(
         flow: Flow
     ) -> None:
     from ...database import FlowRunModel, TaskRunModel
+    from ...database.common import get_by_short_id, get_short_ids
 
     if args.run_id is not None:
-        keyword = args.run_id.replace('.', '') + '*'
-        flow_run_models = list(
-            flow._model.flow_runs
-            .where(FlowRunModel.id.like(keyword))
-            .order_by(FlowRunModel.modified_datetime.desc())
-            .limit(1)
-        )
+        flow_run_models = [get_by_short_id(flow._model.flow_runs, FlowRunModel.id, args.run_id)]
 
     elif args.datetime is not None:
         schedule_datetime = datetime.fromisoformat(args.datetime)
@@ -84,7 +85,7 @@ def show_run_statuses(
         if hasattr(FlowRunStatus, args.status.upper()):
             flow_run_models: List[FlowRunModel] = list(
                 flow._model.flow_runs
-                .where(FlowRunModel.status == args.status)
+                .where(FlowRunModel.status == FlowRunStatus[args.status.upper()])
                 .order_by(FlowRunModel.modified_datetime.desc())
                 .limit(args.limit)
             )
@@ -103,6 +104,14 @@ def show_run_statuses(
         print('No run history.')
         return
 
+    short_ids = get_short_ids(
+        flow._model.flow_runs,
+        FlowRunModel.id,
+        (model.id for model in flow_run_models)
+    )
+    if not args.tasks:
+        short_ids = align_prefixes(short_ids)
+
     run_statuses = []
     for flow_run_model in flow_run_models:
         schedule_datetime = None
@@ -114,63 +123,82 @@ def show_run_statuses(
             started_datetime = flow_run_model.started_datetime.isoformat(sep=' ', timespec='minutes')
 
         total_time_elapsed = None
-        if flow_run_model.status == FlowRunStatus.DONE.name \
-                or flow_run_model.status.startswith(FlowRunStatus.FAILED.name):
+        if flow_run_model.started_datetime is None:
+            pass
+        elif flow_run_model.status == FlowRunStatus.DONE \
+                or flow_run_model.status.name.startswith(FlowRunStatus.FAILED.name):
             total_time_elapsed = float((flow_run_model.modified_datetime - flow_run_model.started_datetime).seconds)
         elif flow_run_model.started_datetime is not None:
             total_time_elapsed = float((datetime.now() - flow_run_model.started_datetime).seconds)
 
         if args.tasks:
+            task_run_models: List[TaskRunModel] = list(
+                flow_run_model.task_runs
+                .order_by(TaskRunModel.modified_datetime)
+            )
+            # Task runs are looked up within their task, thus unique among all task runs is enough.
+            task_short_ids = align_prefixes({
+                flow_run_model.id: short_ids[flow_run_model.id],
+                **get_short_ids(
+                    TaskRunModel.select(),
+                    TaskRunModel.id,
+                    (model.id for model in task_run_models),
+                    other_ids=[flow_run_model.id]
+                )
+            })
+
             run_statuses.append(OrderedDict({
-                'Short Run Id': flow_run_model.id.split('-')[0],
+                'Short Run Id': task_short_ids[flow_run_model.id],
                 'Run/Schedule Datetime': schedule_datetime,
                 'Execution datetime': started_datetime,
                 'Task Name': '-- Flow --',
                 'Attempt': None,
-                'Status': flow_run_model.status,
+                'Status': flow_run_model.status.name,
                 'Time Elapsed (s)': total_time_elapsed
             }))
+            if args.profile:
+                run_statuses[-1].update(_task_run_profile())
 
-            task_run_models: List[TaskRunModel] = (
-                flow_run_model.task_runs
-                .order_by(TaskRunModel.modified_datetime)
-            )
             for task_run_model in task_run_models:
                 task_started_datetime = None
                 if flow_run_model.started_datetime is not None:
                     task_started_datetime = flow_run_model.started_datetime.isoformat(sep=' ', timespec='minutes')
 
                 task_total_time_elapsed = None
-                if task_run_model.status == TaskRunStatus.DONE.name \
-                        or task_run_model.status.startswith(TaskRunStatus.FAILED.name):
+                if task_run_model.started_datetime is None:
+                    pass
+                elif task_run_model.status == TaskRunStatus.DONE \
+                        or task_run_model.status.name.startswith(TaskRunStatus.FAILED.name):
                     task_total_time_elapsed = float((task_run_model.modified_datetime - task_run_model.started_datetime).seconds)
                 elif task_run_model.started_datetime is not None:
                     task_total_time_elapsed = float((datetime.now() - task_run_model.started_datetime).seconds)
 
                 run_statuses.append(OrderedDict({
-                    'Short Run Id': task_run_model.id.split('-')[0],
+                    'Short Run Id': task_short_ids[task_run_model.id],
                     'Run/Schedule Datetime': None,
                     'Execution datetime': task_started_datetime,
                     'Task Name': task_run_model.task.name,
                     'Attempt': task_run_model.attempt,
-                    'Status': task_run_model.status,
+                    'Status': task_run_model.status.name,
                     'Time Elapsed (s)': task_total_time_elapsed
                 }))
+                if args.profile:
+                    run_statuses[-1].update(_task_run_profile(task_run_model))
 
             print(tabulate(
                 run_statuses,
                 headers='keys',
                 tablefmt='simple_outline',
-                floatfmt='.1f'
+                floatfmt='.3f' if args.profile else '.1f'
             ))
             run_statuses = []
 
         else:
             run_statuses.append(OrderedDict({
-                'Short Run Id': flow_run_model.id.split('-')[0],
+                'Short Run Id': short_ids[flow_run_model.id],
                 'Run/Schedule Datetime': schedule_datetime,
                 'Execution datetime': started_datetime,
-                'Status': flow_run_model.status,
+                'Status': flow_run_model.status.name,
                 'Time Elapsed (s)': total_time_elapsed
             }))
 
@@ -181,3 +209,20 @@ def show_run_statuses(
             tablefmt='simple_outline',
             floatfmt='.1f'
         ))
+
+
+def _task_run_profile(task_run_model: TaskRunModel = None) -> OrderedDict:
+    if task_run_model is None:
+        return OrderedDict({
+            'Queue (s)': None,
+            'Execution (s)': None,
+            'Serialization (s)': None,
+            'Persistence (s)': None
+        })
+
+    return OrderedDict({
+        'Queue (s)': task_run_model.queue_seconds,
+        'Execution (s)': task_run_model.execution_seconds,
+        'Serialization (s)': task_run_model.serialization_seconds,
+        'Persistence (s)': task_run_model.persistence_seconds
+    })
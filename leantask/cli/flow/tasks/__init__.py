@@ -2,6 +2,7 @@ import argparse
 from typing import Callable
 
 from .log import add_log_parser
+from .profile import add_profile_parser
 
 
 def add_tasks_parser(subparsers) -> Callable:
@@ -17,6 +18,7 @@ def add_tasks_parser(subparsers) -> Callable:
     )
 
     command_runners = {
-        'log': add_log_parser(subparsers)
+        'log': add_log_parser(subparsers),
+        'profile': add_profile_parser(subparsers)
     }
     return command_runners
@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import argparse
 from datetime import datetime
+from pathlib import Path
 from typing import Callable, TYPE_CHECKING
 
 from ....context import GlobalContext
 from ....utils.script import display_scrollable_text
 
 if TYPE_CHECKING:
-    from ...flow import Flow
+    from ....database import TaskRunModel
+    from ....flow import Flow, Task
 
 
 def add_log_parser(subparsers) -> Callable:
@@ -54,30 +56,47 @@ def show_task_log(
         args: argparse.Namespace,
         flow: Flow
     ) -> None:
-    from ....database import FlowRunModel, TaskRunModel
-
     task = flow.get_task(args.task_name)
+    task_run_model = get_task_run_model(args, flow, task)
+
+    log_dir = get_task_log_dir(flow, task)
+    log_run_ids = [
+        path.name[:-4]
+        for path in log_dir.iterdir() if path.name.endswith('.log')
+    ]
+    if task_run_model.id not in log_run_ids:
+        raise FileNotFoundError(f"Log of run with id '{task_run_model.id}' is missing in log directory.")
+
+    with open(log_dir / (task_run_model.id + '.log')) as f:
+        log_text = f.read()
+
+    display_scrollable_text(log_text)
+
 
-    log_dir = (
+def get_task_log_dir(flow: Flow, task: Task) -> Path:
+    return (
         GlobalContext.log_dir()
         / 'task_runs'
         / str(flow.id)
         / str(task.id)
     )
 
+
+def get_task_run_model(
+        args: argparse.Namespace,
+        flow: Flow,
+        task: Task
+    ) -> TaskRunModel:
+    '''Find the task run model by the run id, run datetime, or the latest run.'''
+    from ....database import FlowRunModel, TaskRunModel
+    from ....database.common import get_by_short_id
+
     if args.run_id is not None:
-        try:
-            keyword = args.run_id.replace('.', '') + '*'
-            task_run_model = (
-                task._model.task_runs
-                .where(
-                    TaskRunModel.id.like(keyword)
-                    & TaskRunModel.attempt == args.attempt
-                )
-                .get()
-            )
-        except:
-            raise IndexError(f"No run with id of '{args.run_id}'.")
+        task_run_model = get_by_short_id(
+            task._model.task_runs.where(TaskRunModel.attempt == args.attempt),
+            TaskRunModel.id,
+            args.run_id
+        )
 
     elif args.datetime is not None:
         try:
@@ -109,14 +128,4 @@ def show_task_log(
         except:
             raise IndexError('No run history was found.')
 
-    log_run_ids = [
-        path.name[:-4]
-        for path in log_dir.iterdir() if path.name.endswith('.log')
-    ]
-    if task_run_model.id not in log_run_ids:
-        raise FileNotFoundError(f"Log of run with id '{task_run_model.id}' is missing in log directory.")
-
-    with open(log_dir / (task_run_model.id + '.log')) as f:
-        log_text = f.read()
-
-    display_scrollable_text(log_text)
+    return task_run_model
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import argparse
+from typing import Callable, TYPE_CHECKING
+
+from .log import add_task_log_arguments, get_task_log_dir, get_task_run_model
+
+if TYPE_CHECKING:
+    from ....flow import Flow
+
+
+def add_profile_parser(subparsers) -> Callable:
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        'profile',
+        help='Show profile report of a run.',
+        description='Show profile report of a run.'
+    )
+    parser.add_argument(
+        'task_name',
+        help='Task name'
+    )
+    add_task_profile_arguments(parser)
+
+    return show_task_profile
+
+
+def add_task_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    add_task_log_arguments(parser)
+    parser.add_argument(
+        '--limit', '-n',
+        type=int,
+        default=20,
+        help='Max number of functions or allocation sites to show.'
+    )
+    parser.add_argument(
+        '--sort',
+        default='cumulative',
+        help='Sort key of the CPU profile, e.g. cumulative, tottime, calls.'
+    )
+
+
+def show_task_profile(
+        args: argparse.Namespace,
+        flow: Flow
+    ) -> None:
+    from ....utils.profile import read_profile_report
+
+    task = flow.get_task(args.task_name)
+    task_run_model = get_task_run_model(args, flow, task)
+
+    log_dir = get_task_log_dir(flow, task)
+    for suffix in ('.prof', '.mem.txt'):
+        profile_path = log_dir / (task_run_model.id + suffix)
+        if profile_path.exists():
+            break
+    else:
+        raise FileNotFoundError(
+            f"Profile of run with id '{task_run_model.id}' is missing. "
+            "Run the flow with '--profile' to capture it."
+        )
+
+    print(read_profile_report(profile_path, limit=args.limit, sort_by=args.sort))
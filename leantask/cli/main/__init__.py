@@ -4,10 +4,17 @@ from typing import Callable, Dict, Tuple
 from .init import add_init_parser
 from .info import add_info_parser
 from .flows import add_flows_parser
+from .maintenance import add_maintenance_parser
+from .migrate import add_migrate_parser
 from .scheduler import add_scheduler_parser
 from .tasks import add_tasks_parser
 
 
+READ_ONLY_COMMANDS = ('info', 'flows list', 'flows log', 'flows status', 'tasks log', 'tasks profile')
+# Commands which create or migrate the databases themselves, e.g. the scheduler on start.
+UNCHECKED_SCHEMA_COMMANDS = ('init', 'migrate', 'scheduler')
+
+
 def parse_args() -> Tuple[argparse.Namespace, Dict[str, Callable]]:
     parser = argparse.ArgumentParser(
         description='Leantask: Simple and lean workflow scheduler for Python.'
@@ -23,6 +30,8 @@ def parse_args() -> Tuple[argparse.Namespace, Dict[str, Callable]]:
         'info': add_info_parser(subparsers),
         'flows': add_flows_parser(subparsers),
         'tasks': add_tasks_parser(subparsers),
+        'migrate': add_migrate_parser(subparsers),
+        'maintenance': add_maintenance_parser(subparsers),
         'scheduler': add_scheduler_parser(subparsers)
     }
 
@@ -32,6 +41,31 @@ def parse_args() -> Tuple[argparse.Namespace, Dict[str, Callable]]:
 def cli():
     (args, _), command_runners = parse_args()
 
+    command = ' '.join(
+        value for value in (
+            args.command,
+            getattr(args, 'flows_command', None),
+            getattr(args, 'tasks_command', None)
+        )
+        if value is not None
+    )
+    if args.command not in UNCHECKED_SCHEMA_COMMANDS:
+        from ...database.migration import SchemaVersionError, check_schema_version
+        from ...logging import get_local_logger
+
+        try:
+            check_schema_version()
+        except SchemaVersionError as exc:
+            get_local_logger('migrate').error(str(exc))
+            raise SystemExit(1)
+
+    if command in READ_ONLY_COMMANDS:
+        from ...database import set_read_only
+        from ...database.archive import attach_archives
+
+        set_read_only()
+        attach_archives()
+
     if args.command == 'flows': 
         command_runners[args.command][args.flows_command](args)
 
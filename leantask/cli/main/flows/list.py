@@ -4,6 +4,8 @@ from datetime import datetime
 from tabulate import tabulate
 from typing import Callable, List
 
+from ....utils.string import shortest_unique_prefixes
+
 
 def add_list_parser(subparsers) -> Callable:
     parser: argparse.ArgumentParser = subparsers.add_parser(
@@ -16,11 +18,13 @@ def add_list_parser(subparsers) -> Callable:
 
 
 def list_flows(args: argparse.Namespace) -> None:
-    from ....database import FlowModel, FlowRunModel, FlowScheduleModel
-    from ....enum import FlowRunStatus
+    from peewee import JOIN
+    from ....database import FlowModel, FlowStatsModel
+    from ....enum import FlowRunStatus, FINISHED_FLOW_RUN_STATUSES
 
     flow_models: List[FlowModel] = list(
-        FlowModel.select()
+        FlowModel.select(FlowModel, FlowStatsModel)
+        .join(FlowStatsModel, JOIN.LEFT_OUTER, attr='stats')
         .order_by(
             FlowModel.active,
             FlowModel.name,
@@ -28,53 +32,44 @@ def list_flows(args: argparse.Namespace) -> None:
         )
     )
 
+    short_ids = shortest_unique_prefixes(model.id for model in flow_models)
     flow_infos = []
-    for i, model in enumerate(flow_models):
-        try:
-            last_run = (
-                model.flow_runs.select()
-                .where(~FlowRunModel.status.startswith(FlowRunStatus.SCHEDULED.name))
-                .order_by(
-                    FlowRunModel.modified_datetime.desc(),
-                    FlowRunModel.started_datetime.desc(),
-                    FlowRunModel.created_datetime.desc()
-                )
-                .get()
-            )
-            if last_run.status == FlowRunStatus.DONE.name \
-                    or last_run.status.startswith(FlowRunStatus.FAILED.name):
-                total_time_elapsed = (last_run.modified_datetime - last_run.started_datetime).seconds
-                completed_datetime = last_run.modified_datetime.isoformat(sep=' ', timespec='minutes')
-                last_run_status = f"{last_run.status} {total_time_elapsed:d}s ({completed_datetime})"
-
-            elif last_run.status == FlowRunStatus.RUNNING.name:
-                total_time_elapsed = (datetime.now() - last_run.started_datetime).seconds
-                last_run_status = f'{last_run.status} {total_time_elapsed:d}s'
-
-            else:
-                last_run_status = last_run.status
-
-        except:
-            last_run_status = None
-
-        try:
-            next_schedule = (
-                model.flow_schedules.select()
-                .order_by(FlowScheduleModel.schedule_datetime)
-                .get()
-            )
-            next_schedule_datetime = next_schedule.schedule_datetime.isoformat(sep=' ', timespec='minutes')
-
-        except:
-            next_schedule_datetime = None
+    for model in flow_models:
+        stats: FlowStatsModel = getattr(model, 'stats', None)
+        if stats is None:
+            stats = FlowStatsModel()
+
+        last_run_status = None
+        if stats.last_run_status in FINISHED_FLOW_RUN_STATUSES \
+                and stats.last_run_seconds is not None:
+            completed_datetime = stats.last_run_modified_datetime.isoformat(sep=' ', timespec='minutes')
+            last_run_status = f"{stats.last_run_status.name} {int(stats.last_run_seconds):d}s ({completed_datetime})"
+
+        elif stats.last_run_status == FlowRunStatus.RUNNING \
+                and stats.last_run_started_datetime is not None:
+            total_time_elapsed = (datetime.now() - stats.last_run_started_datetime).seconds
+            last_run_status = f'{stats.last_run_status.name} {total_time_elapsed:d}s'
+
+        elif stats.last_run_status is not None:
+            last_run_status = stats.last_run_status.name
+
+        next_schedule_datetime = None
+        if stats.next_schedule_datetime is not None:
+            next_schedule_datetime = stats.next_schedule_datetime.isoformat(sep=' ', timespec='minutes')
+
+        duration_percentiles = None
+        if stats.p50_seconds is not None:
+            duration_percentiles = f'{stats.p50_seconds:.0f}s / {stats.p95_seconds:.0f}s'
 
         flow_infos.append(OrderedDict({
-            'Short Id': model.id.split('-')[0],
+            'Short Id': short_ids[model.id],
             'Name': model.name,
             'Path': model.path,
             'Active': model.active,
-            'Last Status': last_run_status if last_run_status is not None else None,
-            'Next Schedule': next_schedule_datetime if next_schedule_datetime is not None else None,
+            'Last Status': last_run_status,
+            'Next Schedule': next_schedule_datetime,
+            'Success Rate': f'{stats.success_rate:.0%}' if stats.success_rate is not None else None,
+            'Duration p50 / p95': duration_percentiles,
         }))
 
     print('Found', len(flow_models), 'flow(s) in the project.')
@@ -24,6 +24,9 @@ def show_info(args: argparse.Namespace):
         elif metadata.name == 'is_active':
             info.append(('Active', metadata.value))
 
+        elif metadata.name == 'schema_version':
+            info.append(('Schema version', metadata.value))
+
         else:
             info.append((metadata.name, metadata.value))
 
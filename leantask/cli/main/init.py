@@ -5,14 +5,15 @@ from datetime import datetime
 
 from ...context import GlobalContext
 from ...database import (
-    FlowModel, FlowScheduleModel, FlowRunModel,
+    FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel,
     MetadataModel,
-    TaskModel, TaskDownstreamModel, TaskRunModel,
+    TaskModel, TaskDownstreamModel, TaskRunModel, TaskRunBatchModel,
     FlowLogModel, FlowRunLogModel,
     TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel,
     SchedulerSessionModel,
-    database, log_database
+    database, log_database, separate_log_database
 )
+from ...database.migration import LATEST_SCHEMA_VERSION, SCHEMA_VERSION_NAME
 from ...logging import get_local_logger
 from ...utils.string import quote
 
@@ -83,19 +84,21 @@ def init_project(args: argparse.Namespace) -> None:
 def create_metadata_database(project_name: str) -> None:
     try:
         database.create_tables([
-            FlowModel, FlowScheduleModel, FlowRunModel,
-            TaskModel, TaskDownstreamModel, TaskRunModel,
+            FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel,
+            TaskModel, TaskDownstreamModel, TaskRunModel, TaskRunBatchModel,
             MetadataModel
         ])
-        log_database.create_tables([
-            FlowLogModel, FlowRunLogModel,
-            TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel,
-            SchedulerSessionModel
-        ])
+        with separate_log_database():
+            log_database.create_tables([
+                FlowLogModel, FlowRunLogModel,
+                TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel,
+                SchedulerSessionModel
+            ])
 
         project_metadata = {
             'name': project_name,
-            'is_active': True
+            'is_active': True,
+            SCHEMA_VERSION_NAME: LATEST_SCHEMA_VERSION
         }
 
         for name, value in project_metadata.items():
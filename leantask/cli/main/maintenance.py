@@ -0,0 +1,77 @@
+import argparse
+from typing import Callable
+
+
+def add_maintenance_parser(subparsers) -> Callable:
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        'maintenance',
+        help='Prune and archive run history, remove orphaned run files and vacuum the databases.',
+        description='Prune and archive run history, remove orphaned run files and vacuum the databases.'
+    )
+    add_maintenance_arguments(parser)
+
+    return run_maintenance_command
+
+
+def add_maintenance_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        '--flow', '-F',
+        action='append',
+        dest='flow_names',
+        help='Only prune runs of the flow. It can be specified multiple times. Default to all flows.'
+    )
+    parser.add_argument(
+        '--keep-runs', '-n',
+        type=int,
+        help='Number of latest finished runs to keep per flow. Default to LEANTASK_RETENTION_RUNS.'
+    )
+    parser.add_argument(
+        '--keep-days', '-d',
+        type=int,
+        help='Keep finished runs of the last number of days. Default to LEANTASK_RETENTION_DAYS.'
+    )
+    parser.add_argument(
+        '--archive-days', '-a',
+        type=int,
+        help=(
+            'Move finished runs older than the number of days into monthly archives. '
+            'Default to LEANTASK_ARCHIVE_DAYS.'
+        )
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        help='Number of runs deleted per transaction.'
+    )
+    parser.add_argument(
+        '--no-vacuum',
+        action='store_true',
+        help='Skip vacuuming the databases.'
+    )
+
+
+def run_maintenance_command(args: argparse.Namespace) -> None:
+    from ...context import GlobalContext
+    from ...logging import get_local_logger
+    from ...maintenance import run_maintenance
+
+    logger = get_local_logger('maintenance')
+
+    if args.keep_runs is None and args.keep_days is None \
+            and GlobalContext.RETENTION_RUNS is None and GlobalContext.RETENTION_DAYS is None:
+        logger.info('No retention policy is set, thus run history is kept.')
+
+    # Unlike the scheduler, the command may rewrite databases created before incremental vacuum.
+    summary = run_maintenance(
+        flow_names=args.flow_names,
+        keep_runs=args.keep_runs,
+        keep_days=args.keep_days,
+        batch_size=args.batch_size,
+        vacuum=not args.no_vacuum,
+        archive_days=args.archive_days,
+        full_vacuum=True
+    )
+    logger.info(f"Deleted {summary['deleted_runs']} run(s).")
+    logger.info(f"Archived {summary['archived_runs']} run(s).")
+    logger.info(f"Removed {summary['removed_files']} orphaned run file(s).")
+    logger.info('Maintenance has been completed.')
@@ -0,0 +1,26 @@
+import argparse
+from typing import Callable
+
+
+def add_migrate_parser(subparsers) -> Callable:
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        'migrate',
+        help='Upgrade the project databases to the latest schema.',
+        description='Upgrade the project databases to the latest schema.'
+    )
+
+    return migrate_project
+
+
+def migrate_project(args: argparse.Namespace) -> None:
+    from ...database.migration import LATEST_SCHEMA_VERSION, migrate_database
+    from ...logging import get_local_logger
+
+    logger = get_local_logger('migrate')
+    applied_versions = migrate_database()
+    if len(applied_versions) == 0:
+        logger.info(f'Database schema is already at the latest version {LATEST_SCHEMA_VERSION}.')
+        return
+
+    for version in applied_versions:
+        logger.info(f'Database schema has been migrated to version {version}.')
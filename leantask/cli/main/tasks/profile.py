@@ -0,0 +1,31 @@
+import argparse
+from typing import Callable
+
+
+def add_profile_parser(subparsers) -> Callable:
+    from ...flow.tasks.profile import add_task_profile_arguments
+
+    parser: argparse.ArgumentParser = subparsers.add_parser(
+        'profile',
+        help='Show profile report of a run.',
+        description='Show profile report of a run.'
+    )
+    parser.add_argument(
+        'flow_name',
+        help='Flow name'
+    )
+    parser.add_argument(
+        'task_name',
+        help='Task name'
+    )
+    add_task_profile_arguments(parser)
+
+    return show_task_profile
+
+
+def show_task_profile(args: argparse.Namespace) -> None:
+    from ....flow import get_flow
+    from ...flow.tasks.profile import show_task_profile
+
+    flow = get_flow(args.flow_name)
+    show_task_profile(args, flow)
@@ -24,6 +24,8 @@ class GlobalContext:
 
     CACHE_DIRNAME: str = '__cache__'
     LOG_DIRNAME: str = 'log'
+    OUTPUT_DIRNAME: str = 'output'
+    ARCHIVE_DIRNAME: str = 'archive'
 
     DATABASE_NAME: str = os.environ.get('LEANTASK_DATABASE_NAME', 'leantask.db')
     LOG_DATABASE_NAME: str = os.environ.get('LEANTASK_LOG_DATABASE_NAME', 'leantask_log.db')
@@ -38,6 +40,7 @@ class GlobalContext:
         CACHE_TIMEOUT = 1800
 
     LOCAL_RUN: bool = False
+    PROFILE: str = None
     SCHEDULER_SESSION_ID: str = None
 
     try:
@@ -50,6 +53,117 @@ class GlobalContext:
     except:
         HEARTBEAT = 30
 
+    try:
+        SENSOR_POLL_INTERVAL = int(os.environ.get('LEANTASK_SENSOR_POLL_INTERVAL'))
+    except TypeError:
+        SENSOR_POLL_INTERVAL = 60
+
+    try:
+        STREAM_BUFFER_SIZE = int(os.environ.get('LEANTASK_STREAM_BUFFER_SIZE'))
+    except TypeError:
+        STREAM_BUFFER_SIZE = 100
+
+    try:
+        LOG_FLUSH_INTERVAL = float(os.environ.get('LEANTASK_LOG_FLUSH_INTERVAL'))
+    except TypeError:
+        LOG_FLUSH_INTERVAL = 1.0
+
+    try:
+        LOG_BUFFER_SIZE = int(os.environ.get('LEANTASK_LOG_BUFFER_SIZE'))
+    except TypeError:
+        LOG_BUFFER_SIZE = 65536
+
+    try:
+        LOG_MAX_OPEN_FILES = int(os.environ.get('LEANTASK_LOG_MAX_OPEN_FILES'))
+    except TypeError:
+        LOG_MAX_OPEN_FILES = 64
+
+    try:
+        RUN_HISTORY_SIZE = int(os.environ.get('LEANTASK_RUN_HISTORY_SIZE'))
+    except TypeError:
+        RUN_HISTORY_SIZE = 10
+
+    try:
+        FLOW_STATS_WINDOW = int(os.environ.get('LEANTASK_FLOW_STATS_WINDOW'))
+    except TypeError:
+        FLOW_STATS_WINDOW = 100
+
+    STATUS_JOURNAL: bool = os.environ.get('LEANTASK_STATUS_JOURNAL', 'true').lower() == 'true'
+
+    try:
+        STATUS_JOURNAL_INTERVAL = float(os.environ.get('LEANTASK_STATUS_JOURNAL_INTERVAL'))
+    except TypeError:
+        STATUS_JOURNAL_INTERVAL = 0.5
+
+    try:
+        STATUS_JOURNAL_BATCH_SIZE = int(os.environ.get('LEANTASK_STATUS_JOURNAL_BATCH_SIZE'))
+    except TypeError:
+        STATUS_JOURNAL_BATCH_SIZE = 100
+
+    # Commit models and their logs in one transaction over the main connection. A commit is
+    # atomic across both files on a crash only if the journal mode is not 'wal', thus a
+    # rollback journal is used by default and 'wal' is refused.
+    DATABASE_ATTACH_LOG: bool = os.environ.get('LEANTASK_DATABASE_ATTACH_LOG', 'false').lower() == 'true'
+    DATABASE_JOURNAL_MODE: str = os.environ.get(
+        'LEANTASK_DATABASE_JOURNAL_MODE',
+        'delete' if DATABASE_ATTACH_LOG else 'wal'
+    )
+    if DATABASE_ATTACH_LOG and DATABASE_JOURNAL_MODE.lower() == 'wal':
+        raise ValueError(
+            "Attached log database requires a rollback journal mode, e.g. 'delete', not 'wal'."
+        )
+    DATABASE_SYNCHRONOUS: str = os.environ.get('LEANTASK_DATABASE_SYNCHRONOUS', 'normal')
+
+    try:
+        DATABASE_BUSY_TIMEOUT = int(os.environ.get('LEANTASK_DATABASE_BUSY_TIMEOUT'))
+    except TypeError:
+        DATABASE_BUSY_TIMEOUT = 5000
+
+    try:
+        DATABASE_BUSY_RETRIES = int(os.environ.get('LEANTASK_DATABASE_BUSY_RETRIES'))
+    except TypeError:
+        DATABASE_BUSY_RETRIES = 5
+
+    try:
+        DATABASE_CACHE_SIZE = int(os.environ.get('LEANTASK_DATABASE_CACHE_SIZE'))
+    except TypeError:
+        DATABASE_CACHE_SIZE = 8192
+
+    try:
+        DATABASE_MMAP_SIZE = int(os.environ.get('LEANTASK_DATABASE_MMAP_SIZE'))
+    except TypeError:
+        DATABASE_MMAP_SIZE = 67108864
+
+    try:
+        DATABASE_CHECKPOINT_INTERVAL = int(os.environ.get('LEANTASK_DATABASE_CHECKPOINT_INTERVAL'))
+    except TypeError:
+        DATABASE_CHECKPOINT_INTERVAL = 300
+
+    try:
+        RETENTION_RUNS = int(os.environ.get('LEANTASK_RETENTION_RUNS'))
+    except TypeError:
+        RETENTION_RUNS = None
+
+    try:
+        RETENTION_DAYS = int(os.environ.get('LEANTASK_RETENTION_DAYS'))
+    except TypeError:
+        RETENTION_DAYS = None
+
+    try:
+        ARCHIVE_DAYS = int(os.environ.get('LEANTASK_ARCHIVE_DAYS'))
+    except TypeError:
+        ARCHIVE_DAYS = None
+
+    try:
+        MAINTENANCE_INTERVAL = int(os.environ.get('LEANTASK_MAINTENANCE_INTERVAL'))
+    except TypeError:
+        MAINTENANCE_INTERVAL = 0
+
+    try:
+        MAINTENANCE_BATCH_SIZE = int(os.environ.get('LEANTASK_MAINTENANCE_BATCH_SIZE'))
+    except TypeError:
+        MAINTENANCE_BATCH_SIZE = 500
+
     DISCOVER = os.environ.get('LEANTASK_DISCOVER', 'false').lower() == 'true'
 
     @classmethod
@@ -110,10 +224,43 @@ class GlobalContext:
         return log_dir_path
 
     @classmethod
-    def get_local_log_file_path(cls) -> Path:
+    def output_dir(cls) -> Path:
+        output_dir_path = cls.metadata_dir() / cls.OUTPUT_DIRNAME
+
+        if not output_dir_path.is_dir():
+            output_dir_path.mkdir(parents=True)
+
+        return output_dir_path
+
+    @classmethod
+    def archive_dir(cls) -> Path:
+        archive_dir_path = cls.metadata_dir() / cls.ARCHIVE_DIRNAME
+
+        if not archive_dir_path.is_dir():
+            archive_dir_path.mkdir(parents=True)
+
+        return archive_dir_path
+
+    @classmethod
+    def get_task_run_output_dir(
+            cls,
+            flow_id: str,
+            flow_run_id: str,
+            task_name: str
+        ) -> Path:
+        return (
+            cls.output_dir()
+            / str(flow_id)
+            / str(flow_run_id)
+            / str(task_name)
+        )
+
+    @classmethod
+    def get_local_log_file_path(cls, create: bool = True) -> Path:
         current_time = datetime.now().isoformat()
         log_file_path = cls.log_dir() / 'local' / (current_time + '.log')
-        _prepare_log_file(log_file_path)
+        if create:
+            _prepare_log_file(log_file_path)
         return log_file_path
 
     @classmethod
@@ -130,7 +277,8 @@ class GlobalContext:
     def get_flow_run_log_file_path(
             cls,
             flow_id: str,
-            flow_run_id: str
+            flow_run_id: str,
+            create: bool = True
         ) -> Path:
         log_file_path = (
             cls.log_dir()
@@ -138,7 +286,8 @@ class GlobalContext:
             / str(flow_id)
             / (str(flow_run_id) + '.log')
         )
-        _prepare_log_file(log_file_path)
+        if create:
+            _prepare_log_file(log_file_path)
         return log_file_path
 
     @classmethod
@@ -146,7 +295,8 @@ class GlobalContext:
             cls,
             flow_id: str,
             task_name: str,
-            task_run_id: str
+            task_run_id: str,
+            create: bool = True
         ) -> Path:
         log_file_path = (
             cls.log_dir()
@@ -155,7 +305,8 @@ class GlobalContext:
             / str(task_name)
             / (str(task_run_id) + '.log')
         )
-        _prepare_log_file(log_file_path)
+        if create:
+            _prepare_log_file(log_file_path)
         return log_file_path
 
     @classmethod
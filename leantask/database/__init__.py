@@ -1,3 +1,7 @@
+from ..context import GlobalContext
 from .base import *
 from .models import *
 from .log_models import *
+
+if GlobalContext.DATABASE_ATTACH_LOG:
+    attach_log_database()
@@ -0,0 +1,121 @@
+'''Monthly archive databases of finished runs, placed in the archive directory of the project.
+
+Each archive holds the run tables of the runs created within its month. Read-only commands
+attach the archives, thus their queries span the operational database and the archives.
+'''
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Tuple
+from peewee import ModelSelect
+
+from ..context import GlobalContext
+from ..logging import get_local_logger
+from .common import open_db_connection
+from .models import FlowRunModel, TaskRunModel, TaskRunBatchModel
+
+ARCHIVED_MODELS = (FlowRunModel, TaskRunModel, TaskRunBatchModel)
+
+# SQLite attaches at most 10 databases to a connection by default.
+MAX_ATTACHED_DATABASES = 10
+
+
+def get_archive_name(value: datetime) -> str:
+    return 'archive_' + value.strftime('%Y_%m')
+
+
+def get_archive_path(archive_name: str) -> Path:
+    return GlobalContext.metadata_dir() / GlobalContext.ARCHIVE_DIRNAME / (archive_name + '.db')
+
+
+def list_archive_names() -> List[str]:
+    '''Return names of the existing archives, the newest first.'''
+    archive_dir = GlobalContext.metadata_dir() / GlobalContext.ARCHIVE_DIRNAME
+    if not archive_dir.is_dir():
+        return []
+
+    return sorted((path.stem for path in archive_dir.glob('archive_*.db')), reverse=True)
+
+
+def create_archive(archive_name: str) -> Path:
+    '''Create the archive with the run tables and their indexes, if it doesn\'t exist yet.'''
+    archive_path = GlobalContext.archive_dir() / (archive_name + '.db')
+    archive_database = open_db_connection(archive_path)
+    try:
+        with archive_database.atomic():
+            for model in ARCHIVED_MODELS:
+                archive_database.execute_sql(*model._schema._create_table(safe=True).query())
+                for index in model._schema._create_indexes(safe=True):
+                    archive_database.execute_sql(*index.query())
+
+    finally:
+        archive_database.close()
+
+    return archive_path
+
+
+def _datetime_from_milliseconds(value: int) -> datetime:
+    try:
+        return datetime.fromtimestamp(value / 1000)
+    except (OverflowError, OSError, ValueError):
+        return datetime.max
+
+
+def get_archive_names_of_id(id_prefix: str) -> List[str]:
+    '''Return names of the existing archives which might hold the run of the id, or its prefix.
+
+    Run ids are UUIDv7, which start with their creation time in milliseconds, thus a prefix
+    is created within a time range, usually a single month.
+    '''
+    digits = id_prefix.replace('-', '').replace('.', '').strip().lower()[:12]
+    try:
+        start_milliseconds = int(digits.ljust(12, '0'), 16)
+        end_milliseconds = int(digits.ljust(12, 'f'), 16)
+    except ValueError:
+        return []
+
+    start_name = get_archive_name(_datetime_from_milliseconds(start_milliseconds))
+    end_name = get_archive_name(_datetime_from_milliseconds(end_milliseconds))
+    return [name for name in list_archive_names() if start_name <= name <= end_name]
+
+
+def attach_archives(run_id: str = None) -> List[str]:
+    '''Attach the archives to the database of the run models and return their names.
+
+    At most `MAX_ATTACHED_DATABASES`, including other attached databases, are attached. The
+    archives of the month of 'run_id' (or its prefix) come first, then the newest archives.
+    '''
+    db = FlowRunModel._meta.database
+    archive_names = list_archive_names()
+    if run_id is not None:
+        run_archive_names = get_archive_names_of_id(run_id)
+        archive_names = run_archive_names + [name for name in archive_names if name not in run_archive_names]
+
+    total_archives = len(archive_names)
+    archive_names = sorted(archive_names[:MAX_ATTACHED_DATABASES - len(db.attached_databases)], reverse=True)
+    if len(archive_names) < total_archives:
+        get_local_logger('archive').warning(
+            f'Only {len(archive_names)} of {total_archives} archives are attached,'
+            ' thus runs of the older archives are only found by their run id.'
+        )
+
+    db.attach_databases(
+        {archive_name: get_archive_path(archive_name) for archive_name in archive_names},
+        {
+            model._meta.table_name: [field.column_name for field in model._meta.sorted_fields]
+            for model in ARCHIVED_MODELS
+        }
+    )
+    return archive_names
+
+
+def select_archives(query: ModelSelect) -> List[Tuple[Any, ...]]:
+    '''Run the select query of the run models on every archive and return the rows.'''
+    rows = []
+    for archive_name in list_archive_names():
+        archive_database = open_db_connection(get_archive_path(archive_name), read_only=True)
+        try:
+            rows += archive_database.execute(query).fetchall()
+        finally:
+            archive_database.close()
+
+    return rows
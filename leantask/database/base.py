@@ -1,7 +1,9 @@
-from peewee import Model
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Type
+from peewee import SQL, Model
 
 from ..context import GlobalContext
-from .common import open_db_connection
+from .common import column_integer, column_text, open_db_connection
 
 database = open_db_connection(
     GlobalContext.database_path().resolve()
@@ -10,12 +12,154 @@ log_database = open_db_connection(
     GlobalContext.log_database_path().resolve()
 )
 
+LOG_SCHEMA_NAME = 'log'
+
 
 class BaseModel(Model):
     class Meta:
         database = database
 
+    @classmethod
+    def rows_written(cls, rows: List[Dict[str, Any]]) -> None:
+        '''Called within the transaction which has written the rows in bulk, bypassing `save`.'''
+
 
 class LogModel(Model):
     class Meta:
         database = log_database
+
+
+class DeltaLogModel(LogModel):
+    '''Log of a model which stores only the fields changed since the previous row of the same 'ref_id'.
+
+    Rows are ordered by 'seq'. Unchanged fields are stored as NULL, while fields changed to
+    NULL are listed in 'null_fields', thus full snapshots can be rebuilt on read. References
+    to other logs, i.e. 'ref_*' fields, are stored in every row.
+    '''
+    seq = column_integer(default=0, constraints=[SQL('DEFAULT 0')])
+    null_fields = column_text(null=True)
+
+    KEY_FIELDS = ('id', 'ref_id', 'seq', 'null_fields', 'created_datetime', 'scheduler_session')
+
+    @classmethod
+    def delta_field_names(cls) -> List[str]:
+        return [
+            name for name in cls._meta.fields
+            if name not in cls.KEY_FIELDS and not name.startswith('ref_')
+        ]
+
+    @classmethod
+    def delta(
+            cls,
+            previous: Optional[Dict[str, Any]],
+            current: Dict[str, Any]
+        ) -> Optional[Dict[str, Any]]:
+        '''Return fields of a log row holding changes from 'previous' to 'current', or None if unchanged.
+
+        If 'previous' is None, i.e. the logged state is unknown, every field is written.
+        '''
+        field_names = cls.delta_field_names()
+        changed = {
+            name: current[name] for name in field_names
+            if name in current and (previous is None or current[name] != previous.get(name))
+        }
+        if len(changed) == 0:
+            return None
+
+        kwargs = {name: value for name, value in current.items() if name not in field_names}
+        kwargs.update({name: value for name, value in changed.items() if value is not None})
+        null_fields = [name for name, value in changed.items() if value is None]
+        if len(null_fields) > 0:
+            kwargs['null_fields'] = ','.join(null_fields)
+
+        return kwargs
+
+    @classmethod
+    def snapshots(cls, ref_id: str) -> List[Dict[str, Any]]:
+        '''Rebuild full snapshots of the referenced model after each of its log rows.'''
+        field_names = cls.delta_field_names()
+        snapshots = []
+        snapshot = dict()
+        log_models = (
+            cls.select()
+            .where(cls.ref_id == ref_id)
+            .order_by(cls.seq, cls.created_datetime)
+        )
+        for log_model in log_models:
+            null_fields = log_model.null_fields.split(',') if log_model.null_fields else []
+            for name in field_names:
+                value = log_model.__data__.get(name)
+                if value is not None:
+                    snapshot[name] = value
+                elif name in null_fields or name not in snapshot:
+                    snapshot[name] = None
+
+            snapshot.update({
+                name: log_model.__data__.get(name) for name in cls._meta.fields
+                if name not in field_names and name != 'null_fields'
+            })
+            snapshots.append(snapshot.copy())
+
+        return snapshots
+
+
+def _log_model_classes(model_class: Type[LogModel] = LogModel) -> List[Type[LogModel]]:
+    model_classes = []
+    for subclass in model_class.__subclasses__():
+        model_classes += [subclass] + _log_model_classes(subclass)
+
+    return model_classes
+
+
+def attach_log_database(attach: bool = True) -> None:
+    '''Write log models through the main connection, where the log database is attached as
+    `LOG_SCHEMA_NAME`, thus a model and its log are committed in a single transaction.
+
+    With 'attach' False, log models are moved back to their own connection. Commits are only
+    atomic across both files with a rollback journal, thus the 'wal' journal mode is refused.
+    '''
+    if attach and GlobalContext.DATABASE_JOURNAL_MODE.lower() == 'wal':
+        raise ValueError(
+            "Attached log database requires a rollback journal mode, e.g. 'delete', not 'wal'."
+        )
+
+    if attach:
+        database.attach_databases({LOG_SCHEMA_NAME: log_database.database_path})
+    else:
+        database.detach_database(LOG_SCHEMA_NAME)
+
+    for model_class in _log_model_classes():
+        model_class._meta.set_database(database if attach else log_database)
+        model_class._meta.schema = LOG_SCHEMA_NAME if attach else None
+
+
+def is_log_database_attached() -> bool:
+    return LOG_SCHEMA_NAME in database.attached_databases
+
+
+@contextmanager
+def separate_log_database() -> Iterator[None]:
+    '''Move log models back to their own connection within the block, used by schema changes.
+
+    SQLite doesn\'t accept foreign keys qualified by the schema of an attached database.
+    '''
+    log_database_attached = is_log_database_attached()
+    if log_database_attached:
+        attach_log_database(False)
+
+    try:
+        yield
+    finally:
+        if log_database_attached:
+            attach_log_database()
+
+
+def set_read_only(read_only: bool = True) -> None:
+    '''Reopen both databases in read-only mode, used by commands which only show data.'''
+    database.set_read_only(read_only)
+    log_database.set_read_only(read_only)
+
+
+def checkpoint_databases(mode: str = 'PASSIVE') -> None:
+    database.checkpoint(mode)
+    log_database.checkpoint(mode)
@@ -1,15 +1,21 @@
+import random
+import time
 from datetime import datetime
+from enum import Enum
 from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
 from peewee import (
-    Database, SqliteDatabase,
+    Database, Expression, Model, ModelSelect, OperationalError, SqliteDatabase,
     AutoField, IntegerField, FloatField,
     CharField, FixedCharField, TextField,
     BooleanField, DateTimeField, Field,
-    ForeignKeyField, SQL
+    ForeignKeyAccessor, SQL
 )
+from peewee import ForeignKeyField as _ForeignKeyField
 
 from ..context import GlobalContext
-from ..utils.string import generate_uuid
+from ..utils.string import generate_uuid7, shortest_unique_prefixes
+from .identity import identity_map, is_identity_cached
 
 MD5_CHAR_LENGTH = 32
 UUID_CHAR_LENGTH = 36
@@ -18,8 +24,229 @@ MEDIUM_CHAR_LENGTH = 100
 BIG_CHAR_LENGTH = 250
 
 
-def open_db_connection(database_path: Path) -> Database:
-    return SqliteDatabase(database_path)
+class RetrySqliteDatabase(SqliteDatabase):
+    '''SQLite database which retries statements with backoff while the database is busy.
+
+    Write transactions take the write lock on begin ('BEGIN IMMEDIATE'), thus concurrent
+    writers wait on the busy timeout instead of failing when upgrading their read lock.
+    '''
+    def __init__(
+            self,
+            database_path: Path,
+            read_only: bool = False,
+            busy_retries: int = 5,
+            busy_backoff: float = 0.05,
+            **kwargs
+        ) -> None:
+        self.database_path = Path(database_path)
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff
+        self.read_only = read_only
+        self.attached_databases: Dict[str, Path] = dict()
+        self.union_tables: Dict[str, Tuple[List[str], List[str]]] = dict()
+        super(RetrySqliteDatabase, self).__init__(
+            self._database_name(),
+            **self._connect_kwargs(),
+            **kwargs
+        )
+
+    def _database_name(self) -> str:
+        if self.read_only:
+            return self.database_path.resolve().as_uri() + '?mode=ro'
+
+        return str(self.database_path)
+
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        pragmas = {
+            'synchronous': GlobalContext.DATABASE_SYNCHRONOUS,
+            'busy_timeout': GlobalContext.DATABASE_BUSY_TIMEOUT,
+            'cache_size': -GlobalContext.DATABASE_CACHE_SIZE,
+            'mmap_size': GlobalContext.DATABASE_MMAP_SIZE
+        }
+        if not self.read_only:
+            pragmas = {
+                'auto_vacuum': 'incremental',
+                'journal_mode': GlobalContext.DATABASE_JOURNAL_MODE,
+                **pragmas
+            }
+
+        return dict(
+            pragmas=pragmas,
+            timeout=GlobalContext.DATABASE_BUSY_TIMEOUT / 1000,
+            uri=self.read_only
+        )
+
+    def set_read_only(self, read_only: bool = True) -> None:
+        '''Reopen the database connection in read-only mode, or back to read-write mode.'''
+        if self.read_only == read_only:
+            return
+
+        self.read_only = read_only
+        self.init(self._database_name(), **self._connect_kwargs())
+
+    def attach_databases(
+            self,
+            attached_databases: Dict[str, Path],
+            union_tables: Dict[str, List[str]] = None
+        ) -> None:
+        '''Attach the databases on connect, keyed by schema name.
+
+        Each table of 'union_tables' is shadowed by a temporary view over the same table of
+        main and these databases. Unqualified names resolve to the temporary schema first,
+        thus read queries of the models span the attached databases transparently.
+        '''
+        self.attached_databases.update(attached_databases)
+        for table_name, column_names in (union_tables or dict()).items():
+            self.union_tables[table_name] = (column_names, list(attached_databases))
+
+        if not self.is_closed():
+            self.close()
+
+    def detach_database(self, schema_name: str) -> None:
+        self.attached_databases.pop(schema_name, None)
+        for table_name, (column_names, schema_names) in list(self.union_tables.items()):
+            if schema_name in schema_names:
+                self.union_tables[table_name] = (
+                    column_names,
+                    [name for name in schema_names if name != schema_name]
+                )
+
+        if not self.is_closed():
+            self.close()
+
+    def _initialize_connection(self, conn) -> None:
+        super(RetrySqliteDatabase, self)._initialize_connection(conn)
+        for schema_name, database_path in self.attached_databases.items():
+            if self.read_only:
+                database_name = Path(database_path).resolve().as_uri() + '?mode=ro'
+            else:
+                database_name = str(database_path)
+            conn.execute(f'ATTACH DATABASE ? AS "{schema_name}"', (database_name,))
+            if not self.read_only:
+                # Journal mode is kept by the file, thus it may differ from the main database.
+                conn.execute(
+                    f'PRAGMA "{schema_name}".journal_mode = {GlobalContext.DATABASE_JOURNAL_MODE}'
+                ).fetchall()
+
+        for table_name, (column_names, schema_names) in self.union_tables.items():
+            selects = [
+                _select_columns(schema_name, table_name, column_names, conn)
+                for schema_name in ['main'] + schema_names
+            ]
+            conn.execute(
+                f'CREATE TEMP VIEW IF NOT EXISTS "{table_name}" AS '
+                + ' UNION ALL '.join(select for select in selects if select is not None)
+            )
+
+    def atomic(self, *args, **kwargs):
+        if not self.read_only:
+            kwargs.setdefault('lock_type', 'IMMEDIATE')
+
+        return super(RetrySqliteDatabase, self).atomic(*args, **kwargs)
+
+    def execute_sql(self, sql, params=None, commit=None):
+        attempt = 0
+        while True:
+            try:
+                return super(RetrySqliteDatabase, self).execute_sql(sql, params)
+
+            except OperationalError as exc:
+                if attempt >= self.busy_retries or not _is_busy_error(exc):
+                    raise
+
+            attempt += 1
+            time.sleep(self.busy_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+    def checkpoint(self, mode: str = 'PASSIVE') -> None:
+        '''Move WAL content back into the database file, thus the WAL does not grow indefinitely.'''
+        if self.read_only or GlobalContext.DATABASE_JOURNAL_MODE.lower() != 'wal':
+            return
+
+        self.execute_sql(f'PRAGMA wal_checkpoint({mode})')
+
+
+def _select_columns(
+        schema_name: str,
+        table_name: str,
+        column_names: List[str],
+        conn
+    ) -> Optional[str]:
+    '''Return select of the columns from the table, with NULL for columns the table lacks.'''
+    existing_column_names = {
+        row[1] for row in conn.execute(f'PRAGMA "{schema_name}".table_info("{table_name}")')
+    }
+    if len(existing_column_names) == 0:
+        return None
+
+    columns = ', '.join(
+        f'"{column_name}"' if column_name in existing_column_names else f'NULL AS "{column_name}"'
+        for column_name in column_names
+    )
+    return f'SELECT {columns} FROM "{schema_name}"."{table_name}"'
+
+
+def _is_busy_error(exc: OperationalError) -> bool:
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def open_db_connection(
+        database_path: Path,
+        read_only: bool = False
+    ) -> Database:
+    return RetrySqliteDatabase(
+        database_path,
+        read_only=read_only,
+        busy_retries=GlobalContext.DATABASE_BUSY_RETRIES
+    )
+
+
+class StatusField(IntegerField):
+    '''Status stored as the integer value of its enum.
+
+    Enum members and enum names are accepted as values, and enum members are returned.
+    '''
+    def __init__(self, enum_class: Type[Enum], **kwargs) -> None:
+        self.enum_class = enum_class
+        super(StatusField, self).__init__(**kwargs)
+
+    def db_value(self, value: Any) -> Any:
+        if isinstance(value, Enum):
+            value = value.value
+
+        elif isinstance(value, str):
+            value = self.enum_class[value].value
+
+        return super(StatusField, self).db_value(value)
+
+    def python_value(self, value: Any) -> Any:
+        if value is None:
+            return None
+
+        return self.enum_class(int(value))
+
+    def in_inline(self, statuses: Iterable[Enum]) -> Expression:
+        '''IN condition with inlined values, thus SQLite matches it with the WHERE clause of a partial index.'''
+        values = ', '.join(str(self.db_value(status)) for status in statuses)
+        return self.in_(SQL(f'({values})'))
+
+
+class IdentityForeignKeyAccessor(ForeignKeyAccessor):
+    '''Accessor which loads the related model through the identity map, if its class is cached.'''
+    def get_rel_instance(self, instance: Model) -> Any:
+        value = instance.__data__.get(self.name)
+        if value is not None \
+                and self.name not in instance.__rel__ \
+                and is_identity_cached(self.rel_model):
+            rel_model = identity_map.get(self.rel_model, value)
+            if rel_model is not None:
+                instance.__rel__[self.name] = rel_model
+
+        return super(IdentityForeignKeyAccessor, self).get_rel_instance(instance)
+
+
+class ForeignKeyField(_ForeignKeyField):
+    accessor_class = IdentityForeignKeyAccessor
 
 
 def column_datetime(**kwargs) -> Field:
@@ -70,12 +297,16 @@ def column_md5_string(**kwargs) -> Field:
     return FixedCharField(MD5_CHAR_LENGTH, **kwargs)
 
 
+def column_status(enum_class: Type[Enum], **kwargs) -> Field:
+    return StatusField(enum_class, **kwargs)
+
+
 def column_uuid_string(**kwargs) -> Field:
     return FixedCharField(max_length=36, **kwargs)
 
 
 def column_uuid_primary_key(**kwargs) -> Field:
-    return column_uuid_string(primary_key=True, default=generate_uuid, **kwargs)
+    return column_uuid_string(primary_key=True, default=generate_uuid7, **kwargs)
 
 
 def column_scheduler_session_id(**kwargs) -> Field:
@@ -83,3 +314,66 @@ def column_scheduler_session_id(**kwargs) -> Field:
         default=lambda: GlobalContext.SCHEDULER_SESSION_ID,
         **kwargs
     )
+
+
+SHORT_ID_CANDIDATES_LIMIT = 5
+
+
+def prefix_range(field: Field, prefix: str) -> Expression:
+    '''Condition of values starting with the prefix as a range, which uses the index of the field.'''
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (field >= prefix) & (field < upper_bound)
+
+
+def get_short_ids(
+        query: ModelSelect,
+        field: Field,
+        ids: Iterable[str],
+        other_ids: Iterable[str] = ()
+    ) -> Dict[str, str]:
+    '''Return the shortest prefix of each id which matches only that id within the query,
+    thus it\'s accepted back by `get_by_short_id` on the same query.
+
+    Each id is compared with its neighbors in the index of the field, not only with the given ids,
+    and with 'other_ids', e.g. ids of another table listed along with them.
+    '''
+    ids = set(ids)
+    neighbor_ids = set()
+    for value in ids:
+        for condition, order in ((field < value, field.desc()), (field > value, field)):
+            neighbor_id = query.select(field).where(condition).order_by(order).limit(1).scalar()
+            if neighbor_id is not None:
+                neighbor_ids.add(neighbor_id)
+
+    prefixes = shortest_unique_prefixes(ids | neighbor_ids | set(other_ids))
+    return {value: prefixes[value] for value in ids}
+
+
+def get_by_short_id(
+        query: ModelSelect,
+        field: Field,
+        short_id: str
+    ) -> Model:
+    '''Return the only model of the query whose id field starts with the short id.
+
+    Raises IndexError if no model matches, and ValueError listing the candidates if several do.
+    '''
+    prefix = short_id.replace('.', '').strip().lower()
+    if len(prefix) == 0:
+        raise ValueError('Short id should not be empty.')
+
+    models = list(
+        query.where(prefix_range(field, prefix))
+        .order_by(field)
+        .limit(SHORT_ID_CANDIDATES_LIMIT + 1)
+    )
+    if len(models) == 0:
+        raise IndexError(f"No record with id starting with '{short_id}'.")
+
+    if len(models) > 1:
+        candidates = ', '.join(getattr(model, field.name) for model in models[:SHORT_ID_CANDIDATES_LIMIT])
+        if len(models) > SHORT_ID_CANDIDATES_LIMIT:
+            candidates += ', ...'
+        raise ValueError(f"Short id '{short_id}' is ambiguous, it matches: {candidates}.")
+
+    return models[0]
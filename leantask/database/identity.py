@@ -0,0 +1,116 @@
+'''Per-process identity map of models which rarely change, i.e. flows and tasks.
+
+Models whose class sets `identity_cached = True` in their Meta are loaded at most once,
+either by their id or through a foreign key of another model, until they are invalidated.
+'''
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple, Type
+from peewee import Model
+
+
+def is_identity_cached(model_class: Type[Model]) -> bool:
+    return getattr(model_class._meta, 'identity_cached', False)
+
+
+class _FieldIndex:
+    '''Kept models of a class by the values of some of their fields.'''
+    def __init__(self, field_names: Tuple[str, ...]) -> None:
+        self.field_names = field_names
+        self._models: Dict[Tuple[Any, ...], Model] = dict()
+        self._keys: Dict[Any, Tuple[Any, ...]] = dict()
+
+    def get(self, values: Tuple[Any, ...]) -> Optional[Model]:
+        return self._models.get(values)
+
+    def add(self, model: Model) -> None:
+        # Fields of the replaced model might have changed since it was indexed.
+        self.remove(model.get_id())
+        key = tuple(model.__data__.get(name) for name in self.field_names)
+        self._models[key] = model
+        self._keys[model.get_id()] = key
+
+    def remove(self, model_id: Any) -> None:
+        key = self._keys.pop(model_id, None)
+        if key is not None:
+            self._models.pop(key, None)
+
+
+class IdentityMap:
+    def __init__(self) -> None:
+        self._models: Dict[Tuple[Type[Model], Any], Model] = dict()
+        self._indexes: Dict[Type[Model], Dict[Tuple[str, ...], _FieldIndex]] = dict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def get(self, model_class: Type[Model], model_id: Any) -> Optional[Model]:
+        '''Return the kept model of the id, or load and keep it. Returns None if it doesn\'t exist.'''
+        model = self._models.get((model_class, model_id))
+        if model is not None:
+            return model
+
+        model = (
+            model_class.select()
+            .where(model_class._meta.primary_key == model_id)
+            .first()
+        )
+        if model is None:
+            return None
+
+        with self._lock:
+            # Another thread might have loaded the same model meanwhile.
+            kept_model = self._models.get((model_class, model_id))
+            if kept_model is not None:
+                return kept_model
+
+            self._keep(model)
+            return model
+
+    def find(self, model_class: Type[Model], **values) -> Optional[Model]:
+        '''Return a kept model of the class whose fields equal the values.
+
+        Kept models are indexed by the names of the fields on the first lookup by them.
+        '''
+        field_names = tuple(sorted(values))
+        with self._lock:
+            indexes = self._indexes.setdefault(model_class, dict())
+            index = indexes.get(field_names)
+            if index is None:
+                index = indexes[field_names] = _FieldIndex(field_names)
+                for key, model in self._models.items():
+                    if key[0] is model_class:
+                        index.add(model)
+
+            return index.get(tuple(values[name] for name in field_names))
+
+    def add(self, models: Iterable[Model]) -> None:
+        '''Keep the models, replacing those of the same id, e.g. rows just loaded by a join.'''
+        with self._lock:
+            for model in models:
+                self._keep(model)
+
+    def _keep(self, model: Model) -> None:
+        self._models[(type(model), model.get_id())] = model
+        for index in self._indexes.get(type(model), dict()).values():
+            index.add(model)
+
+    def invalidate(self, model_class: Type[Model] = None, model_id: Any = None) -> None:
+        '''Forget the model of the id, all models of the class, or every model.'''
+        with self._lock:
+            if model_class is None:
+                self._models.clear()
+                self._indexes.clear()
+
+            elif model_id is not None:
+                self._models.pop((model_class, model_id), None)
+                for index in self._indexes.get(model_class, dict()).values():
+                    index.remove(model_id)
+
+            else:
+                for key in [key for key in self._models if key[0] is model_class]:
+                    del self._models[key]
+                self._indexes.pop(model_class, None)
+
+
+identity_map = IdentityMap()
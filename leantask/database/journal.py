@@ -0,0 +1,185 @@
+import atexit
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from peewee import EXCLUDED, Database, Model, chunked
+
+from ..context import GlobalContext
+from .base import BaseModel
+
+
+class StatusJournal:
+    '''Write-behind queue of model updates.
+
+    Updates are kept in memory and written by a background thread in group commits,
+    either every 'interval' seconds or once 'batch_size' updates are queued.
+    Only the latest snapshot of each model is written, while every log row is kept.
+    Log rows may hold only the changed fields, see `DeltaLogModel`.
+    '''
+    def __init__(
+            self,
+            interval: float = 0.5,
+            batch_size: int = 100
+        ) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._rows: Dict[Tuple[Type[BaseModel], Any], Dict[str, Any]] = dict()
+        self._log_rows: List[Tuple[Type[Model], Dict[str, Any]]] = []
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._thread: threading.Thread = None
+        self._error: BaseException = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def put(
+            self,
+            model: BaseModel,
+            log_kwargs: Optional[Dict[str, Any]]
+        ) -> None:
+        '''Queue update of an existing model and its log row, if any.'''
+        model_class = model.__class__
+        with self._condition:
+            self._raise_error()
+            self._rows[(model_class, model.id)] = model.__data__.copy()
+            if log_kwargs is not None:
+                log_model = model_class._meta.log_model(**log_kwargs)
+                self._log_rows.append((log_model.__class__, log_model.__data__))
+            self._pending += 1
+
+            if self._thread is None:
+                self._start()
+
+            if self._pending >= self.batch_size:
+                self._condition.notify()
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._pending < self.batch_size:
+                    self._condition.wait(self.interval)
+
+            try:
+                self._write()
+            except BaseException as exc:
+                with self._lock:
+                    self._error = exc
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise RuntimeError('Failed to write queued status updates.') from error
+
+    def flush(self) -> None:
+        '''Write all queued updates in the current thread.
+
+        Raises the error of a failed background write, whose updates are still queued.
+        '''
+        self._write()
+        with self._lock:
+            self._raise_error()
+
+    def _write(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                rows = self._rows
+                log_rows = self._log_rows
+                pending = self._pending
+                self._rows = dict()
+                self._log_rows = []
+                self._pending = 0
+
+            if len(rows) == 0 and len(log_rows) == 0:
+                return
+
+            rows_by_model: Dict[Type[BaseModel], List[Dict[str, Any]]] = dict()
+            for (model_class, _), row in rows.items():
+                rows_by_model.setdefault(model_class, []).append(row)
+
+            log_rows_by_model: Dict[Type[Model], List[Dict[str, Any]]] = dict()
+            for log_model, row in log_rows:
+                log_rows_by_model.setdefault(log_model, []).append(row)
+
+            try:
+                _write_by_database(
+                    [(model_class, rows, self._upsert) for model_class, rows in rows_by_model.items()]
+                    + [(model_class, rows, self._insert) for model_class, rows in log_rows_by_model.items()]
+                )
+
+            except BaseException:
+                # Requeue the unwritten updates before those queued meanwhile, which are newer.
+                # Rewriting snapshots is harmless, while log rows are only inserted by the last
+                # transaction, thus none of them has been written.
+                with self._lock:
+                    self._rows = {**rows, **self._rows}
+                    self._log_rows = log_rows + self._log_rows
+                    self._pending += pending
+                raise
+
+            with self._lock:
+                # The updates of a failed background write have been written along.
+                self._error = None
+
+    def _upsert(
+            self,
+            model_class: Type[BaseModel],
+            rows: List[Dict[str, Any]]
+        ) -> None:
+        update = {
+            field: getattr(EXCLUDED, field.column_name)
+            for name, field in model_class._meta.fields.items()
+            if name != 'id'
+        }
+        for batch in chunked(rows, self.batch_size):
+            (
+                model_class.insert_many(batch)
+                .on_conflict(conflict_target=[model_class.id], update=update)
+                .execute()
+            )
+
+        model_class.rows_written(rows)
+
+    def _insert(
+            self,
+            model_class: Type[BaseModel],
+            rows: List[Dict[str, Any]]
+        ) -> None:
+        # Delta rows have different fields, while 'insert_many' takes columns of the first row.
+        rows = [{name: row.get(name) for name in model_class._meta.fields} for row in rows]
+        for batch in chunked(rows, self.batch_size):
+            model_class.insert_many(batch).execute()
+
+
+WriteItem = Tuple[Type[Model], List[Dict[str, Any]], Callable[[Type[Model], List[Dict[str, Any]]], None]]
+
+
+def _write_by_database(items: List[WriteItem]) -> None:
+    '''Write rows of models sharing the same database within a single transaction.
+
+    If the log database is attached to the main connection, models and their logs share it.
+    '''
+    items_by_database: Dict[Database, List[WriteItem]] = dict()
+    for item in items:
+        items_by_database.setdefault(item[0]._meta.database, []).append(item)
+
+    for database, database_items in items_by_database.items():
+        with database.atomic():
+            for model_class, rows, write in database_items:
+                write(model_class, rows)
+
+
+status_journal = StatusJournal(
+    interval=GlobalContext.STATUS_JOURNAL_INTERVAL,
+    batch_size=GlobalContext.STATUS_JOURNAL_BATCH_SIZE
+)
@@ -1,28 +1,29 @@
-from ...enum import LogTableName
-from ..base import LogModel
+from ...enum import FlowRunStatus, LogTableName
+from ..base import DeltaLogModel
 from ..common import (
     ForeignKeyField,
     column_boolean, column_integer,
-    column_small_string, column_medium_string, column_big_string, column_text,
-    column_md5_string, column_uuid_string, column_uuid_primary_key,
+    column_medium_string, column_big_string, column_text,
+    column_md5_string, column_status, column_uuid_string, column_uuid_primary_key,
     column_datetime, column_current_datetime
 )
 from .session import SchedulerSessionModel
 
 
-class FlowLogModel(LogModel):
+class FlowLogModel(DeltaLogModel):
     id = column_uuid_primary_key()
-    path = column_big_string()
-    name = column_medium_string()
+    path = column_big_string(null=True)
+    name = column_medium_string(null=True)
     description = column_text(null=True)
     cron_schedules = column_medium_string(null=True)
     start_datetime = column_datetime(null=True)
     end_datetime = column_datetime(null=True)
     max_delay = column_integer(null=True)
-    checksum = column_md5_string()
-    active = column_boolean(default=False)
+    triggers = column_text(null=True)
+    checksum = column_md5_string(null=True)
+    active = column_boolean(null=True)
 
-    ref_id = column_uuid_string()
+    ref_id = column_uuid_string(index=True)
 
     scheduler_session = ForeignKeyField(
         SchedulerSessionModel,
@@ -36,15 +37,15 @@ class FlowLogModel(LogModel):
         table_name = LogTableName.FLOW.value
 
 
-class FlowRunLogModel(LogModel):
+class FlowRunLogModel(DeltaLogModel):
     id = column_uuid_primary_key()
     schedule_datetime = column_datetime(null=True)
     max_delay = column_integer(null=True)
-    is_manual = column_boolean(default=False)
+    is_manual = column_boolean(null=True)
     params = column_text(null=True)
-    status = column_small_string()
+    status = column_status(FlowRunStatus, null=True)
 
-    ref_id = column_uuid_string()
+    ref_id = column_uuid_string(index=True)
     ref_flow_schedule_id = column_uuid_string(null=True)
     ref_flow = ForeignKeyField(
         FlowLogModel,
@@ -1,22 +1,22 @@
-from ...enum import LogTableName
-from ..base import LogModel
+from ...enum import LogTableName, TaskRunStatus
+from ..base import DeltaLogModel, LogModel
 from ..common import (
     ForeignKeyField,
-    column_integer, column_small_string, column_medium_string,
-    column_uuid_string, column_uuid_primary_key, column_text,
+    column_float, column_integer, column_medium_string,
+    column_status, column_uuid_string, column_uuid_primary_key, column_text,
     column_datetime, column_current_datetime
 )
 from .flow import FlowLogModel, FlowRunLogModel
 from .session import SchedulerSessionModel
 
 
-class TaskLogModel(LogModel):
+class TaskLogModel(DeltaLogModel):
     id = column_uuid_primary_key()
-    name = column_medium_string()
-    retry_max = column_integer(default=0)
-    retry_delay = column_integer(default=0)
+    name = column_medium_string(null=True)
+    retry_max = column_integer(null=True)
+    retry_delay = column_integer(null=True)
 
-    ref_id = column_uuid_string()
+    ref_id = column_uuid_string(index=True)
     ref_flow = ForeignKeyField(
         FlowLogModel,
         field=FlowLogModel.ref_id,
@@ -33,7 +33,7 @@ class TaskLogModel(LogModel):
 class TaskDownstreamLogModel(LogModel):
     id = column_uuid_primary_key()
 
-    ref_id = column_uuid_string()
+    ref_id = column_uuid_string(index=True)
     ref_task = ForeignKeyField(
         TaskLogModel,
         field=TaskLogModel.ref_id,
@@ -51,16 +51,21 @@ class TaskDownstreamLogModel(LogModel):
         table_name = LogTableName.TASK_DOWNSTREAM.value
 
 
-class TaskRunLogModel(LogModel):
+class TaskRunLogModel(DeltaLogModel):
     id = column_uuid_primary_key()
-    attempt = column_integer()
-    retry_max = column_integer(default=0)
-    retry_delay = column_integer(default=0)
+    attempt = column_integer(null=True)
+    retry_max = column_integer(null=True)
+    retry_delay = column_integer(null=True)
     params = column_text(null=True)
     output = column_text(null=True)
-    status = column_small_string()
+    status = column_status(TaskRunStatus, null=True)
 
-    ref_id = column_uuid_string()
+    queue_seconds = column_float(null=True)
+    execution_seconds = column_float(null=True)
+    serialization_seconds = column_float(null=True)
+    persistence_seconds = column_float(null=True)
+
+    ref_id = column_uuid_string(index=True)
     ref_flow_run = ForeignKeyField(
         FlowRunLogModel,
         field=FlowRunLogModel.ref_id,
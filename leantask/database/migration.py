@@ -0,0 +1,244 @@
+'''Versioned schema migrations which upgrade the databases of an existing project in place.
+
+The schema version is recorded in `MetadataModel` under `SCHEMA_VERSION_NAME`. Projects
+created before versioning have no record, thus they start from version 0.
+'''
+from enum import Enum
+from typing import Callable, Dict, List, Tuple, Type
+from peewee import Model
+from playhouse.migrate import SqliteMigrator, migrate
+
+from .base import DeltaLogModel, separate_log_database
+from .log_models import (
+    FlowLogModel, FlowRunLogModel,
+    TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel
+)
+from .models import (
+    FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel,
+    MetadataModel,
+    TaskRunModel, TaskRunBatchModel
+)
+
+SCHEMA_VERSION_NAME = 'schema_version'
+
+
+class SchemaVersionError(RuntimeError):
+    '''Databases of the project have an older schema than the installed leantask.'''
+
+
+def _add_missing_columns(model: Type[Model], field_names: List[str]) -> None:
+    database = model._meta.database
+    table_name = model._meta.table_name
+    column_names = {column.name for column in database.get_columns(table_name)}
+
+    migrator = SqliteMigrator(database)
+    operations = []
+    for field_name in field_names:
+        field = model._meta.fields[field_name]
+        if field.column_name not in column_names:
+            operations.append(migrator.add_column(table_name, field.column_name, field))
+
+    if len(operations) > 0:
+        migrate(*operations)
+
+
+def _add_run_extension_columns() -> None:
+    timing_field_names = [
+        'queue_seconds', 'execution_seconds',
+        'serialization_seconds', 'persistence_seconds'
+    ]
+    _add_missing_columns(FlowModel, ['triggers'])
+    _add_missing_columns(FlowLogModel, ['triggers'])
+    _add_missing_columns(TaskRunModel, timing_field_names)
+    _add_missing_columns(TaskRunLogModel, timing_field_names)
+    TaskRunBatchModel.create_table(safe=True)
+
+
+def _create_model_indexes() -> None:
+    for model in (
+            FlowScheduleModel, FlowRunModel, TaskRunModel, TaskRunBatchModel,
+            FlowLogModel, FlowRunLogModel,
+            TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel
+        ):
+        column_names = {
+            column.name for column in model._meta.database.get_columns(model._meta.table_name)
+        }
+        for index in model._meta.fields_to_index():
+            # Indexes on columns added by a later migration are created by that migration.
+            if all(field.column_name in column_names for field in index._expressions):
+                model._meta.database.execute(model._schema._create_index(index, safe=True))
+
+
+def _rebuild_table(model: Type[Model], expressions: Dict[str, str] = None) -> None:
+    '''Recreate the table from the current model definition and copy its rows.
+
+    SQLite can not alter the type of a column, and `SqliteMigrator` fails to parse the table
+    constraints of the models, thus the table is rebuilt from the model itself. Values of
+    columns in 'expressions' are computed by the given SQL expressions over the old table.
+    '''
+    if expressions is None:
+        expressions = dict()
+
+    database = model._meta.database
+    table_name = model._meta.table_name
+    temp_table_name = table_name + '__tmp__'
+    copied_column_names = [
+        column.name for column in database.get_columns(table_name)
+        if column.name in model._meta.columns and column.name not in expressions
+    ]
+    column_names = ', '.join(
+        f'"{column_name}"' for column_name in copied_column_names + list(expressions)
+    )
+    select_columns = ', '.join(
+        [f'"{column_name}"' for column_name in copied_column_names] + list(expressions.values())
+    )
+
+    create_table_sql, params = model._schema._create_table(safe=False).query()
+    database.execute_sql(
+        create_table_sql.replace(f'"{table_name}"', f'"{temp_table_name}"', 1),
+        params
+    )
+    database.execute_sql(
+        f'INSERT INTO "{temp_table_name}" ({column_names}) SELECT {select_columns} FROM "{table_name}"'
+    )
+    database.execute_sql(f'DROP TABLE "{table_name}"')
+    database.execute_sql(f'ALTER TABLE "{temp_table_name}" RENAME TO "{table_name}"')
+
+
+def _convert_status_column(model: Type[Model]) -> None:
+    '''Rebuild the status column as integer and replace the stored enum names with their values.'''
+    database = model._meta.database
+    table_name = model._meta.table_name
+    status_field = model._meta.fields['status']
+    enum_class: Type[Enum] = status_field.enum_class
+
+    column = next(
+        column for column in database.get_columns(table_name)
+        if column.name == status_field.column_name
+    )
+    if column.data_type.upper() != 'INTEGER':
+        _rebuild_table(model)
+
+    cases = []
+    params = []
+    for status in enum_class:
+        cases.append('WHEN ? THEN ?')
+        params += [status.name, status.value]
+
+    column_name = column.name
+    database.execute_sql(
+        f'UPDATE "{table_name}" SET "{column_name}" = CASE "{column_name}" ' + ' '.join(cases)
+        + f' ELSE ? END WHERE typeof("{column_name}") = ?',
+        params + [enum_class.UNKNOWN.value, 'text']
+    )
+
+
+def _convert_status_to_integer() -> None:
+    for model in (
+            FlowRunModel, TaskRunModel, TaskRunBatchModel,
+            FlowRunLogModel, TaskRunLogModel
+        ):
+        _convert_status_column(model)
+
+    # Indexes are dropped along with the rebuilt tables.
+    _create_model_indexes()
+
+
+def _convert_log_to_delta(model: Type[DeltaLogModel]) -> None:
+    '''Rebuild the log table with a sequence number per 'ref_id'.
+
+    Existing rows are full snapshots, thus their NULL values are listed in 'null_fields'.
+    '''
+    null_field_cases = ' || '.join(
+        f'CASE WHEN "{model._meta.fields[name].column_name}" IS NULL THEN \'{name},\' ELSE \'\' END'
+        for name in model.delta_field_names()
+    )
+    _rebuild_table(model, {
+        'seq': 'ROW_NUMBER() OVER (PARTITION BY "ref_id" ORDER BY "created_datetime", rowid) - 1',
+        'null_fields': f"NULLIF(RTRIM({null_field_cases}, ','), '')"
+    })
+
+
+def _convert_logs_to_delta() -> None:
+    for model in (FlowLogModel, FlowRunLogModel, TaskLogModel, TaskRunLogModel):
+        _convert_log_to_delta(model)
+
+    _create_model_indexes()
+
+
+def _create_flow_stats() -> None:
+    FlowStatsModel.create_table(safe=True)
+    FlowStatsModel.refresh(model.id for model in FlowModel.select(FlowModel.id))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[], None]]] = [
+    (1, 'Add flow triggers, task run timings and task run batches.', _add_run_extension_columns),
+    (2, 'Add indexes for scheduler and CLI queries.', _create_model_indexes),
+    (3, 'Store statuses as integers with partial indexes of active runs.', _convert_status_to_integer),
+    (4, 'Store log rows as deltas of the changed fields.', _convert_logs_to_delta),
+    (5, 'Add summaries of runs and schedules of each flow.', _create_flow_stats),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version() -> int:
+    metadata_model = (
+        MetadataModel.select()
+        .where(MetadataModel.name == SCHEMA_VERSION_NAME)
+        .first()
+    )
+    if metadata_model is None:
+        return 0
+
+    return int(metadata_model.value)
+
+
+def check_schema_version() -> None:
+    '''Raise `SchemaVersionError` if the databases should be migrated before being used.
+
+    Projects which are not initialized have no metadata table, thus they are not checked.
+    '''
+    if not MetadataModel.table_exists():
+        return
+
+    schema_version = get_schema_version()
+    if schema_version < LATEST_SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f'Database schema is at version {schema_version}, while version {LATEST_SCHEMA_VERSION}'
+            ' is required. Use this command to migrate the project databases:\nleantask migrate'
+        )
+
+
+def set_schema_version(version: int) -> None:
+    updated_rows = (
+        MetadataModel.update(value=str(version))
+        .where(MetadataModel.name == SCHEMA_VERSION_NAME)
+        .execute()
+    )
+    if updated_rows == 0:
+        MetadataModel.create(name=SCHEMA_VERSION_NAME, value=str(version))
+
+
+def migrate_database() -> List[int]:
+    '''Apply migrations newer than the recorded schema version and return their versions.'''
+    applied_versions = []
+    schema_version = get_schema_version()
+    if schema_version >= LATEST_SCHEMA_VERSION:
+        return applied_versions
+
+    with separate_log_database():
+        database = MetadataModel._meta.database
+        log_database = FlowLogModel._meta.database
+        for version, _, migration in MIGRATIONS:
+            if version <= schema_version:
+                continue
+
+            with database.atomic():
+                with log_database.atomic():
+                    migration()
+                set_schema_version(version)
+
+            applied_versions.append(version)
+
+    return applied_versions
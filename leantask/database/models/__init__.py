@@ -1,3 +1,3 @@
-from .flow import FlowModel, FlowScheduleModel, FlowRunModel
+from .flow import FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel
 from .metadata import MetadataModel
-from .task import TaskModel, TaskDownstreamModel, TaskRunModel
+from .task import TaskModel, TaskDownstreamModel, TaskRunModel, TaskRunBatchModel
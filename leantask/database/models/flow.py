@@ -1,10 +1,15 @@
-from ...enum import TableName
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ...context import GlobalContext
+from ...enum import ACTIVE_FLOW_RUN_STATUSES, FINISHED_FLOW_RUN_STATUSES, FlowRunStatus, TableName
 from ..base import BaseModel
 from ..common import (
     ForeignKeyField,
-    column_boolean, column_integer,
-    column_small_string, column_medium_string, column_big_string, column_text,
-    column_md5_string, column_uuid_string, column_uuid_primary_key,
+    column_boolean, column_integer, column_float,
+    column_medium_string, column_big_string, column_text,
+    column_md5_string, column_status, column_uuid_string, column_uuid_primary_key,
     column_datetime, column_current_datetime, column_modified_datetime
 )
 from ..log_models import FlowLogModel, FlowRunLogModel
@@ -19,6 +24,7 @@ class FlowModel(BaseModel):
     start_datetime = column_datetime(null=True)
     end_datetime = column_datetime(null=True)
     max_delay = column_integer(null=True)
+    triggers = column_text(null=True)
     checksum = column_md5_string(null=True)
     active = column_boolean(default=False)
 
@@ -28,6 +34,7 @@ class FlowModel(BaseModel):
     class Meta:
         table_name = TableName.FLOW.value
         log_model = FlowLogModel
+        identity_cached = True
 
 
 class FlowScheduleModel(BaseModel):
@@ -46,6 +53,24 @@ class FlowScheduleModel(BaseModel):
 
     class Meta:
         table_name = TableName.FLOW_SCHEDULE.value
+        indexes = (
+            (('schedule_datetime',), False),
+            (('flow', 'schedule_datetime'), False),
+        )
+
+    def save(self, force_insert: bool = False, only=None) -> int:
+        with self._meta.database.atomic():
+            rows = super(FlowScheduleModel, self).save(force_insert=force_insert, only=only)
+            FlowStatsModel.refresh_next_schedule(self.flow_id)
+
+        return rows
+
+    def delete_instance(self, recursive: bool = False, delete_nullable: bool = False) -> int:
+        with self._meta.database.atomic():
+            rows = super(FlowScheduleModel, self).delete_instance(recursive, delete_nullable)
+            FlowStatsModel.refresh_next_schedule(self.flow_id)
+
+        return rows
 
 
 class FlowRunModel(BaseModel):
@@ -59,7 +84,7 @@ class FlowRunModel(BaseModel):
     max_delay = column_integer(null=True)
     is_manual = column_boolean(default=False)
     params = column_text(null=True)
-    status = column_small_string()
+    status = column_status(FlowRunStatus)
 
     flow_schedule_id = column_uuid_string(null=True)
 
@@ -69,4 +94,255 @@ class FlowRunModel(BaseModel):
 
     class Meta:
         table_name = TableName.FLOW_RUN.value
+        indexes = (
+            (('status', 'modified_datetime'), False),
+            (('modified_datetime',), False),
+            (('flow', 'modified_datetime'), False),
+        )
         log_model = FlowRunLogModel
+
+    @classmethod
+    def is_active(cls):
+        '''Condition of non-terminal runs, which matches the partial indexes of active runs.'''
+        return cls.status.in_inline(ACTIVE_FLOW_RUN_STATUSES)
+
+    def save(self, force_insert: bool = False, only=None) -> int:
+        with self._meta.database.atomic():
+            rows = super(FlowRunModel, self).save(force_insert=force_insert, only=only)
+            FlowStatsModel.record_runs([self.__data__])
+
+        return rows
+
+    @classmethod
+    def rows_written(cls, rows: List[Dict[str, Any]]) -> None:
+        FlowStatsModel.record_runs(rows)
+
+
+FlowRunModel.add_index(
+    FlowRunModel.index(
+        FlowRunModel.flow_schedule_id, FlowRunModel.status,
+        name='flowrunmodel_flow_schedule_id_status_active'
+    )
+    .where(FlowRunModel.is_active())
+)
+FlowRunModel.add_index(
+    FlowRunModel.index(
+        FlowRunModel.flow, FlowRunModel.status,
+        name='flowrunmodel_flow_id_status_active'
+    )
+    .where(FlowRunModel.is_active())
+)
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    '''Nearest-rank percentile of the values.'''
+    if len(values) == 0:
+        return None
+
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class FlowStatsModel(BaseModel):
+    '''Summary of the runs and schedules of each flow, thus flows are listed by a single scan.
+
+    The summary is updated within the transaction which saves a run or a schedule of the flow.
+    The last run is updated in place, while success rate and durations of the latest
+    `GlobalContext.FLOW_STATS_WINDOW` finished runs are only recomputed when a run finishes.
+    Runs removed by retention or archival refresh the whole summary.
+    '''
+    flow = ForeignKeyField(
+        FlowModel,
+        primary_key=True,
+        backref='flow_stats',
+        on_delete='CASCADE'
+    )
+    last_run_id = column_uuid_string(null=True)
+    last_run_status = column_status(FlowRunStatus, null=True)
+    last_run_started_datetime = column_datetime(null=True)
+    last_run_modified_datetime = column_datetime(null=True)
+    last_run_seconds = column_float(null=True)
+    next_schedule_datetime = column_datetime(null=True)
+    finished_runs = column_integer(default=0)
+    success_rate = column_float(null=True)
+    p50_seconds = column_float(null=True)
+    p95_seconds = column_float(null=True)
+
+    modified_datetime = column_modified_datetime()
+
+    class Meta:
+        table_name = TableName.FLOW_STATS.value
+
+    @staticmethod
+    def _summarize_last_run(row: Dict[str, Any]) -> Dict[str, Any]:
+        '''Return the last run fields of the summary from a row of the run.'''
+        status = FlowRunModel.status.python_value(FlowRunModel.status.db_value(row['status']))
+        values = {
+            'last_run_id': row['id'],
+            'last_run_status': status,
+            'last_run_started_datetime': row.get('started_datetime'),
+            'last_run_modified_datetime': row.get('modified_datetime'),
+            'last_run_seconds': None
+        }
+        if status in FINISHED_FLOW_RUN_STATUSES \
+                and values['last_run_started_datetime'] is not None:
+            values['last_run_seconds'] = (
+                values['last_run_modified_datetime'] - values['last_run_started_datetime']
+            ).total_seconds()
+
+        return values
+
+    @staticmethod
+    def _summarize_window(flow_id: str) -> Dict[str, Any]:
+        '''Return the fields of the summary computed from the latest finished runs of the flow.'''
+        finished_run_models = list(
+            FlowRunModel.select(
+                FlowRunModel.status,
+                FlowRunModel.started_datetime,
+                FlowRunModel.modified_datetime
+            )
+            .where(
+                (FlowRunModel.flow == flow_id)
+                & FlowRunModel.status.in_(FINISHED_FLOW_RUN_STATUSES)
+            )
+            .order_by(FlowRunModel.modified_datetime.desc())
+            .limit(GlobalContext.FLOW_STATS_WINDOW)
+        )
+        durations = [
+            (model.modified_datetime - model.started_datetime).total_seconds()
+            for model in finished_run_models
+            if model.started_datetime is not None
+        ]
+
+        values = {
+            'finished_runs': len(finished_run_models),
+            'success_rate': None,
+            'p50_seconds': _percentile(durations, 0.5),
+            'p95_seconds': _percentile(durations, 0.95)
+        }
+        if len(finished_run_models) > 0:
+            done_runs = sum(model.status == FlowRunStatus.DONE for model in finished_run_models)
+            values['success_rate'] = done_runs / len(finished_run_models)
+
+        return values
+
+    @staticmethod
+    def _summarize_next_schedule(flow_id: str) -> Dict[str, Any]:
+        next_schedule_model = (
+            FlowScheduleModel.select(FlowScheduleModel.schedule_datetime)
+            .where(FlowScheduleModel.flow == flow_id)
+            .order_by(FlowScheduleModel.schedule_datetime)
+            .first()
+        )
+        return {
+            'next_schedule_datetime': (
+                next_schedule_model.schedule_datetime if next_schedule_model is not None else None
+            )
+        }
+
+    @classmethod
+    def summarize(cls, flow_id: str) -> Dict[str, Any]:
+        '''Return the summary row of the flow computed from its runs and schedules.'''
+        last_run_model = (
+            FlowRunModel.select()
+            .where(
+                (FlowRunModel.flow == flow_id)
+                & FlowRunModel.status.not_in((FlowRunStatus.SCHEDULED, FlowRunStatus.SCHEDULED_BY_USER))
+            )
+            .order_by(
+                FlowRunModel.modified_datetime.desc(),
+                FlowRunModel.started_datetime.desc(),
+                FlowRunModel.created_datetime.desc()
+            )
+            .first()
+        )
+
+        row = {
+            'flow': flow_id,
+            'last_run_id': None,
+            'last_run_status': None,
+            'last_run_started_datetime': None,
+            'last_run_modified_datetime': None,
+            'last_run_seconds': None,
+            **cls._summarize_next_schedule(flow_id),
+            **cls._summarize_window(flow_id),
+            'modified_datetime': datetime.now()
+        }
+        if last_run_model is not None:
+            row.update(cls._summarize_last_run(last_run_model.__data__))
+
+        return row
+
+    @classmethod
+    def refresh(cls, flow_ids: Iterable[str]) -> None:
+        '''Recompute the summaries of the flows.'''
+        rows = [cls.summarize(flow_id) for flow_id in set(flow_ids)]
+        if len(rows) > 0:
+            cls.insert_many(rows).on_conflict_replace().execute()
+
+    @classmethod
+    def _update_summary(cls, flow_id: str, values: Dict[str, Any]) -> None:
+        '''Update fields of the summary, or compute the whole summary if the flow has none yet.'''
+        updated_rows = (
+            cls.update(**values, modified_datetime=datetime.now())
+            .where(cls.flow == flow_id)
+            .execute()
+        )
+        if updated_rows == 0:
+            cls.refresh([flow_id])
+
+    @classmethod
+    def refresh_next_schedule(cls, flow_id: str) -> None:
+        '''Update the next schedule in the summary of the flow.'''
+        cls._update_summary(flow_id, cls._summarize_next_schedule(flow_id))
+
+    @classmethod
+    def record_runs(cls, rows: Iterable[Dict[str, Any]]) -> None:
+        '''Update the summaries by the saved rows of runs.
+
+        The latest row of each flow replaces its last run if the row isn't older, and the
+        window of finished runs is recomputed for flows whose saved runs have finished.
+        '''
+        def order_key(values: Dict[str, Any]) -> Tuple[datetime, datetime]:
+            return (
+                values['last_run_modified_datetime'] or datetime.min,
+                values['last_run_started_datetime'] or datetime.min
+            )
+
+        last_run_values_by_flow: Dict[str, Dict[str, Any]] = dict()
+        finished_flow_ids = set()
+        for row in rows:
+            status = FlowRunModel.status.python_value(FlowRunModel.status.db_value(row['status']))
+            if status in (FlowRunStatus.SCHEDULED, FlowRunStatus.SCHEDULED_BY_USER):
+                continue
+
+            if status in FINISHED_FLOW_RUN_STATUSES:
+                finished_flow_ids.add(row['flow'])
+
+            values = cls._summarize_last_run(row)
+            last_values = last_run_values_by_flow.get(row['flow'])
+            if last_values is None or order_key(values) >= order_key(last_values):
+                last_run_values_by_flow[row['flow']] = values
+
+        if len(last_run_values_by_flow) == 0:
+            return
+
+        stats_models = {
+            model.flow_id: model
+            for model in cls.select().where(cls.flow.in_(list(last_run_values_by_flow)))
+        }
+        for flow_id, values in last_run_values_by_flow.items():
+            stats_model = stats_models.get(flow_id)
+            if stats_model is None:
+                cls.refresh([flow_id])
+                continue
+
+            if stats_model.last_run_id != values['last_run_id'] \
+                    and order_key(values) < order_key(stats_model.__data__):
+                values = dict()
+
+            if flow_id in finished_flow_ids:
+                values.update(cls._summarize_window(flow_id))
+
+            if len(values) > 0:
+                cls._update_summary(flow_id, values)
@@ -1,8 +1,8 @@
-from ...enum import TableName
+from ...enum import ACTIVE_TASK_RUN_STATUSES, TableName, TaskRunStatus
 from ..base import BaseModel
 from ..common import (
     ForeignKeyField, SQL,
-    column_integer, column_small_string, column_medium_string, column_uuid_primary_key,
+    column_float, column_integer, column_medium_string, column_status, column_uuid_primary_key,
     column_text, column_datetime, column_current_datetime, column_modified_datetime
 )
 from ..log_models import TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel
@@ -26,6 +26,7 @@ class TaskModel(BaseModel):
         table_name = TableName.TASK.value
         constraints = [SQL('UNIQUE (flow_id, name)')]
         log_model = TaskLogModel
+        identity_cached = True
 
 
 class TaskDownstreamModel(BaseModel):
@@ -63,7 +64,12 @@ class TaskRunModel(BaseModel):
     retry_delay = column_integer(default=0)
     params = column_text(null=True)
     output = column_text(null=True)
-    status = column_small_string()
+    status = column_status(TaskRunStatus)
+
+    queue_seconds = column_float(null=True)
+    execution_seconds = column_float(null=True)
+    serialization_seconds = column_float(null=True)
+    persistence_seconds = column_float(null=True)
 
     created_datetime = column_current_datetime()
     modified_datetime = column_modified_datetime()
@@ -73,3 +79,35 @@ class TaskRunModel(BaseModel):
         table_name = TableName.TASK_RUN.value
         constraints = [SQL('UNIQUE (flow_run_id, task_id, attempt)')]
         log_model = TaskRunLogModel
+
+    @classmethod
+    def is_active(cls):
+        '''Condition of non-terminal runs, which matches the partial index of active runs.'''
+        return cls.status.in_inline(ACTIVE_TASK_RUN_STATUSES)
+
+
+TaskRunModel.add_index(
+    TaskRunModel.index(TaskRunModel.status, name='taskrunmodel_status_active')
+    .where(TaskRunModel.is_active())
+)
+
+
+class TaskRunBatchModel(BaseModel):
+    id = column_uuid_primary_key()
+    task_run = ForeignKeyField(
+        TaskRunModel,
+        backref='batches',
+        on_delete='CASCADE'
+    )
+    batch_index = column_integer()
+    size = column_integer()
+    status = column_status(TaskRunStatus)
+    error = column_text(null=True)
+
+    created_datetime = column_current_datetime()
+    modified_datetime = column_modified_datetime()
+    started_datetime = column_datetime(null=True)
+
+    class Meta:
+        table_name = TableName.TASK_RUN_BATCH.value
+        constraints = [SQL('UNIQUE (task_run_id, batch_index)')]
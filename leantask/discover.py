@@ -5,7 +5,8 @@ from pathlib import Path
 from typing import Dict, Set
 
 from .context import GlobalContext
-from .database import FlowModel
+from .database import FlowModel, FlowStatsModel, TaskModel
+from .database.identity import identity_map
 from .enum import FlowIndexStatus
 from .logging import get_logger
 from .utils.path import is_file_match_patterns, parse_gitignore_patterns
@@ -108,6 +109,13 @@ def index_flow(
     return FlowIndexStatus(flow_index_result.returncode)
 
 
+def invalidate_flow_model(flow_model: FlowModel) -> None:
+    '''Forget the flow and its tasks kept by the identity map, since they have been reindexed elsewhere.'''
+    identity_map.invalidate(FlowModel, flow_model.id)
+    # Task models are few and might have been removed along with the flow, thus all are forgotten.
+    identity_map.invalidate(TaskModel)
+
+
 def index_all_flows(
         flow_models: Set = None,
         log_file_path: Path = None
@@ -139,8 +147,12 @@ def index_all_flows(
         if flow_path not in flow_checksums:
             logger.info(f"Flow '{flow_model.name}' from '{flow_model.path}' has been removed.")
 
-            flow_model.delete_instance()
+            # Foreign keys aren't enforced, thus the summary isn't removed by its cascade.
+            with FlowModel._meta.database.atomic():
+                FlowStatsModel.delete().where(FlowStatsModel.flow == flow_model.id).execute()
+                flow_model.delete_instance()
             del updated_flow_models[flow_model]
+            invalidate_flow_model(flow_model)
 
             total_changes += 1
             continue
@@ -154,6 +166,7 @@ def index_all_flows(
             elif index_status in (FlowIndexStatus.FAILED, FlowIndexStatus.UNKNOWN):
                 total_errors += 1
 
+            invalidate_flow_model(flow_model)
             updated_flow_model = (
                 FlowModel.select()
                 .where(FlowModel.path == str(flow_path))
@@ -59,6 +59,9 @@ class FlowRunStatus(UnknownEnumMixin, Enum):
     RUNNING = 20
     '''Some tasks are running in the flow.'''
 
+    WAITING = 21
+    '''Some tasks are waiting for their condition, thus the flow is parked until the scheduler resumes it.'''
+
     FAILED = 30
     '''Tasks has been run, but the endpoint task in the flow is failed.'''
 
@@ -84,6 +87,9 @@ class TaskRunStatus(UnknownEnumMixin, Enum):
     CANCELED = 12
     '''The flow, task parent, has been canceled while waiting to run thus it's canceled.'''
 
+    WAITING = 15
+    '''The task is waiting for its condition to be met without occupying the flow process.'''
+
     RUNNING = 20
     '''The task is running.'''
 
@@ -105,6 +111,28 @@ class TaskRunStatus(UnknownEnumMixin, Enum):
     UNKNOWN = 1
 
 
+ACTIVE_FLOW_RUN_STATUSES = (
+    FlowRunStatus.SCHEDULED,
+    FlowRunStatus.SCHEDULED_BY_USER,
+    FlowRunStatus.PENDING,
+    FlowRunStatus.RUNNING,
+    FlowRunStatus.WAITING,
+)
+
+FINISHED_FLOW_RUN_STATUSES = (
+    FlowRunStatus.DONE,
+    FlowRunStatus.FAILED,
+    FlowRunStatus.FAILED_TIMEOUT_DELAY,
+    FlowRunStatus.FAILED_TIMEOUT_RUN,
+)
+
+ACTIVE_TASK_RUN_STATUSES = (
+    TaskRunStatus.SCHEDULED,
+    TaskRunStatus.PENDING,
+    TaskRunStatus.WAITING,
+    TaskRunStatus.RUNNING,
+)
+
 FAILED_TASK_RUN_STATUSES = (
     TaskRunStatus.FAILED,
     TaskRunStatus.FAILED_TIMEOUT_DELAY,
@@ -120,11 +148,13 @@ class TableName(Enum):
     FLOW = 'flows'
     FLOW_SCHEDULE = 'flow_schedules'
     FLOW_RUN = 'flow_runs'
+    FLOW_STATS = 'flow_stats'
 
     TASK = 'tasks'
     TASK_DOWNSTREAM = 'task_downstreams'
     TASK_SCHEDULE = 'task_schedules'
     TASK_RUN = 'task_runs'
+    TASK_RUN_BATCH = 'task_run_batches'
 
 
 class LogTableName(Enum):
@@ -2,11 +2,16 @@ from __future__ import annotations
 from enum import Enum
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, List, Optional
 
-from ..database import BaseModel
+from peewee import fn, chunked
+
+from ..context import GlobalContext
+from ..database import BaseModel, DeltaLogModel
 from ..database.common import ForeignKeyField
-from .output import TaskOutput, FileTaskOutput, JSONTaskOutput, UndefinedTaskOutput
+from ..database.identity import identity_map, is_identity_cached
+from ..database.journal import status_journal
+from .output import TaskOutput
 
 
 def _encode_non_serializable(value: Any):
@@ -16,28 +21,22 @@ def _encode_non_serializable(value: Any):
     elif isinstance(value, Enum):
         value = value.name
 
-    elif isinstance(value, JSONTaskOutput):
-        if value.value is not None:
-            value = _encode_non_serializable(value.value)
-        else:
-            value = None
-
-    elif isinstance(value, FileTaskOutput):
-        value = {
-            'output_path': _encode_non_serializable(value._output_path.resolve())
-        }
-
     elif isinstance(value, TaskOutput):
-        value = None
+        value = value.to_dict()
 
     return value
 
 
 def _encode(value: Any):
-    if isinstance(value, dict):
+    if isinstance(value, (dict, list)):
         value = json.dumps(value, default=_encode_non_serializable)
 
-    else:
+    elif isinstance(value, TaskOutput):
+        value = value.to_dict()
+        if value is not None:
+            value = json.dumps(value, default=_encode_non_serializable)
+
+    elif not isinstance(value, Enum):
         value = _encode_non_serializable(value)
 
     return value
@@ -46,18 +45,12 @@ def _encode(value: Any):
 def _decode(value: Any, target: Any):
     if isinstance(target, dict):
         value = json.loads(value)
-    elif isinstance(target, Enum):
+    elif isinstance(target, list):
+        value = json.loads(value) if value is not None else []
+    elif isinstance(target, Enum) and isinstance(value, str):
         value = getattr(target.__class__, value)
-    elif isinstance(target, TaskOutput) and value is None:
-        value = UndefinedTaskOutput()
-    elif isinstance(target, JSONTaskOutput):
-        value = JSONTaskOutput.loads(value)
-    elif isinstance(target, FileTaskOutput):
-        output_path = value.get('output_path')
-        if output_path is not None:
-            value = FileTaskOutput(Path(output_path))
-        else:
-            value = UndefinedTaskOutput
+    elif isinstance(target, TaskOutput):
+        value = TaskOutput.loads(value)
 
     return value
 
@@ -65,8 +58,9 @@ def _decode(value: Any, target: Any):
 class ModelMixin:
     __model__ = None
     __refs__ = None
+    __slots__ = ('_model', '_model_exists', '_logged_values', '_log_seq', '__weakref__')
 
-    def __init__(self, __id: str = None, **kwargs) -> None:
+    def __init__(self, __id: str = None, __model: BaseModel = None, **kwargs) -> None:
         if not issubclass(self.__model__, BaseModel):
             raise TypeError()
 
@@ -75,24 +69,42 @@ class ModelMixin:
 
         self._model = None
         self._model_exists = False
+        self._logged_values = None
+        self._log_seq = None
 
-        self._setup_model_from_id(__id)
+        if __model is not None:
+            self._model = __model
+            self._model_exists = True
+        else:
+            self._setup_model_from_id(__id)
 
         if self._model is None:
             self._setup_model_from_fields(**kwargs)
 
         if self._model is None:
             self._setup_model_new()
+            self._logged_values = dict()
+            self._log_seq = 0
 
         if self._model_exists:
+            self._keep_model()
             self._set_attributes_from_model()
 
     @property
     def id(self) -> str:
         return self._model.id
 
+    def _keep_model(self) -> None:
+        '''Keep the saved model in the identity map, if its class is cached.'''
+        if is_identity_cached(self.__model__):
+            identity_map.add([self._model])
+
     def _setup_model_from_id(self, __id: str = None) -> None:
-        if __id is not None:
+        if __id is not None and is_identity_cached(self.__model__):
+            self._model = identity_map.get(self.__model__, __id)
+            self._model_exists = self._model is not None
+
+        elif __id is not None:
             try:
                 self._model = (
                     self.__model__.select()
@@ -139,15 +151,22 @@ class ModelMixin:
         if not self._model_exists:
             raise AttributeError('You need to setup the model first.')
 
+        status_journal.flush()
+
         self._model = (
             self.__model__.select()
             .where(self.__model__.id == self._model.id)
             .limit(1)
             [0]
         )
+        self._keep_model()
         self._set_attributes_from_model()
+        # The model might have been saved elsewhere, thus the next log row is written in full.
+        self._logged_values = None
+        self._log_seq = None
 
-    def save(self) -> None:
+    def _sync_model(self) -> Dict[str, Any]:
+        '''Copy attributes to the model and return fields of its log model.'''
         log_kwargs = dict()
         for key, field in self._model._meta.fields.items():
             log_key = key
@@ -164,9 +183,88 @@ class ModelMixin:
             setattr(self._model, key, _encode(value))
             log_kwargs[log_key] = getattr(self._model, key)
 
+        return log_kwargs
+
+    def _next_log_seq(self) -> int:
+        if self._log_seq is None:
+            log_model = self.__model__._meta.log_model
+            max_seq = (
+                log_model.select(fn.MAX(log_model.seq))
+                .where(log_model.ref_id == self._model.id)
+                .scalar()
+            )
+            self._log_seq = 0 if max_seq is None else max_seq + 1
+
+        seq = self._log_seq
+        self._log_seq += 1
+        return seq
+
+    def _log_delta(self, log_kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        '''Return fields of the next log row, only those changed since the last saved one.
+
+        The first save of a loaded object writes every field, since its last log row is unknown.
+        Returns None if nothing has changed.
+        '''
+        log_model = self.__model__._meta.log_model
+        if not issubclass(log_model, DeltaLogModel):
+            return log_kwargs
+
+        delta_kwargs = log_model.delta(self._logged_values, log_kwargs)
+        if delta_kwargs is not None:
+            delta_kwargs['seq'] = self._next_log_seq()
+            self._logged_values = log_kwargs
+
+        return delta_kwargs
+
+    def save(self, deferred: bool = False) -> None:
+        '''Save the model and its log.
+
+        Update of an existing model goes through the status journal. If 'deferred',
+        it\'s written later in a group commit, otherwise the journal is flushed right away.
+        '''
+        log_kwargs = self._log_delta(self._sync_model())
+
+        if self._model_exists and GlobalContext.STATUS_JOURNAL:
+            status_journal.put(self._model, log_kwargs)
+            if not deferred:
+                status_journal.flush()
+            return
+
         with self._model._meta.database.atomic():
             self._model.save(force_insert=not self._model_exists)
             self._model_exists = True
-
-            log_model = self._model._meta.log_model(**log_kwargs)
-            log_model.save(force_insert=True)
+            self._keep_model()
+
+            if log_kwargs is not None:
+                log_model = self._model._meta.log_model(**log_kwargs)
+                log_model.save(force_insert=True)
+
+    @classmethod
+    def save_many(cls, objs: List[ModelMixin], batch_size: int = 100) -> None:
+        '''Insert new objects and their logs in bulk within a single transaction.'''
+        rows = []
+        log_rows = []
+        log_model = cls.__model__._meta.log_model
+        for obj in objs:
+            if obj._model_exists:
+                raise ValueError(f'{obj} has already been saved.')
+
+            log_kwargs = obj._log_delta(obj._sync_model())
+            rows.append(obj._model.__data__)
+            if log_kwargs is not None:
+                log_data = log_model(**log_kwargs).__data__
+                # Delta rows have different fields, while 'insert_many' takes columns of the first row.
+                log_rows.append({name: log_data.get(name) for name in log_model._meta.fields})
+
+        with cls.__model__._meta.database.atomic():
+            for batch in chunked(rows, batch_size):
+                cls.__model__.insert_many(batch).execute()
+            cls.__model__.rows_written(rows)
+
+            with log_model._meta.database.atomic():
+                for batch in chunked(log_rows, batch_size):
+                    log_model.insert_many(batch).execute()
+
+        for obj in objs:
+            obj._model_exists = True
+            obj._keep_model()
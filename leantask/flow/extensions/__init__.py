@@ -1 +1,2 @@
 from .python_task import python_task
+from .sensor import FileSensor
@@ -1,27 +1,59 @@
+from __future__ import annotations
+
+import inspect
 import logging
+import os
+from concurrent import futures
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 
+from ...context import GlobalContext
+from ...enum import TaskRunStatus
+from ...logging import get_logger_log_file_path
+from ...utils.profile import PROFILE_TYPES, get_profile_path, profile_run, profile_thread
+from ..output import ArrayTaskOutput, FileTaskOutput, JSONTaskOutput, StreamTaskOutput
 from ..task import Task
 
 
+def _iter_batches(items: Iterable[Any], batch_size: int) -> Iterable[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
 class PythonTask(Task):
+    __slots__ = ('_func', '_map_over', 'map_batch_size', 'map_max_workers', 'profile')
+
     def __init__(
             self,
             func: Callable,
             name: str = None,
             output_path: Path = None,
+            output_array: bool = False,
             retry_max: int = 0,
             retry_delay: int = 0,
             attrs: Dict[str, Any] = None,
             params: Dict[str, Any] = None,
+            profile: str = None,
             flow = None):
         if name is None:
             name = func.__name__
 
+        if profile is not None and profile not in PROFILE_TYPES:
+            raise ValueError(f"Task 'profile' should be one of {PROFILE_TYPES}, not '{profile}'.")
+
         super(PythonTask, self).__init__(
             name=name,
             output_path=output_path,
+            output_array=output_array,
+            output_stream=inspect.isgeneratorfunction(func),
             retry_max=retry_max,
             retry_delay=retry_delay,
             attrs=attrs,
@@ -30,12 +62,140 @@ class PythonTask(Task):
         )
 
         self._func = func
+        self.profile = profile
+
+        self._map_over: Task = None
+        self.map_batch_size: int = None
+        self.map_max_workers: int = None
+
+    def map(
+            self,
+            over: Task,
+            batch_size: int = 100,
+            max_workers: int = None
+        ) -> PythonTask:
+        '''Run the task for each item of the upstream task output in parallel batches.
+
+        Each item is passed to the function through 'item' keyword argument.
+        '''
+        if not isinstance(over, Task):
+            raise TypeError(f"Task could only be mapped over another Task, not '{type(over)}'.")
+
+        if 'item' not in self._func.__code__.co_varnames:
+            raise ValueError(f"Function of mapped task '{self.name}' should have 'item' argument.")
+
+        if self.output_stream:
+            raise ValueError(f"Streaming task '{self.name}' could not be mapped.")
+
+        if batch_size < 1:
+            raise ValueError('Batch size of mapped task should be at least 1.')
+
+        self.requires(over)
+        self._map_over = over
+        self.map_batch_size = batch_size
+        self.map_max_workers = max_workers
+        return self
+
+    def _iter_map_items(self) -> Iterable[Any]:
+        output = self._map_over._output
+        if isinstance(output, StreamTaskOutput):
+            return iter(output)
+
+        if isinstance(output, (ArrayTaskOutput, JSONTaskOutput)):
+            items = output.get()
+        elif isinstance(output, FileTaskOutput):
+            items = output.get(json=True)
+        else:
+            raise ValueError(f"Task '{self._map_over.name}' has no output to be mapped over.")
+
+        try:
+            return iter(items)
+        except TypeError:
+            raise TypeError(f"Output of task '{self._map_over.name}' is not iterable, thus it could not be mapped over.")
+
+    def _run_batch(
+            self,
+            items: List[Any],
+            func_kwargs: Dict[str, Any],
+            thread_profilers: List[Any] = None
+        ) -> Tuple[datetime, List[Any], Exception]:
+        started_datetime = datetime.now()
+        try:
+            with profile_thread(thread_profilers):
+                results = [self._func(item=item, **func_kwargs) for item in items]
+            return started_datetime, results, None
+
+        except Exception as exc:
+            return started_datetime, None, exc
+
+    def _run_mapped(
+            self,
+            func_kwargs: Dict[str, Any],
+            logger: logging.Logger,
+            thread_profilers: List[Any] = None
+        ) -> List[Any]:
+        task_run = self._runs[-1]
+        max_workers = self.map_max_workers
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+
+        batch_results: Dict[int, List[Any]] = dict()
+        total_items = 0
+        failed_batches = 0
+
+        def collect_batches(done_futures) -> None:
+            nonlocal failed_batches
+            for future in done_futures:
+                batch_index, batch_size = pending_batches.pop(future)
+                started_datetime, results, exc = future.result()
+                if exc is None:
+                    batch_results[batch_index] = results
+                    task_run.save_batch(batch_index, batch_size, TaskRunStatus.DONE, started_datetime)
+                    logger.debug(f'Batch #{batch_index} with {batch_size} item(s) is done.')
+                    continue
+
+                failed_batches += 1
+                task_run.save_batch(
+                    batch_index, batch_size, TaskRunStatus.FAILED, started_datetime,
+                    error=f'{exc.__class__.__name__}: {exc}'
+                )
+                logger.error(
+                    f'Batch #{batch_index} has failed. {exc.__class__.__name__}: {exc}',
+                    exc_info=(type(exc), exc, exc.__traceback__)
+                )
+
+        pending_batches: Dict[futures.Future, Tuple[int, int]] = dict()
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch_index, items in enumerate(_iter_batches(self._iter_map_items(), self.map_batch_size)):
+                if len(pending_batches) >= max_workers * 2:
+                    done_futures, _ = futures.wait(pending_batches, return_when=futures.FIRST_COMPLETED)
+                    collect_batches(done_futures)
+
+                total_items += len(items)
+                future = executor.submit(self._run_batch, items, func_kwargs, thread_profilers)
+                pending_batches[future] = (batch_index, len(items))
+
+            collect_batches(futures.wait(pending_batches).done)
+
+        total_batches = len(batch_results) + failed_batches
+        logger.info(
+            f'Mapped {total_items} item(s) in {total_batches} batch(es):'
+            f' {len(batch_results)} done, {failed_batches} failed.'
+        )
+        if failed_batches > 0:
+            raise RuntimeError(f'{failed_batches} of {total_batches} batch(es) of the mapped task have failed.')
+
+        return [
+            result
+            for batch_index in sorted(batch_results)
+            for result in batch_results[batch_index]
+        ]
 
     def run(
             self,
             run_params: Dict[str, Any],
             logger: logging.Logger
-        ):
+        ) -> Any:
         task_kwargs = dict()
         if 'logger' in self._func.__code__.co_varnames:
             task_kwargs['logger'] = logger
@@ -49,18 +209,37 @@ class PythonTask(Task):
         if 'run_params' in self._func.__code__.co_varnames:
             task_kwargs['run_params'] = run_params
 
-        output_obj = self._func(**self.params, **task_kwargs)
-        if self.output_path is not None:
-            with self.output().open('w') as f:
-                f.write(output_obj)
-        else:
-            self.output().set(output_obj)
+        if self.output_stream:
+            self.output().start(self._func(**self.params, **task_kwargs))
+            return
+
+        profile = self.profile if self.profile is not None else GlobalContext.PROFILE
+        if profile is None:
+            return self._call(task_kwargs, logger)
+
+        profile_path = get_profile_path(get_logger_log_file_path(logger), profile)
+        logger.info(f"Profile task run ({profile}) into '{profile_path}'.")
+        with profile_run(profile, profile_path) as thread_profilers:
+            return self._call(task_kwargs, logger, thread_profilers)
+
+    def _call(
+            self,
+            task_kwargs: Dict[str, Any],
+            logger: logging.Logger,
+            thread_profilers: List[Any] = None
+        ) -> Any:
+        if self._map_over is not None:
+            return self._run_mapped({**self.params, **task_kwargs}, logger, thread_profilers)
+
+        return self._func(**self.params, **task_kwargs)
 
 
 def python_task(
         *args,
         attrs: dict = None,
         output_file: bool = False,
+        output_array: bool = False,
+        profile: str = None
     ) -> Callable:
     '''Use @task decorator on your function to make it run as a Task.'''
     def task_decorator(func: Callable) -> Callable:
@@ -74,7 +253,7 @@ def python_task(
                 **task_kwargs
             ) -> Task:
             '''Register a new task function.'''
-            reserved_kwargs = {'attrs', 'inputs', 'logger', 'params', 'run_params'}
+            reserved_kwargs = {'attrs', 'inputs', 'item', 'logger', 'params', 'run_params'}
             params = dict()
             for key, value in task_kwargs.items():
                 if key in reserved_kwargs:
@@ -92,10 +271,12 @@ def python_task(
                 func,
                 name=task_name,
                 output_path=task_output_path,
+                output_array=output_array,
                 retry_max=task_retry_max,
                 retry_delay=task_retry_delay,
                 attrs=attrs,
                 params=params,
+                profile=profile,
                 flow=task_flow
             )
 
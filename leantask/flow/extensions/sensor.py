@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import glob
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+from ...context import GlobalContext
+from ..task import Task, TaskRun, TaskTimeoutError
+
+
+def match_sensor_files(
+        params: Dict[str, Any],
+        reference_datetime: datetime,
+        cache: Dict[str, List[str]] = None
+    ) -> List[str]:
+    '''Return files matching the sensor path, which are newer than 'newer_than' if it\'s set.
+
+    Matched paths are kept in 'cache' by their pattern, thus sensors watching the same path
+    are only checked once in a batched poll.
+    '''
+    path = params['path']
+    if cache is not None and path in cache:
+        paths = cache[path]
+    else:
+        if any(char in path for char in '*?['):
+            paths = sorted(glob.glob(path, recursive=True))
+        elif os.path.exists(path):
+            paths = [path]
+        else:
+            paths = []
+
+        if cache is not None:
+            cache[path] = paths
+
+    newer_than = params.get('newer_than')
+    if newer_than is None:
+        return paths
+
+    if isinstance(newer_than, str):
+        min_datetime = datetime.fromisoformat(newer_than)
+    else:
+        min_datetime = reference_datetime - timedelta(seconds=newer_than)
+
+    min_timestamp = min_datetime.timestamp()
+    matched_paths = []
+    for path in paths:
+        try:
+            if os.path.getmtime(path) > min_timestamp:
+                matched_paths.append(path)
+        except OSError:
+            continue
+
+    return matched_paths
+
+
+def is_sensor_timed_out(
+        params: Dict[str, Any],
+        waiting_since: datetime,
+        now: datetime = None
+    ) -> bool:
+    timeout = params.get('timeout')
+    if timeout is None:
+        return False
+
+    if now is None:
+        now = datetime.now()
+
+    return (now - waiting_since).total_seconds() > timeout
+
+
+def is_sensor_due(
+        params: Dict[str, Any],
+        reference_datetime: datetime,
+        waiting_since: datetime,
+        cache: Dict[str, List[str]] = None
+    ) -> bool:
+    '''Return True if the waiting sensor should be resumed, either its condition is met or it has timed out.'''
+    if params.get('sensor') != FileSensor.__sensor__:
+        return False
+
+    return is_sensor_timed_out(params, waiting_since) \
+        or len(match_sensor_files(params, reference_datetime, cache)) > 0
+
+
+class FileSensor(Task):
+    '''Task which waits for files to arrive without holding the flow process.
+
+    While no file matches the path (or glob pattern), the task run is parked as WAITING
+    and the flow process exits. The scheduler resumes the flow run once a file arrives.
+    Output of the task is the list of matched file paths.
+    '''
+    __sensor__ = 'file'
+    __slots__ = ()
+
+    def __init__(
+            self,
+            name: str,
+            path: Union[str, Path],
+            newer_than: Union[datetime, timedelta] = None,
+            timeout: int = None,
+            attrs: Dict[str, Any] = None,
+            flow = None
+        ) -> None:
+        '''Set 'newer_than' to only match files modified after the datetime, or within the timedelta
+        before the flow run schedule. Set 'timeout' in seconds to fail the task if it waits too long.
+        '''
+        path = Path(path)
+        if not path.is_absolute():
+            path = Path(GlobalContext.PROJECT_DIR) / path
+
+        if isinstance(newer_than, datetime):
+            newer_than = newer_than.isoformat()
+        elif isinstance(newer_than, timedelta):
+            newer_than = newer_than.total_seconds()
+        elif newer_than is not None:
+            raise TypeError(f"Sensor 'newer_than' should be a datetime or timedelta, not '{type(newer_than)}'.")
+
+        super(FileSensor, self).__init__(
+            name=name,
+            attrs=attrs,
+            params={
+                'sensor': self.__sensor__,
+                'path': str(path),
+                'newer_than': newer_than,
+                'timeout': timeout
+            },
+            flow=flow
+        )
+
+    def poke(self, task_run: TaskRun) -> bool:
+        if is_sensor_timed_out(self.params, task_run.created_datetime):
+            raise TaskTimeoutError(
+                f"No file matches '{self.params['path']}' after waiting for {self.params['timeout']}s."
+            )
+
+        return len(match_sensor_files(self.params, _get_reference_datetime(task_run))) > 0
+
+    def run(
+            self,
+            run_params: Dict[str, Any],
+            logger: logging.Logger
+        ) -> List[str]:
+        paths = match_sensor_files(self.params, _get_reference_datetime(self._runs[-1]))
+        logger.info(f"Found {len(paths)} file(s) matching '{self.params['path']}'.")
+        return paths
+
+
+def _get_reference_datetime(task_run: TaskRun) -> datetime:
+    if task_run.flow_run.schedule_datetime is not None:
+        return task_run.flow_run.schedule_datetime
+
+    return task_run.created_datetime
@@ -1,27 +1,33 @@
 from __future__ import annotations
 
 import inspect
-from collections import OrderedDict
+import logging
+import sys
+from collections import OrderedDict, deque
 from datetime import datetime
 from pathlib import Path
 from time import sleep
-from typing import Any, Dict, List, Set, Union
+from typing import Any, Deque, Dict, List, Set, Union
 
 from ..context import GlobalContext
 from ..database import (
     FlowModel, FlowRunModel, FlowScheduleModel,
-    TaskDownstreamModel, TaskDownstreamLogModel,
+    TaskModel, TaskDownstreamModel, TaskDownstreamLogModel, TaskRunModel,
     database
 )
+from ..database.identity import identity_map
+from ..database.migration import SchemaVersionError, check_schema_version
 from ..enum import FlowIndexStatus, FlowRunStatus, TaskRunStatus, FAILED_TASK_RUN_STATUSES
-from ..logging import get_flow_run_logger
+from ..logging import get_flow_run_logger, get_local_logger, release_logger
 from ..utils.script import calculate_md5
 from ..utils.string import obj_repr, validate_use_safe_chars
-from ..utils.tree import sort_tree_nodes
+from ..utils.tree import DAGIndex
 from .base import ModelMixin
 from .context import FlowContext
+from .output import ArrayTaskOutput, FileTaskOutput, TaskOutput, UndefinedTaskOutput
 from .schedule import Schedule
 from .task import Task, TaskRun
+from .trigger import validate_triggers
 
 
 class Flow(ModelMixin):
@@ -37,9 +43,13 @@ class Flow(ModelMixin):
             start_datetime: datetime = None,
             end_datetime: datetime = None,
             max_delay: int = None,
+            triggers: Union[str, List[str]] = None,
             active: bool = True,
             flow_id: str = None
         ) -> None:
+        '''Set 'triggers' to run the flow once an upstream flow is done ('upstream_flow'),
+        or once the file output of an upstream task is updated ('upstream_flow:task_name').
+        '''
         if self.__context__.__defined__ is not None:
             raise RuntimeError('You can only define one flow.')
         self.__context__.__defined__ = self
@@ -47,6 +57,7 @@ class Flow(ModelMixin):
         self.name = name
         self.description = description
         self.max_delay = max_delay
+        self.triggers = validate_triggers(triggers)
         self.active = active
 
         self._start_datetime = start_datetime
@@ -57,11 +68,24 @@ class Flow(ModelMixin):
         else:
             self._schedule = None
 
-        self._path = GlobalContext.relative_path(Path(inspect.stack()[1].filename).resolve())
+        caller_path = Path(inspect.stack()[1].filename).resolve()
+        self._path = GlobalContext.relative_path(caller_path)
         self._checksum = calculate_md5(self._path)
 
+        try:
+            check_schema_version()
+        except SchemaVersionError as exc:
+            # Flow file is run as CLI, thus it exits before its model is queried.
+            if caller_path != Path(sys.argv[0]).resolve():
+                raise
+
+            get_local_logger('flow').error(str(exc))
+            raise SystemExit(FlowRunStatus.UNKNOWN.value)
+
         self._tasks: Set[Task] = set()
-        self._runs: List[FlowRun] = []
+        self._task_names: Dict[str, Task] = dict()
+        self._dag_index: DAGIndex = None
+        self._runs: Deque[FlowRun] = deque(maxlen=GlobalContext.RUN_HISTORY_SIZE)
 
         super(Flow, self).__init__(
             flow_id,
@@ -104,12 +128,36 @@ class Flow(ModelMixin):
 
     @property
     def tasks_sorted(self) -> List[Task]:
-        return sort_tree_nodes(self._tasks, 'downstreams')
+        return list(self.dag_index.nodes)
 
     @property
-    def runs(self) -> List[FlowRun]:
+    def tasks_levels(self) -> List[List[Task]]:
+        '''Tasks grouped by topological levels, tasks of a level could be run in parallel.'''
+        return [list(level) for level in self.dag_index.levels]
+
+    @property
+    def dag_index(self) -> DAGIndex:
+        '''Compiled index of the tasks which is rebuilt after the flow graph is changed.'''
+        if self._dag_index is None:
+            self._dag_index = DAGIndex(self._tasks, 'downstreams', key_attr='name')
+
+        return self._dag_index
+
+    def invalidate_dag_index(self) -> None:
+        self._dag_index = None
+
+    @property
+    def runs(self) -> Deque[FlowRun]:
+        '''Latest runs of the flow which are kept up to 'GlobalContext.RUN_HISTORY_SIZE'.'''
         return self._runs
 
+    def _keep_model(self) -> None:
+        '''Keep the flow model along with its task models, which are loaded in a single query.'''
+        super(Flow, self)._keep_model()
+        # Tasks are defined after the flow has been set up, later saves keep their own models.
+        if len(self._tasks) == 0:
+            identity_map.add(TaskModel.select().where(TaskModel.flow == self._model.id))
+
     def _setup_model_from_fields(
             self,
             path: Path = None,
@@ -154,15 +202,17 @@ class Flow(ModelMixin):
         if not isinstance(task, Task):
             raise TypeError()
 
-        registered_task_names = set(task.name for task in self._tasks)
         new_tasks = [task] + list(task.iter_downstream())
         for task in new_tasks:
-            if task.name in registered_task_names:
+            if self._task_names.get(task.name, task) is not task:
                 raise ValueError(f"'{task.name}' is already registered in the flow.")
 
             self._tasks.add(task)
+            self._task_names[task.name] = task
             task._flow = self
 
+        self.invalidate_dag_index()
+
     def add_run(self, flow_run: FlowRun) -> None:
         if not isinstance(flow_run, FlowRun):
             raise TypeError()
@@ -188,7 +238,8 @@ class Flow(ModelMixin):
             if flow_run.status in (
                     FlowRunStatus.SCHEDULED,
                     FlowRunStatus.SCHEDULED_BY_USER,
-                    FlowRunStatus.PENDING
+                    FlowRunStatus.PENDING,
+                    FlowRunStatus.WAITING
                 ):
                 flow_run.status = FlowRunStatus.RUNNING
 
@@ -231,6 +282,9 @@ class Flow(ModelMixin):
                     log_model.save(force_insert=True)
 
     def index(self) -> FlowIndexStatus:
+        # Raise error early if tasks could not be sorted.
+        self.dag_index
+
         self._checksum = calculate_md5(self.path)
         if self._model_exists and self._model.checksum == self._checksum:
             return FlowIndexStatus.UNCHANGED
@@ -239,9 +293,9 @@ class Flow(ModelMixin):
         return FlowIndexStatus.UPDATED
 
     def get_task(self, name: str) -> Task:
-        for task in self._tasks:
-            if task.name == name:
-                return task
+        task = self.dag_index.get(name)
+        if task is not None:
+            return task
 
         raise IndexError(f"No task named '{name}' was found.")
 
@@ -260,7 +314,6 @@ class Flow(ModelMixin):
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         import inspect
-        import sys
         from ..cli.flow import run_cli
 
         self.__context__.__active__ = None
@@ -273,6 +326,11 @@ class Flow(ModelMixin):
 class FlowRun(ModelMixin):
     __model__ = FlowRunModel
     __refs__ = ('id', 'flow', 'flow_schedule_id')
+    __slots__ = (
+        'flow', 'params', 'flow_schedule_id', 'schedule_datetime', 'is_manual', 'max_delay',
+        'created_datetime', 'modified_datetime', 'started_datetime',
+        '_task_runs_sorted', '_status', '_logger'
+    )
 
     def __init__(
             self,
@@ -297,19 +355,18 @@ class FlowRun(ModelMixin):
 
         self._task_runs_sorted: OrderedDict[Task, TaskRun] = OrderedDict()
         self._status = FlowRunStatus.UNKNOWN
+        self._logger: logging.Logger = None
 
         super(FlowRun, self).__init__(run_id)
 
         self.flow.add_run(self)
 
-        self.logger = get_flow_run_logger(self.flow.id, self.id)
-
         if not self._model_exists:
             self.logger.debug(f"Set initial status for flow run to '{status.name}'.")
             self.status = status
 
         else:
-            self._status = getattr(FlowRunStatus, self._model.status)
+            self._status = self._model.status
             self.flow_schedule_id = self._model.flow_schedule_id
 
     @property
@@ -320,6 +377,13 @@ class FlowRun(ModelMixin):
     def flow_name(self) -> str:
         return self.flow.name
 
+    @property
+    def logger(self) -> logging.Logger:
+        if self._logger is None:
+            self._logger = get_flow_run_logger(self.flow.id, self.id)
+
+        return self._logger
+
     @property
     def task_runs_sorted(self) -> OrderedDict[Task, TaskRun]:
         return self._task_runs_sorted
@@ -338,6 +402,15 @@ class FlowRun(ModelMixin):
         if self._status == FlowRunStatus.DONE or (
                 value not in (FlowRunStatus.UNKNOWN, FlowRunStatus.DONE)
                 and value.value <= self._status.value
+                and not (
+                    self._status == FlowRunStatus.WAITING
+                    and value in (
+                        FlowRunStatus.PENDING,
+                        FlowRunStatus.RUNNING,
+                        FlowRunStatus.CANCELED,
+                        FlowRunStatus.CANCELED_BY_USER
+                    )
+                )
             ):
             raise ValueError(
                 f"Run status of flow '{self.flow.name}' cannot be set to similar or backward state from "
@@ -352,11 +425,20 @@ class FlowRun(ModelMixin):
         if self._status == FlowRunStatus.RUNNING:
             self.started_datetime = self.modified_datetime
             self._model.started_datetime = self.started_datetime
-        self.save()
+        self.save(deferred=self._status in (
+            FlowRunStatus.SCHEDULED,
+            FlowRunStatus.SCHEDULED_BY_USER,
+            FlowRunStatus.PENDING,
+            FlowRunStatus.RUNNING
+        ))
 
         if self._status == FlowRunStatus.RUNNING:
             for task_run in self.task_runs_sorted.values():
-                if task_run.status != TaskRunStatus.PENDING:
+                if task_run.status not in (
+                        TaskRunStatus.PENDING,
+                        TaskRunStatus.WAITING,
+                        TaskRunStatus.DONE
+                    ):
                     task_run.status = TaskRunStatus.PENDING
 
         elif self._status in (
@@ -366,7 +448,8 @@ class FlowRun(ModelMixin):
             for task_run in self._task_runs_sorted.values():
                 if task_run.status in (
                         TaskRunStatus.SCHEDULED,
-                        TaskRunStatus.PENDING
+                        TaskRunStatus.PENDING,
+                        TaskRunStatus.WAITING
                     ):
                     task_run.status = TaskRunStatus.CANCELED
 
@@ -381,7 +464,8 @@ class FlowRun(ModelMixin):
 
         if task_run.status not in (
                 TaskRunStatus.SCHEDULED,
-                TaskRunStatus.PENDING
+                TaskRunStatus.PENDING,
+                TaskRunStatus.WAITING
             ):
             self.logger.info(
                 f"Task '{task_run.task.name}' is flagged as '{task_run.status.name}'"
@@ -396,6 +480,14 @@ class FlowRun(ModelMixin):
             if task_run.status in (TaskRunStatus.DONE, TaskRunStatus.CANCELED):
                 break
 
+            if task_run.status == TaskRunStatus.WAITING:
+                self.logger.info(f"Task '{task_run.task.name}' is waiting for its condition to be met.")
+                return task_run.status
+
+            if task_run.status == TaskRunStatus.RUNNING:
+                self.logger.info(f"Task '{task_run.task.name}' is streaming its output to the downstream task(s).")
+                return task_run.status
+
             if task_run.attempt > task_run.retry_max:
                 self.logger.info(
                     f"There's a fail while executing task '{task_run.task.name}'."
@@ -411,13 +503,9 @@ class FlowRun(ModelMixin):
             sleep(task_run.retry_delay)
             task_run = task_run.next_attempt()
 
-        if task_run.status in (TaskRunStatus.FAILED, TaskRunStatus.FAILED_BY_USER):
+        if task_run.status in FAILED_TASK_RUN_STATUSES:
             self.logger.info(f"Task '{task_run.task.name}' has failed on all of its attempts.")
-            for downstream_task_run in task_run.iter_downstream():
-                self.logger.info(
-                    f"Set task '{downstream_task_run.task.name}' status to '{TaskRunStatus.FAILED_UPSTREAM.name}'."
-                )
-                downstream_task_run.status = TaskRunStatus.FAILED_UPSTREAM
+            self._fail_downstream_task_runs(task_run)
 
         self.logger.info(
             f"Executed task '{task_run.task.name}' with final status: '{task_run.status.name}'."
@@ -425,6 +513,41 @@ class FlowRun(ModelMixin):
         )
         return task_run.status
 
+    def _fail_downstream_task_runs(self, task_run: TaskRun) -> None:
+        for downstream_task_run in task_run.iter_downstream():
+            if downstream_task_run.status not in (
+                    TaskRunStatus.SCHEDULED,
+                    TaskRunStatus.PENDING
+                ):
+                continue
+
+            self.logger.info(
+                f"Set task '{downstream_task_run.task.name}' status to '{TaskRunStatus.FAILED_UPSTREAM.name}'."
+            )
+            downstream_task_run.status = TaskRunStatus.FAILED_UPSTREAM
+
+    def _finish_streaming_task_runs(self, force: bool = False) -> None:
+        '''Finish streaming task runs whose downstream task runs have all been executed.'''
+        unfinished_statuses = (
+            TaskRunStatus.SCHEDULED,
+            TaskRunStatus.PENDING,
+            TaskRunStatus.RUNNING
+        )
+        for task_run in reversed(self._task_runs_sorted.values()):
+            if task_run.status != TaskRunStatus.RUNNING:
+                continue
+
+            if not force and any(
+                    self._task_runs_sorted[downstream_task].status in unfinished_statuses
+                    for downstream_task in task_run.task.downstreams
+                ):
+                continue
+
+            self.logger.info(f"Wait for task '{task_run.task.name}' to finish streaming its output.")
+            task_run.finish_stream()
+            if task_run.status in FAILED_TASK_RUN_STATUSES:
+                self._fail_downstream_task_runs(task_run)
+
     def execute(self) -> FlowRunStatus:
         self.logger.info(f"Run flow '{self.flow.name}'.")
 
@@ -434,20 +557,45 @@ class FlowRun(ModelMixin):
             self.logger.error('No task run was found.')
             has_failed = True
 
+        # Downstream of waiting task runs are left pending until the flow run is resumed.
+        blocked_task_runs: Set[TaskRun] = set()
         try:
             for task_run in task_runs:
-                if task_run.status in FAILED_TASK_RUN_STATUSES:
+                if task_run.status in FAILED_TASK_RUN_STATUSES \
+                        or task_run in blocked_task_runs:
                     continue
 
                 task_run_status = self.execute_task_run(task_run)
                 if task_run_status in FAILED_TASK_RUN_STATUSES:
                     has_failed = True
 
+                elif task_run_status == TaskRunStatus.WAITING:
+                    blocked_task_runs.update(task_run.iter_downstream())
+
+                self._finish_streaming_task_runs()
+
+            self._finish_streaming_task_runs(force=True)
+            if any(
+                    task_run.status in FAILED_TASK_RUN_STATUSES
+                    for task_run in task_runs
+                ):
+                has_failed = True
+
             if has_failed:
                 self.logger.debug(
                     f"Set flow status to '{FlowRunStatus.FAILED.name}' due to failure on at least a task."
                 )
                 self.status = FlowRunStatus.FAILED
+                for task_run in task_runs:
+                    if task_run.status == TaskRunStatus.WAITING:
+                        task_run.status = TaskRunStatus.CANCELED
+
+            elif any(task_run.status == TaskRunStatus.WAITING for task_run in task_runs):
+                self.logger.debug(
+                    f"Set flow status to '{FlowRunStatus.WAITING.name}' to be resumed by the scheduler."
+                )
+                self.status = FlowRunStatus.WAITING
+
             else:
                 self.logger.debug(f"Set flow status '{FlowRunStatus.DONE.name}'.")
                 self.status = FlowRunStatus.DONE
@@ -471,8 +619,15 @@ class FlowRun(ModelMixin):
             except IndexError:
                 pass
 
+        self.release_logger()
         return self._status
 
+    def release_logger(self) -> None:
+        '''Close log file of the flow run, it will be reopened if the flow run logs again.'''
+        if self._logger is not None:
+            release_logger(self._logger)
+            self._logger = None
+
     def total_seconds(self) -> Union[float, None]:
         if self._status in (
                 FlowRunStatus.DONE,
@@ -486,21 +641,60 @@ class FlowRun(ModelMixin):
             self,
             status: TaskRunStatus = TaskRunStatus.PENDING
         ) -> None:
-        task_run_ids = dict()
+        task_run_models: Dict[str, TaskRunModel] = dict()
         if self._model_exists:
-            task_run_ids = {
-                model.task.id: model.id
-                for model in self._model.task_runs
-            }
+            for model in self._model.task_runs.order_by(TaskRunModel.attempt):
+                task_run_models[model.task_id] = model
 
+        new_task_runs = []
         for task in self.flow.tasks_sorted:
-            TaskRun(
+            task_run = TaskRun(
                 self,
                 task=task,
                 attempt=1,
                 status=status,
-                run_id=task_run_ids.get(task.id)
+                model=task_run_models.get(task.id),
+                deferred=True
+            )
+            if not task_run._model_exists:
+                new_task_runs.append(task_run)
+
+            # Done task runs of a resumed flow run pass their outputs to the downstream tasks.
+            elif task_run.status == TaskRunStatus.DONE:
+                task._output = task_run.output
+
+        TaskRun.save_many(new_task_runs)
+
+    def resume_task_runs(self, flow_run_model: FlowRunModel) -> None:
+        '''Restore done task runs from another flow run, thus only its unfinished tasks will be executed.'''
+        done_task_run_models = {
+            model.task_id: model
+            for model in (
+                flow_run_model.task_runs
+                .where(TaskRunModel.status == TaskRunStatus.DONE)
             )
+        }
+
+        for task, task_run in self._task_runs_sorted.items():
+            task_run_model = done_task_run_models.get(task.id)
+            if task_run_model is None:
+                continue
+
+            try:
+                output = TaskOutput.loads(task_run_model.output)
+            except ValueError:
+                output = UndefinedTaskOutput()
+
+            if isinstance(output, UndefinedTaskOutput) \
+                    or (isinstance(output, (ArrayTaskOutput, FileTaskOutput)) and not output.exists()):
+                self.logger.info(
+                    f"Output of task '{task.name}' from task run '{task_run_model.id}' cannot be restored,"
+                    ' thus it will be rerun.'
+                )
+                continue
+
+            self.logger.info(f"Restore output of task '{task.name}' from task run '{task_run_model.id}'.")
+            task_run.restore(output)
 
     def __repr__(self) -> str:
         return obj_repr(self, 'flow_id', 'flow_name', 'status')
@@ -1,13 +1,51 @@
 from __future__ import annotations
 import json
+import mmap
+import pickle
+import queue
+import sys
+import threading
 from pathlib import Path
-from typing import Any, IO
+from typing import Any, Dict, IO, Iterable, Iterator, Type, Union
+
+TASK_OUTPUT_TYPES: Dict[str, Type[TaskOutput]] = dict()
+
+
+class TaskOutput:
+    __type__: str = None
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.__type__ is not None:
+            TASK_OUTPUT_TYPES[cls.__type__] = cls
+
+    def to_dict(self) -> Union[Dict[str, Any], None]:
+        '''Return a JSON serializable reference of the output to be persisted.'''
+        return None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> TaskOutput:
+        '''Restore output from its persisted reference.'''
+        output_class = TASK_OUTPUT_TYPES.get(data.get('type'))
+        if output_class is None:
+            return UndefinedTaskOutput()
+
+        return output_class.from_dict(data)
+
+    @classmethod
+    def loads(cls, json_string: Union[str, None]) -> TaskOutput:
+        if json_string is None:
+            return UndefinedTaskOutput()
+
+        return TaskOutput.from_dict(json.loads(json_string))
+
 
-class TaskOutput: ...
 class UndefinedTaskOutput(TaskOutput): ...
 
 
 class JSONTaskOutput(TaskOutput):
+    __type__ = 'json'
+
     def __init__(self) -> None:
         self._value = None
 
@@ -28,14 +66,20 @@ class JSONTaskOutput(TaskOutput):
     def dumps(self) -> str:
         return json.dumps(self._value)
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {'type': self.__type__, 'value': self._value}
+
     @classmethod
-    def loads(self, json_string: str) -> JSONTaskOutput:
+    def from_dict(cls, data: Dict[str, Any]) -> JSONTaskOutput:
         output = JSONTaskOutput()
-        output.value = json.loads(json_string)
+        output.value = data.get('value')
+        return output
 
 
 class FileTaskOutput(TaskOutput):
     '''Basic file output class from Task output.'''
+    __type__ = 'file'
+
     def __init__(
             self,
             output_path: Path = None,
@@ -65,3 +109,304 @@ class FileTaskOutput(TaskOutput):
 
     def exists(self) -> bool:
         return self._output_path.exists()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'type': self.__type__, 'output_path': str(self._output_path.resolve())}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> TaskOutput:
+        output_path = data.get('output_path')
+        if output_path is None:
+            return UndefinedTaskOutput()
+
+        return FileTaskOutput(Path(output_path))
+
+
+def _is_ndarray(value: Any) -> bool:
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+class ArrayTaskOutput(TaskOutput):
+    '''Output of numeric arrays or raw buffers which is stored on disk
+    and read by downstream tasks as read-only memory-mapped views.
+
+    The value could be a NumPy array, a bytes-like object, or a dict of them.
+    '''
+    __type__ = 'array'
+
+    def __init__(
+            self,
+            output_dir: Path,
+            file_names: Dict[str, str] = None,
+            is_dict: bool = False
+        ) -> None:
+        self._output_dir = output_dir
+        self._file_names = file_names if file_names is not None else dict()
+        self._is_dict = is_dict
+        self._value = None
+
+    def get(self) -> Any:
+        if self._value is None:
+            values = {
+                name: self._load_file(self._output_dir / file_name)
+                for name, file_name in self._file_names.items()
+            }
+            self._value = values if self._is_dict else values.get('output')
+
+        return self._value
+
+    def set(self, value: Any) -> None:
+        self._is_dict = isinstance(value, dict)
+        values = value if self._is_dict else {'output': value}
+
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        self._file_names = dict()
+        self._value = None
+        for name, array in values.items():
+            if _is_ndarray(array):
+                import numpy
+
+                file_name = f'{name}.npy'
+                numpy.save(self._output_dir / file_name, array, allow_pickle=False)
+
+            else:
+                try:
+                    buffer = memoryview(array)
+                except TypeError:
+                    raise TypeError(
+                        f"Array output '{name}' must be a NumPy array or bytes-like object, not '{type(array)}'."
+                    )
+
+                file_name = f'{name}.bin'
+                with open(self._output_dir / file_name, 'wb') as f:
+                    f.write(buffer)
+
+            self._file_names[name] = file_name
+
+    def exists(self) -> bool:
+        return len(self._file_names) > 0 and all(
+            (self._output_dir / file_name).exists()
+            for file_name in self._file_names.values()
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'type': self.__type__,
+            'output_dir': str(self._output_dir.resolve()),
+            'file_names': self._file_names,
+            'is_dict': self._is_dict
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> TaskOutput:
+        output_dir = data.get('output_dir')
+        if output_dir is None:
+            return UndefinedTaskOutput()
+
+        return ArrayTaskOutput(
+            Path(output_dir),
+            file_names=data.get('file_names'),
+            is_dict=data.get('is_dict', False)
+        )
+
+    @staticmethod
+    def _load_file(file_path: Path) -> Any:
+        if file_path.suffix == '.npy':
+            import numpy
+
+            return numpy.load(file_path, mmap_mode='r', allow_pickle=False)
+
+        with open(file_path, 'rb') as f:
+            if file_path.stat().st_size == 0:
+                return memoryview(b'')
+
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+_STREAM_END = object()
+
+
+class StreamTaskOutput(TaskOutput):
+    '''Output of a generator task which is fed to downstream tasks chunk by chunk
+    while the producer is still running.
+
+    Chunks are passed through a bounded in-memory queue to a single consumer.
+    If 'spool_path' is set, chunks are spooled to a file instead, thus any number
+    of consumers could read them at their own pace.
+    '''
+    __type__ = 'stream'
+
+    def __init__(
+            self,
+            buffer_size: int = 100,
+            spool_path: Path = None
+        ) -> None:
+        self._buffer_size = buffer_size
+        self._spool_path = spool_path
+
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._queue_consumed = False
+        self._queue_drained = False
+        self._count = 0
+        self._condition = threading.Condition()
+        self._closed = threading.Event()
+        self._finished = threading.Event()
+        self._stopped = False
+        self._error: BaseException = None
+        self._thread: threading.Thread = None
+
+    @property
+    def error(self) -> Union[BaseException, None]:
+        return self._error
+
+    def start(self, generator: Iterable[Any]) -> None:
+        '''Start producing chunks from the generator in a background thread.'''
+        if self._spool_path is not None:
+            self._spool_path.parent.mkdir(parents=True, exist_ok=True)
+            self._spool_path.write_bytes(b'')
+
+        self._thread = threading.Thread(
+            target=self._produce,
+            args=(generator, ),
+            daemon=True
+        )
+        self._thread.start()
+
+    def _produce(self, generator: Iterable[Any]) -> None:
+        spool_file = open(self._spool_path, 'ab') if self._spool_path is not None else None
+        try:
+            for chunk in generator:
+                if self._closed.is_set():
+                    self._stopped = True
+                    break
+
+                if spool_file is not None:
+                    pickle.dump(chunk, spool_file)
+                    spool_file.flush()
+                    with self._condition:
+                        self._count += 1
+                        self._condition.notify_all()
+
+                elif not self._put(chunk):
+                    self._stopped = True
+                    break
+
+        except BaseException as exc:
+            self._error = exc
+
+        finally:
+            if hasattr(generator, 'close'):
+                generator.close()
+
+            if spool_file is not None:
+                spool_file.close()
+
+            with self._condition:
+                self._finished.set()
+                self._condition.notify_all()
+
+            self._put(_STREAM_END)
+
+    def _put(self, chunk: Any) -> bool:
+        while not self._closed.is_set():
+            try:
+                self._queue.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def get(self) -> Iterator[Any]:
+        '''Iterate chunks of the stream.'''
+        if self._spool_path is not None:
+            return self._iter_spool()
+
+        if self._queue_consumed:
+            raise RuntimeError('In-memory stream could only be consumed once.')
+
+        self._queue_consumed = True
+        return self._iter_queue()
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.get()
+
+    def _iter_queue(self) -> Iterator[Any]:
+        while True:
+            chunk = self._queue.get()
+            if chunk is _STREAM_END:
+                self._queue_drained = True
+                break
+
+            yield chunk
+
+        self._raise_error()
+
+    def _iter_spool(self) -> Iterator[Any]:
+        total_read = 0
+        with open(self._spool_path, 'rb') as spool_file:
+            while True:
+                with self._condition:
+                    while total_read >= self._count and not self._finished.is_set():
+                        self._condition.wait()
+
+                    count = self._count
+
+                if total_read >= count:
+                    break
+
+                for _ in range(count - total_read):
+                    yield pickle.load(spool_file)
+
+                total_read = count
+
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError('Upstream stream has failed while producing chunks.') from self._error
+
+    def is_abandoned(self) -> bool:
+        '''Whether the in-memory stream has not been read to its end, thus its producer might be
+        blocked on the full queue. Spooled streams never block their producer.
+        '''
+        return self._spool_path is None and not self._queue_drained
+
+    def close(self) -> None:
+        '''Stop the producer if there\'s no more consumer.'''
+        self._closed.set()
+
+    def join(self, timeout: float = None) -> Union[BaseException, None]:
+        '''Wait for the producer to finish and return its error if any.'''
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        return self._error
+
+    def exists(self) -> bool:
+        return self._spool_path is not None and self._spool_path.exists()
+
+    def to_dict(self) -> Union[Dict[str, Any], None]:
+        if self._spool_path is None \
+                or not self._finished.is_set() \
+                or self._stopped \
+                or self._error is not None:
+            return None
+
+        return {
+            'type': self.__type__,
+            'spool_path': str(self._spool_path.resolve()),
+            'count': self._count
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> TaskOutput:
+        spool_path = data.get('spool_path')
+        if spool_path is None:
+            return UndefinedTaskOutput()
+
+        output = StreamTaskOutput(spool_path=Path(spool_path))
+        output._count = data.get('count', 0)
+        output._finished.set()
+        return output
@@ -1,26 +1,44 @@
 from __future__ import annotations
 import logging
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Generator, Iterable, List, Set, Union
+from time import perf_counter
+from typing import Any, Deque, Dict, Generator, Iterable, Set, Union
 
-from ..database import TaskModel, TaskRunModel
+from ..context import GlobalContext
+from ..database import TaskModel, TaskRunModel, TaskRunBatchModel
+from ..database.identity import identity_map
 from ..enum import TaskRunStatus
-from ..logging import get_task_run_logger
+from ..logging import get_task_run_logger, release_logger
 from ..utils.string import obj_repr, validate_use_safe_chars
 from .base import ModelMixin
 from .context import FlowContext
-from .output import FileTaskOutput, JSONTaskOutput, TaskOutput, UndefinedTaskOutput
+from .output import (
+    ArrayTaskOutput, FileTaskOutput, JSONTaskOutput, StreamTaskOutput,
+    TaskOutput, UndefinedTaskOutput
+)
+
+
+class TaskTimeoutError(TimeoutError):
+    '''Raised when the task has been waiting or running for too long.'''
 
 
 class Task(ModelMixin):
     __model__ = TaskModel
     __refs__ = ('id', 'flow')
+    __slots__ = (
+        '_upstreams', '_downstreams', '_name', '_flow',
+        'retry_max', 'retry_delay', 'attrs', 'params',
+        'output_path', 'output_array', 'output_stream', '_output', '_runs'
+    )
 
     def __init__(
             self,
             name: str,
             output_path: Path = None,
+            output_array: bool = False,
+            output_stream: bool = False,
             retry_max: int = 0,
             retry_delay: int = 0,
             attrs: Dict[str, Any] = None,
@@ -40,8 +58,10 @@ class Task(ModelMixin):
         if output_path is not None and not isinstance(output_path, Path):
             raise TypeError(f"Task 'output_path' must be a Path, not '{type(output_path)}'.")        
         self.output_path = output_path
+        self.output_array = output_array
+        self.output_stream = output_stream
         self._output = UndefinedTaskOutput()
-        self._runs: List[TaskRun] = []
+        self._runs: Deque[TaskRun] = deque(maxlen=GlobalContext.RUN_HISTORY_SIZE)
 
         self.flow = flow
 
@@ -86,7 +106,8 @@ class Task(ModelMixin):
         self._flow.add_task(self)
 
     @property
-    def runs(self) -> List[TaskRun]:
+    def runs(self) -> Deque[TaskRun]:
+        '''Latest runs of the task which are kept up to 'GlobalContext.RUN_HISTORY_SIZE'.'''
         return self._runs
 
     def _setup_model_from_fields(
@@ -95,6 +116,12 @@ class Task(ModelMixin):
             name: str = None
         ) -> None:
         if flow_id is not None and name is not None:
+            # Task models of the flow are prefetched along with the flow model.
+            self._model = identity_map.find(self.__model__, flow=flow_id, name=name)
+            if self._model is not None:
+                self._model_exists = True
+                return
+
             try:
                 self._model = (
                     self.__model__.select()
@@ -117,10 +144,25 @@ class Task(ModelMixin):
             self,
             run_params: Dict[str, Any],
             logger: logging.Logger
-        ) -> None:
-        '''Replace this method to be implemented by your new subclass.'''
+        ) -> Any:
+        '''Replace this method to be implemented by your new subclass.
+
+        Returned value is written as the task output, unless the output has been set within the method.
+        '''
         raise NotImplemented("You need to define Task 'run' method.")
 
+    def poke(self, task_run: TaskRun) -> bool:
+        '''Return False to park the task run as WAITING until its condition is met.'''
+        return True
+
+    def write_output(self, value: Any) -> None:
+        '''Write returned value of the task run as its output.'''
+        if self.output_path is not None:
+            with self.output().open('w') as f:
+                f.write(value)
+        else:
+            self.output().set(value)
+
     def inputs(self) -> Dict[str, Any]:
         '''Get inputs of this task.'''
         task_inputs = dict()
@@ -132,16 +174,42 @@ class Task(ModelMixin):
                 if not task._output.exists():
                     raise ValueError(f"Output file from task '{task.name}' is not exists.")
 
+            elif isinstance(task._output, ArrayTaskOutput):
+                if not task._output.exists():
+                    raise ValueError(f"Output array from task '{task.name}' is not exists.")
+
             task_inputs[task.name] = task._output
 
         return task_inputs
 
     def output(self) -> TaskOutput:
         '''Get output of this task.'''
-        if self.output_path is None:
-            self._output = JSONTaskOutput()
-        else:
+        if self.output_stream:
+            # Streams without a single consumer are spooled, thus their output is kept in full.
+            spool_path = None
+            if len(self._downstreams) != 1:
+                spool_path = GlobalContext.get_task_run_output_dir(
+                    self.flow.id,
+                    self._runs[-1].flow_run_id,
+                    self.name
+                ) / 'stream.pkl'
+
+            self._output = StreamTaskOutput(
+                buffer_size=GlobalContext.STREAM_BUFFER_SIZE,
+                spool_path=spool_path
+            )
+        elif self.output_path is not None:
             self._output = FileTaskOutput(self.output_path)
+        elif self.output_array:
+            self._output = ArrayTaskOutput(
+                GlobalContext.get_task_run_output_dir(
+                    self.flow.id,
+                    self._runs[-1].flow_run_id,
+                    self.name
+                )
+            )
+        else:
+            self._output = JSONTaskOutput()
 
         return self._output
 
@@ -153,11 +221,22 @@ class Task(ModelMixin):
         obj._downstreams.add(self)
         self._upstreams.add(obj)
 
+        self.flow.invalidate_dag_index()
+        if obj.flow is not self.flow:
+            obj.flow.invalidate_dag_index()
+
     def iter_downstream(self) -> Iterable[Task]:
-        '''Iterate all downstream tasks.'''
-        for downstream_task in self._downstreams:
-            yield downstream_task
-            yield from downstream_task.iter_downstream()
+        '''Iterate all downstream tasks once.'''
+        visited_tasks = {self}
+        tasks = list(self._downstreams)
+        while len(tasks) > 0:
+            task = tasks.pop()
+            if task in visited_tasks:
+                continue
+
+            visited_tasks.add(task)
+            yield task
+            tasks.extend(task._downstreams)
 
     def save(self) -> None:
         super(Task, self).save()
@@ -186,6 +265,12 @@ class Task(ModelMixin):
 class TaskRun(ModelMixin):
     __model__ = TaskRunModel
     __refs__ = ('id', 'flow_run', 'task')
+    __slots__ = (
+        'task', 'flow_run', 'attempt', 'retry_max', 'retry_delay', 'params',
+        'created_datetime', 'modified_datetime', 'started_datetime',
+        'queue_seconds', 'execution_seconds', 'serialization_seconds', 'persistence_seconds',
+        '_status', '_output', '_logger'
+    )
 
     def __init__(
             self,
@@ -193,8 +278,11 @@ class TaskRun(ModelMixin):
             task: Task,
             attempt: int = 1,
             status: TaskRunStatus = TaskRunStatus.PENDING,
-            run_id: str = None
+            run_id: str = None,
+            model: TaskRunModel = None,
+            deferred: bool = False
         ) -> None:
+        '''Set 'deferred' to skip saving a new task run, thus it could be saved in bulk using 'save_many'.'''
         self.task = task
         self.flow_run = flow_run
         self.attempt = attempt
@@ -206,29 +294,47 @@ class TaskRun(ModelMixin):
         self.modified_datetime = self.created_datetime
         self.started_datetime: datetime = None
 
+        self.queue_seconds: float = None
+        self.execution_seconds: float = None
+        self.serialization_seconds: float = None
+        self.persistence_seconds: float = None
+
         self._status = TaskRunStatus.UNKNOWN
         self._output = UndefinedTaskOutput()
+        self._logger: logging.Logger = None
+
+        # Deferred task runs are created in bulk after their existing models have been prefetched.
+        setup_kwargs = dict()
+        if not deferred:
+            setup_kwargs = dict(
+                flow_run_id=self.flow_run.id,
+                task_id=self.task.id,
+                attempt=self.attempt
+            )
 
-        super(TaskRun, self).__init__(
-            run_id,
-            flow_run_id=self.flow_run.id,
-            task_id=self.task.id,
-            attempt=self.attempt
-        )
+        super(TaskRun, self).__init__(run_id, model, **setup_kwargs)
 
         self.task.add_run(self)
         self.flow_run.add_task_run(self)
 
-        self.logger = get_task_run_logger(
-            flow_id=self.flow_run.flow.id,
-            task_id=self.task.id,
-            task_run_id=self.id
-        )
-
-        if not self._model_exists:
-            self.status = status
+        if self._model_exists:
+            self._status = self._model.status
+        elif deferred:
+            self._status = status
         else:
-            self._status = getattr(TaskRunStatus, self._model.status)
+            self.status = status
+
+    @property
+    def logger(self) -> logging.Logger:
+        '''Task run logger which log file is only created once it\'s used.'''
+        if self._logger is None:
+            self._logger = get_task_run_logger(
+                flow_id=self.flow_run.flow.id,
+                task_id=self.task.id,
+                task_run_id=self.id
+            )
+
+        return self._logger
 
     @property
     def flow_run_id(self) -> str:
@@ -257,6 +363,7 @@ class TaskRun(ModelMixin):
         if self._status == TaskRunStatus.DONE or (
                 value not in (TaskRunStatus.UNKNOWN, TaskRunStatus.DONE)
                 and value.value <= self._status.value
+                and not (self._status == TaskRunStatus.WAITING and value == TaskRunStatus.CANCELED)
             ):
             raise ValueError(
                 f"Run status of flow '{self.task.name}' cannot be set to similar or backward state from "
@@ -271,7 +378,20 @@ class TaskRun(ModelMixin):
         if self._status == TaskRunStatus.RUNNING:
             self.started_datetime = self.modified_datetime
             self._model.started_datetime = self.started_datetime
-        self.save()
+            self.queue_seconds = (self.started_datetime - self.created_datetime).total_seconds()
+
+        deferred = self._status in (
+            TaskRunStatus.SCHEDULED,
+            TaskRunStatus.PENDING,
+            TaskRunStatus.RUNNING
+        )
+        start_time = perf_counter()
+        self.save(deferred=deferred)
+        if not deferred:
+            # Deferred saves only queue the row, while this one has flushed the journal. The time
+            # can't be part of the write being timed, thus it's queued for the next group commit.
+            self.persistence_seconds = (self.persistence_seconds or 0.) + (perf_counter() - start_time)
+            self.save(deferred=True)
 
     @property
     def output(self) -> TaskOutput:
@@ -310,7 +430,7 @@ class TaskRun(ModelMixin):
                 pass
 
     def iter_downstream(self) -> Generator[TaskRun]:
-        for downstream_task in self.task.iter_downstream():
+        for downstream_task in self.task.flow.dag_index.iter_descendants(self.task):
             yield self.flow_run._task_runs_sorted[downstream_task]
 
     def total_seconds(self) -> Union[float, None]:
@@ -326,27 +446,101 @@ class TaskRun(ModelMixin):
         '''Execute task run and record the status.'''
         self.logger.info(f"Run task '{self.task.name}' - {self.attempt} attempt(s).")
         try:
-            self._start_datetime = datetime.now()
+            if not self.task.poke(self):
+                if self.status != TaskRunStatus.WAITING:
+                    self.status = TaskRunStatus.WAITING
+                self.logger.info('Task condition has not been met, thus the task run is waiting.')
+                return
+
             self.status = TaskRunStatus.RUNNING
 
-            self.task.run(
+            self.task._output = UndefinedTaskOutput()
+            start_time = perf_counter()
+            value = self.task.run(
                 run_params=self.run_params,
                 logger=self.logger
             )
+            self.execution_seconds = perf_counter() - start_time
+
+            if isinstance(self.task._output, UndefinedTaskOutput):
+                start_time = perf_counter()
+                self.task.write_output(value)
+                self.serialization_seconds = perf_counter() - start_time
+
             self._output = self.task._output
 
+            if isinstance(self._output, StreamTaskOutput):
+                self.logger.info('Task output is streamed to the downstream task(s).')
+                return
+
             self.status = TaskRunStatus.DONE
 
         except KeyboardInterrupt as exc:
             self.status = TaskRunStatus.FAILED_BY_USER
             self.logger.error(f'{exc.__class__.__name__}')
 
+        except TaskTimeoutError as exc:
+            self.status = TaskRunStatus.FAILED_TIMEOUT_RUN
+            self.logger.error(f'{exc.__class__.__name__}: {exc}')
+
         except Exception as exc:
             self.status = TaskRunStatus.FAILED
             self.logger.error(f'{exc.__class__.__name__}: {exc}', exc_info=True)
 
         finally:
             self.logger.info(f"Task run status: '{self.status.name}'.")
+            if self.status != TaskRunStatus.RUNNING:
+                self.release_logger()
+
+    def save_batch(
+            self,
+            batch_index: int,
+            size: int,
+            status: TaskRunStatus,
+            started_datetime: datetime,
+            error: str = None
+        ) -> None:
+        '''Record summary of a batch from the mapped task run.'''
+        TaskRunBatchModel.create(
+            task_run=self.id,
+            batch_index=batch_index,
+            size=size,
+            status=status,
+            error=error,
+            started_datetime=started_datetime
+        )
+
+    def finish_stream(self) -> None:
+        '''Wait for the streaming output to finish and record the status.
+
+        The producer is only stopped if its consumer has abandoned the in-memory stream early.
+        '''
+        if self._output.is_abandoned():
+            self._output.close()
+        error = self._output.join()
+        if error is None:
+            self.status = TaskRunStatus.DONE
+        else:
+            self.status = TaskRunStatus.FAILED
+            self.logger.error(
+                f'{error.__class__.__name__}: {error}',
+                exc_info=(type(error), error, error.__traceback__)
+            )
+
+        self.logger.info(f"Task run status: '{self.status.name}'.")
+        self.release_logger()
+
+    def release_logger(self) -> None:
+        '''Close log file of the task run, it will be reopened if the task run logs again.'''
+        if self._logger is not None:
+            release_logger(self._logger)
+            self._logger = None
+
+    def restore(self, output: TaskOutput) -> None:
+        '''Mark task run as done using output from a previous run.'''
+        self.task._output = output
+        self._output = output
+        self.status = TaskRunStatus.DONE
 
     def next_attempt(self) -> TaskRun:
         task_run = TaskRun(
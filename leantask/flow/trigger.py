@@ -0,0 +1,33 @@
+from typing import List, Tuple, Union
+
+from ..utils.string import validate_use_safe_chars
+
+TRIGGER_TASK_SEPARATOR = ':'
+
+
+def parse_trigger(trigger: str) -> Tuple[str, Union[str, None]]:
+    '''Split trigger into its upstream flow name and task name, if it\'s set.
+
+    Use 'upstream_flow' to trigger on a successful run of the upstream flow, or
+    'upstream_flow:task_name' to trigger once the file output of the upstream task is updated.
+    '''
+    flow_name, separator, task_name = trigger.partition(TRIGGER_TASK_SEPARATOR)
+    validate_use_safe_chars(flow_name)
+    if separator == '':
+        return flow_name, None
+
+    validate_use_safe_chars(task_name)
+    return flow_name, task_name
+
+
+def validate_triggers(triggers: Union[str, List[str], None]) -> List[str]:
+    if triggers is None:
+        return []
+
+    if isinstance(triggers, str):
+        triggers = [triggers]
+
+    for trigger in triggers:
+        parse_trigger(trigger)
+
+    return list(triggers)
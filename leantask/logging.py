@@ -1,30 +1,323 @@
+from __future__ import annotations
+
+import atexit
 import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler
 from pathlib import Path
+from typing import Dict, IO, List, Set, Tuple
 
 from .context import GlobalContext
 
 LOG_SHORT_FORMAT = '[%(asctime)s] %(message)s'
 LOG_LONG_FORMAT = '[%(asctime)s] %(levelname)7s (%(name)s) %(message)s'
+# Seconds an error record waits for the log listener before it's written by the caller thread.
+ERROR_WRITE_TIMEOUT = 5.0
 
 if GlobalContext.DEBUG_QUERY:
     peewee_logger = logging.getLogger('peewee')
     peewee_logger.addHandler(logging.StreamHandler())
     peewee_logger.setLevel(logging.DEBUG)
 
+_loggers: Dict[Tuple[str, str], logging.Logger] = dict()
+_loggers_lock = threading.Lock()
+
+_open_file_handlers: OrderedDict[BufferedFileHandler, None] = OrderedDict()
+_open_file_handlers_lock = threading.Lock()
+
+
+def _use_open_file(handler: BufferedFileHandler) -> None:
+    '''Mark the handler file as recently used and close the least recently used files over the cap.'''
+    with _open_file_handlers_lock:
+        _open_file_handlers[handler] = None
+        _open_file_handlers.move_to_end(handler)
+
+        expired_handlers = []
+        while len(_open_file_handlers) > max(GlobalContext.LOG_MAX_OPEN_FILES, 1):
+            expired_handler, _ = _open_file_handlers.popitem(last=False)
+            expired_handlers.append(expired_handler)
+
+    for expired_handler in expired_handlers:
+        expired_handler._close_file()
+
+
+class BufferedFileHandler(logging.Handler):
+    '''File handler which only opens the file on its first record and
+    writes records in batches bounded by time or size.
+    '''
+    def __init__(
+            self,
+            file_path: Path,
+            flush_interval: float = 1.0,
+            buffer_size: int = 65536
+        ) -> None:
+        super(BufferedFileHandler, self).__init__()
+        self.file_path = Path(file_path)
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+
+        self._buffer: List[str] = []
+        self._buffer_length = 0
+        self._last_flush_time = time.monotonic()
+        self._file: IO[str] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            message = self.format(record) + '\n'
+            self._buffer.append(message)
+            self._buffer_length += len(message)
+
+            if record.levelno >= logging.ERROR \
+                    or self._buffer_length >= self.buffer_size:
+                self.flush()
+
+        except Exception:
+            self.handleError(record)
+
+    def flush_if_due(self) -> None:
+        if self._buffer_length > 0 \
+                and time.monotonic() - self._last_flush_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            self._last_flush_time = time.monotonic()
+            if self._buffer_length == 0:
+                return
+
+            # The file could have been closed to keep the number of open files under the cap,
+            # thus it's reopened in append mode.
+            if self._file is None:
+                self.file_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.file_path, 'a', encoding='utf-8')
+
+            self._file.write(''.join(self._buffer))
+            self._file.flush()
+            self._buffer = []
+            self._buffer_length = 0
+
+        finally:
+            self.release()
+
+        _use_open_file(self)
 
-class FlushFileHandler(logging.FileHandler):
-    def emit(self, record):
-        super().emit(record)
+    def _close_file(self) -> None:
+        self.acquire()
+        try:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+        finally:
+            self.release()
+
+    def close(self) -> None:
         self.flush()
+        with _open_file_handlers_lock:
+            _open_file_handlers.pop(self, None)
+
+        self._close_file()
+        super(BufferedFileHandler, self).close()
+
+
+class _FileQueueHandler(QueueHandler):
+    '''Format records in the caller thread and pass them to the log listener.
+
+    Error records block until they have been written to the file, or they are written
+    by the caller thread if the listener has not written them in 'ERROR_WRITE_TIMEOUT'.
+    '''
+    def __init__(self, target: BufferedFileHandler) -> None:
+        super(_FileQueueHandler, self).__init__(_log_listener.queue)
+        self.target = target
+
+    @property
+    def baseFilename(self) -> str:
+        return str(self.target.file_path)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super(_FileQueueHandler, self).prepare(record)
+        record.leantask_target = self.target
+        if record.levelno >= logging.ERROR:
+            record.leantask_written = threading.Event()
+            record.leantask_claim = threading.Lock()
+
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            record = self.prepare(record)
+            if not _log_listener.start():
+                self.target.handle(record)
+                return
+
+            self.enqueue(record)
+
+        except Exception:
+            self.handleError(record)
+            return
+
+        if record.levelno >= logging.ERROR \
+                and not record.leantask_written.wait(ERROR_WRITE_TIMEOUT) \
+                and record.leantask_claim.acquire(blocking=False):
+            # The listener is stuck on other records, thus the record is written directly
+            # and it's skipped by the listener later.
+            self.target.handle(record)
+
+    def close(self) -> None:
+        '''Close the file after all of its queued records have been written.'''
+        if _log_listener.is_running:
+            self.enqueue(_CloseRequest(self.target))
+        else:
+            self.target.close()
+
+        super(_FileQueueHandler, self).close()
+
+
+class _CloseRequest:
+    def __init__(self, handler: BufferedFileHandler) -> None:
+        self.handler = handler
+
+
+class _LogListener:
+    '''Single background thread which writes queued records of all log files.'''
+    def __init__(self) -> None:
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._handlers: Set[BufferedFileHandler] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread = None
+        self._stopped = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and not self._stopped
+
+    def start(self) -> bool:
+        '''Start the listener if it\'s not running yet. Return False if it has been stopped.'''
+        if self.is_running:
+            return True
+
+        with self._lock:
+            if self._stopped:
+                return False
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+        return True
+
+    def _run(self) -> None:
+        last_check_time = time.monotonic()
+        while True:
+            try:
+                record = self.queue.get(timeout=GlobalContext.LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                record = None
+
+            if record is _LISTENER_STOP:
+                break
+
+            if record is not None:
+                self._handle(record)
+
+            if time.monotonic() - last_check_time >= GlobalContext.LOG_FLUSH_INTERVAL:
+                last_check_time = time.monotonic()
+                self._flush_handlers(force=False)
+
+    def _handle(self, record: logging.LogRecord) -> None:
+        if isinstance(record, _CloseRequest):
+            self._handlers.discard(record.handler)
+            record.handler.close()
+            return
+
+        if hasattr(record, 'leantask_claim') \
+                and not record.leantask_claim.acquire(blocking=False):
+            return
+
+        try:
+            handler: BufferedFileHandler = record.leantask_target
+            handler.handle(record)
+            if handler._buffer_length > 0:
+                self._handlers.add(handler)
+
+        finally:
+            if hasattr(record, 'leantask_written'):
+                record.leantask_written.set()
+
+    def stop(self) -> None:
+        '''Write all queued records and stop the listener.'''
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+
+        if thread is None:
+            return
+
+        self.queue.put(_LISTENER_STOP)
+        thread.join()
+
+        while True:
+            try:
+                self._handle(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        self._flush_handlers(force=True)
+
+    def _flush_handlers(self, force: bool) -> None:
+        for handler in list(self._handlers):
+            if force:
+                handler.flush()
+            else:
+                handler.flush_if_due()
+
+            if handler._buffer_length == 0:
+                self._handlers.discard(handler)
+
+
+_LISTENER_STOP = object()
+_log_listener = _LogListener()
 
 
 def get_logger(
         name: str = None,
         log_file_path: Path = None
     ) -> logging.Logger:
+    '''Get logger by its name and log file, which is reused until it\'s released.'''
+    logger_key = (name, str(log_file_path) if log_file_path is not None else None)
+    with _loggers_lock:
+        logger = _loggers.get(logger_key)
+        if logger is None:
+            logger = _create_logger(name, log_file_path)
+            _loggers[logger_key] = logger
+
+    return logger
+
+
+def release_logger(logger: logging.Logger) -> None:
+    '''Remove logger from the registry and close its log file.'''
+    with _loggers_lock:
+        for logger_key, registered_logger in list(_loggers.items()):
+            if registered_logger is logger:
+                del _loggers[logger_key]
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def _create_logger(
+        name: str = None,
+        log_file_path: Path = None
+    ) -> logging.Logger:
     logging_level = logging.INFO
     logging_format = LOG_SHORT_FORMAT
-    
+
     if GlobalContext.LOG_DEBUG:
         logging_level = logging.DEBUG
         logging_format = LOG_LONG_FORMAT
@@ -37,16 +330,21 @@ def get_logger(
     logger.addHandler(stream_handler)
 
     if log_file_path is not None:
-        file_handler = FlushFileHandler(str(log_file_path))
-        file_handler.setFormatter(logging.Formatter(LOG_LONG_FORMAT))
-        logger.addHandler(file_handler)
+        file_handler = BufferedFileHandler(
+            log_file_path,
+            flush_interval=GlobalContext.LOG_FLUSH_INTERVAL,
+            buffer_size=GlobalContext.LOG_BUFFER_SIZE
+        )
+        queue_handler = _FileQueueHandler(file_handler)
+        queue_handler.setFormatter(logging.Formatter(LOG_LONG_FORMAT))
+        logger.addHandler(queue_handler)
 
     logger.setLevel(logging_level)
     return logger
 
 
 def get_local_logger(name: str = None) -> logging.Logger:
-    log_file_path = GlobalContext.get_local_log_file_path()
+    log_file_path = GlobalContext.get_local_log_file_path(create=False)
     return get_logger(name, log_file_path)
 
 
@@ -56,7 +354,8 @@ def get_flow_run_logger(
     ) -> logging.Logger:
     log_file_path = GlobalContext.get_flow_run_log_file_path(
         flow_id,
-        flow_run_id
+        flow_run_id,
+        create=False
     )
     return get_logger('flow', log_file_path)
 
@@ -69,7 +368,8 @@ def get_task_run_logger(
     log_file_path = GlobalContext.get_task_run_log_file_path(
         flow_id,
         task_id,
-        task_run_id
+        task_run_id,
+        create=False
     )
     return get_logger('task', log_file_path)
 
@@ -78,7 +378,7 @@ def get_logger_log_file_path(
         logger: logging.Logger
     ) -> Path:
     for handler in logger.handlers:
-        if isinstance(handler, logging.FileHandler):
+        if isinstance(handler, (logging.FileHandler, _FileQueueHandler)):
             return Path(handler.baseFilename)
 
     raise FileNotFoundError
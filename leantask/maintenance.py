@@ -0,0 +1,316 @@
+'''Retention and archival of run history, removal of orphaned run files and compaction of the databases.'''
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+from peewee import Database, ModelSelect, chunked
+
+from .context import GlobalContext
+from .database import (
+    FlowModel, FlowRunModel, FlowStatsModel, TaskRunModel, TaskRunBatchModel,
+    FlowRunLogModel, TaskRunLogModel
+)
+from .database.archive import create_archive, get_archive_name, select_archives
+from .enum import LogTableName
+
+ORPHAN_GRACE_SECONDS = 3600
+ARCHIVE_SCHEMA_NAME = 'archive_target'
+
+
+def get_expired_flow_run_ids(
+        flow_model: FlowModel,
+        keep_runs: int = None,
+        keep_days: int = None
+    ) -> List[str]:
+    '''Return ids of finished runs of the flow beyond the newest `keep_runs` or older than `keep_days`.'''
+    finished_flow_runs = (
+        FlowRunModel.select(FlowRunModel.id)
+        .where(
+            (FlowRunModel.flow == flow_model.id)
+            & ~FlowRunModel.is_active()
+        )
+    )
+
+    expired_flow_run_ids = set()
+    if keep_runs is not None:
+        expired_flow_run_ids.update(
+            model.id for model in (
+                finished_flow_runs
+                .order_by(FlowRunModel.created_datetime.desc())
+                .offset(keep_runs)
+            )
+        )
+
+    if keep_days is not None:
+        expired_datetime = datetime.now() - timedelta(days=keep_days)
+        expired_flow_run_ids.update(
+            model.id for model in (
+                finished_flow_runs
+                .where(FlowRunModel.modified_datetime < expired_datetime)
+            )
+        )
+
+    return sorted(expired_flow_run_ids)
+
+
+def _delete_run_rows(flow_run_ids: List[str]) -> int:
+    '''Delete the runs with their task runs and refresh the summaries of their flows.
+
+    Must be called within a transaction, which then also covers the refreshed summaries.
+    '''
+    flow_ids = [
+        row[0] for row in
+        FlowRunModel.select(FlowRunModel.flow).distinct().where(FlowRunModel.id.in_(flow_run_ids)).tuples()
+    ]
+    task_run_ids = TaskRunModel.select(TaskRunModel.id).where(TaskRunModel.flow_run.in_(flow_run_ids))
+    TaskRunBatchModel.delete().where(TaskRunBatchModel.task_run.in_(task_run_ids)).execute()
+    TaskRunModel.delete().where(TaskRunModel.flow_run.in_(flow_run_ids)).execute()
+    deleted_runs = FlowRunModel.delete().where(FlowRunModel.id.in_(flow_run_ids)).execute()
+    FlowStatsModel.refresh(flow_ids)
+    return deleted_runs
+
+
+def delete_flow_runs(
+        flow_run_ids: Iterable[str],
+        batch_size: int = None
+    ) -> int:
+    '''Delete flow runs with their task runs and logs, each batch in a short transaction.'''
+    if batch_size is None:
+        batch_size = GlobalContext.MAINTENANCE_BATCH_SIZE
+
+    total_deleted = 0
+    for batch in chunked(flow_run_ids, batch_size):
+        with FlowRunModel._meta.database.atomic():
+            total_deleted += _delete_run_rows(batch)
+
+        with FlowRunLogModel._meta.database.atomic():
+            TaskRunLogModel.delete().where(TaskRunLogModel.ref_flow_run.in_(batch)).execute()
+            FlowRunLogModel.delete().where(FlowRunLogModel.ref_id.in_(batch)).execute()
+
+    return total_deleted
+
+
+def prune_flow_runs(
+        flow_names: List[str] = None,
+        keep_runs: int = None,
+        keep_days: int = None,
+        batch_size: int = None
+    ) -> Dict[str, int]:
+    '''Apply the retention policy to each flow and return the number of deleted runs by flow name.'''
+    if keep_runs is None and keep_days is None:
+        return dict()
+
+    flow_models = FlowModel.select()
+    if flow_names is not None:
+        flow_models = flow_models.where(FlowModel.name.in_(flow_names))
+
+    deleted_runs = dict()
+    for flow_model in flow_models:
+        expired_flow_run_ids = get_expired_flow_run_ids(flow_model, keep_runs, keep_days)
+        if len(expired_flow_run_ids) > 0:
+            deleted_runs[flow_model.name] = delete_flow_runs(expired_flow_run_ids, batch_size)
+
+    return deleted_runs
+
+
+def _copy_to_archive(query: ModelSelect) -> None:
+    model = query.model
+    column_names = ', '.join(f'"{field.column_name}"' for field in model._meta.sorted_fields)
+    sql, params = query.select(*model._meta.sorted_fields).sql()
+    model._meta.database.execute_sql(
+        f'INSERT OR REPLACE INTO "{ARCHIVE_SCHEMA_NAME}"."{model._meta.table_name}" ({column_names}) {sql}',
+        params
+    )
+
+
+def archive_flow_runs(
+        archive_days: int,
+        batch_size: int = None
+    ) -> Dict[str, int]:
+    '''Move finished runs not modified within `archive_days` into the archives of their month.
+
+    Runs are copied along with their task runs and removed from the database, each batch in a
+    single transaction. Their logs and files are kept. Returns the number of archived runs by
+    archive name.
+    '''
+    if batch_size is None:
+        batch_size = GlobalContext.MAINTENANCE_BATCH_SIZE
+
+    archived_datetime = datetime.now() - timedelta(days=archive_days)
+    flow_run_ids_by_archive: Dict[str, List[str]] = dict()
+    for model in (
+            FlowRunModel.select(FlowRunModel.id, FlowRunModel.created_datetime)
+            .where(
+                ~FlowRunModel.is_active()
+                & (FlowRunModel.modified_datetime < archived_datetime)
+            )
+        ):
+        flow_run_ids_by_archive.setdefault(get_archive_name(model.created_datetime), []).append(model.id)
+
+    db = FlowRunModel._meta.database
+    archived_runs = dict()
+    for archive_name, flow_run_ids in sorted(flow_run_ids_by_archive.items()):
+        archive_path = create_archive(archive_name)
+        db.execute_sql(f'ATTACH DATABASE ? AS "{ARCHIVE_SCHEMA_NAME}"', (str(archive_path),))
+        try:
+            for batch in chunked(flow_run_ids, batch_size):
+                task_run_ids = TaskRunModel.select(TaskRunModel.id).where(TaskRunModel.flow_run.in_(batch))
+                with db.atomic():
+                    _copy_to_archive(FlowRunModel.select().where(FlowRunModel.id.in_(batch)))
+                    _copy_to_archive(TaskRunModel.select().where(TaskRunModel.flow_run.in_(batch)))
+                    _copy_to_archive(
+                        TaskRunBatchModel.select().where(TaskRunBatchModel.task_run.in_(task_run_ids))
+                    )
+                    archived_runs[archive_name] = archived_runs.get(archive_name, 0) + _delete_run_rows(batch)
+
+        finally:
+            db.execute_sql(f'DETACH DATABASE "{ARCHIVE_SCHEMA_NAME}"')
+
+    return archived_runs
+
+
+def _is_recently_modified(path: Path) -> bool:
+    return time.time() - path.stat().st_mtime < ORPHAN_GRACE_SECONDS
+
+
+def _remove_path(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink()
+
+
+def _remove_empty_dir(path: Path) -> None:
+    try:
+        path.rmdir()
+    except OSError:
+        pass
+
+
+def _select_ids(query: ModelSelect) -> Set[str]:
+    '''Return ids selected by the query from the database and the archives.'''
+    return {row[0] for row in query.tuples()} | {row[0] for row in select_archives(query)}
+
+
+def _flow_run_ids(flow_id: str) -> Set[str]:
+    return _select_ids(
+        FlowRunModel.select(FlowRunModel.id)
+        .where(FlowRunModel.flow == flow_id)
+    )
+
+
+def _task_run_ids(flow_id: str) -> Set[str]:
+    return _select_ids(
+        TaskRunModel.select(TaskRunModel.id)
+        .join(FlowRunModel)
+        .where(FlowRunModel.flow == flow_id)
+    )
+
+
+def remove_orphaned_files() -> int:
+    '''Remove log, profile and output files of runs which no longer exist in the database or archives.
+
+    Files modified within the last `ORPHAN_GRACE_SECONDS` are kept, since their runs might
+    not have been saved yet.
+    '''
+    removed_paths = []
+
+    flow_run_log_dir = GlobalContext.log_dir() / LogTableName.FLOW_RUN.value
+    task_run_log_dir = GlobalContext.log_dir() / LogTableName.TASK_RUN.value
+    output_dir = GlobalContext.output_dir()
+
+    # Run files are named by run id, e.g. '<flow_run_id>.log' or '<task_run_id>.prof'.
+    for flow_dir in (path for path in flow_run_log_dir.glob('*') if path.is_dir()):
+        flow_run_ids = _flow_run_ids(flow_dir.name)
+        for path in flow_dir.iterdir():
+            if path.name.split('.')[0] not in flow_run_ids and not _is_recently_modified(path):
+                removed_paths.append(path)
+
+    for flow_dir in (path for path in task_run_log_dir.glob('*') if path.is_dir()):
+        task_run_ids = _task_run_ids(flow_dir.name)
+        for task_dir in (path for path in flow_dir.iterdir() if path.is_dir()):
+            for path in task_dir.iterdir():
+                if path.name.split('.')[0] not in task_run_ids and not _is_recently_modified(path):
+                    removed_paths.append(path)
+
+    for flow_dir in (path for path in output_dir.glob('*') if path.is_dir()):
+        flow_run_ids = _flow_run_ids(flow_dir.name)
+        for path in flow_dir.iterdir():
+            if path.name not in flow_run_ids and not _is_recently_modified(path):
+                removed_paths.append(path)
+
+    for path in removed_paths:
+        _remove_path(path)
+
+    for path in set(path.parent for path in removed_paths):
+        _remove_empty_dir(path)
+        if path.parent.parent == task_run_log_dir:
+            _remove_empty_dir(path.parent)
+
+    return len(removed_paths)
+
+
+def vacuum_database(
+        db: Database,
+        pages: int = None,
+        schema_name: str = 'main',
+        full: bool = False
+    ) -> None:
+    '''Release free pages of the database file, or of the attached database of 'schema_name'.
+
+    Databases created before incremental auto vacuum are only switched to it by a full VACUUM
+    if `full` is set, since it rewrites the whole file while holding the write lock. Otherwise,
+    only the free pages of incremental databases are released.
+    '''
+    auto_vacuum = db.execute_sql(f'PRAGMA "{schema_name}".auto_vacuum').fetchone()[0]
+    if auto_vacuum != 2:
+        if full:
+            db.execute_sql(f'PRAGMA "{schema_name}".auto_vacuum = INCREMENTAL')
+            db.execute_sql(f'VACUUM "{schema_name}"')
+
+        return
+
+    db.execute_sql(f'PRAGMA "{schema_name}".incremental_vacuum({pages or 0})').fetchall()
+
+
+def run_maintenance(
+        flow_names: List[str] = None,
+        keep_runs: int = None,
+        keep_days: int = None,
+        batch_size: int = None,
+        vacuum: bool = True,
+        archive_days: int = None,
+        full_vacuum: bool = False
+    ) -> Dict[str, int]:
+    '''Prune and archive run history, remove orphaned run files and vacuum the databases.
+
+    Retention defaults to `GlobalContext.RETENTION_RUNS` and `GlobalContext.RETENTION_DAYS`,
+    and archival to `GlobalContext.ARCHIVE_DAYS`. See `vacuum_database` for `full_vacuum`.
+    '''
+    if keep_runs is None:
+        keep_runs = GlobalContext.RETENTION_RUNS
+    if keep_days is None:
+        keep_days = GlobalContext.RETENTION_DAYS
+    if archive_days is None:
+        archive_days = GlobalContext.ARCHIVE_DAYS
+
+    deleted_runs = prune_flow_runs(flow_names, keep_runs, keep_days, batch_size)
+    archived_runs = dict()
+    if archive_days is not None:
+        archived_runs = archive_flow_runs(archive_days, batch_size)
+    removed_files = remove_orphaned_files()
+
+    if vacuum:
+        vacuum_database(FlowRunModel._meta.database, full=full_vacuum)
+        vacuum_database(
+            FlowRunLogModel._meta.database,
+            schema_name=FlowRunLogModel._meta.schema or 'main',
+            full=full_vacuum
+        )
+
+    return {
+        'deleted_runs': sum(deleted_runs.values()),
+        'archived_runs': sum(archived_runs.values()),
+        'removed_files': removed_files
+    }
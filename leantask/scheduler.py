@@ -1,17 +1,26 @@
 import asyncio
+import json
 import os
 import subprocess
 import sys
+import threading
+import time
 from concurrent import futures
 from datetime import datetime
 from pathlib import Path
 from typing import List, Tuple
 
 from .context import GlobalContext
-from .database import FlowModel, FlowRunModel, FlowScheduleModel, SchedulerSessionModel
+from .database import (
+    FlowModel, FlowRunModel, FlowScheduleModel, SchedulerSessionModel, TaskModel, TaskRunModel,
+    FlowRunLogModel, checkpoint_databases, database
+)
+from .database.identity import identity_map
+from .database.migration import migrate_database
 from .discover import index_all_flows
-from .enum import FlowIndexStatus, FlowRunStatus, FlowScheduleStatus
+from .enum import FlowIndexStatus, FlowRunStatus, FlowScheduleStatus, TaskRunStatus
 from .logging import get_logger
+from .maintenance import run_maintenance
 from .utils.string import generate_uuid, obj_repr, quote
 
 logger = None
@@ -76,20 +85,187 @@ def schedule_flow(
 
 def execute_and_reschedule_flow(
         flow_run_model: FlowRunModel,
-        log_file_path: Path
+        log_file_path: Path,
+        executor: futures.ThreadPoolExecutor = None
     ) -> Tuple[FlowRunStatus, FlowScheduleStatus]:
     flow_run_status = execute_flow(flow_run_model)
     flow_schedule_status = schedule_flow(
         flow_run_model.flow,
         log_file_path=log_file_path
     )
+
+    # Triggered flow runs are submitted right away instead of waiting for the next heartbeat.
+    for triggered_flow_run_model in create_triggered_flow_run_models(flow_run_model, flow_run_status):
+        if claim_flow_run(triggered_flow_run_model):
+            submit_flow_run(triggered_flow_run_model, log_file_path, executor)
+
     return flow_run_status, flow_schedule_status
 
 
+def claim_flow_run(flow_run_model: FlowRunModel) -> bool:
+    '''Flag the flow run as pending before it's submitted.
+
+    Return False if its status has been changed since it was selected, e.g. a triggered run
+    which has been picked up by the run routine as an unscheduled run.
+    '''
+    with database.atomic():
+        is_unchanged = (
+            FlowRunModel.select()
+            .where(
+                (FlowRunModel.id == flow_run_model.id)
+                & (FlowRunModel.status == flow_run_model.status)
+            )
+            .exists()
+        )
+        if not is_unchanged:
+            return False
+
+        flow_run_model.status = FlowRunStatus.PENDING
+        flow_run_model.save()
+
+    return True
+
+
+def submit_flow_run(
+        flow_run_model: FlowRunModel,
+        log_file_path: Path,
+        executor: futures.ThreadPoolExecutor = None
+    ) -> None:
+    if executor is not None:
+        logger.info(f"Submit flow run of '{flow_run_model.flow.path}' to the executor.")
+        executor.submit(
+            execute_and_reschedule_flow,
+            flow_run_model,
+            log_file_path,
+            executor
+        )
+    else:
+        execute_and_reschedule_flow(
+            flow_run_model,
+            log_file_path
+        )
+
+
+def is_task_output_updated(
+        flow_run_model: FlowRunModel,
+        task_name: str
+    ) -> bool:
+    '''Return True if the task in the flow run is done and has written its file output during the run.'''
+    task_run_model = (
+        TaskRunModel.select()
+        .join(TaskModel)
+        .where(
+            (TaskRunModel.flow_run == flow_run_model.id)
+            & (TaskModel.name == task_name)
+            & (TaskRunModel.status == TaskRunStatus.DONE)
+        )
+        .order_by(TaskRunModel.attempt.desc())
+        .first()
+    )
+    if task_run_model is None \
+            or task_run_model.output is None \
+            or task_run_model.started_datetime is None:
+        return False
+
+    output = json.loads(task_run_model.output)
+    if output.get('type') != 'file':
+        return False
+
+    output_path = Path(output['output_path'])
+    try:
+        modified_datetime = datetime.fromtimestamp(output_path.stat().st_mtime)
+    except OSError:
+        return False
+
+    return modified_datetime >= task_run_model.started_datetime
+
+
+def create_triggered_flow_run_models(
+        flow_run_model: FlowRunModel,
+        flow_run_status: FlowRunStatus
+    ) -> List[FlowRunModel]:
+    '''Create runs of the active flows which are triggered by the finished flow run.
+
+    The runs are created as unscheduled runs, thus they are picked up by the run routine
+    if the scheduler stops before they are claimed and submitted.
+    '''
+    from .flow.trigger import parse_trigger
+
+    upstream_flow_name = flow_run_model.flow.name
+    triggered_flow_run_models = []
+    flow_models = (
+        FlowModel.select()
+        .where(
+            FlowModel.active
+            & FlowModel.triggers.contains(upstream_flow_name)
+        )
+    )
+    for flow_model in flow_models:
+        for trigger in json.loads(flow_model.triggers):
+            flow_name, task_name = parse_trigger(trigger)
+            if flow_name != upstream_flow_name:
+                continue
+
+            if task_name is None and flow_run_status == FlowRunStatus.DONE:
+                break
+
+            if task_name is not None and is_task_output_updated(flow_run_model, task_name):
+                break
+
+        else:
+            continue
+
+        triggered_flow_run_model = FlowRunModel(
+            flow=flow_model.id,
+            max_delay=flow_model.max_delay,
+            is_manual=False,
+            params=json.dumps({'trigger': trigger, 'trigger_run_id': flow_run_model.id}),
+            status=FlowRunStatus.SCHEDULED
+        )
+        # Upstream flows finishing at once run on different threads, thus the check and the insert
+        # share an immediate transaction, which takes the write lock before the check.
+        with database.atomic():
+            has_pending_run = (
+                FlowRunModel.select()
+                .where(
+                    (FlowRunModel.flow == flow_model.id)
+                    & FlowRunModel.is_active()
+                    & (
+                        (FlowRunModel.status == FlowRunStatus.PENDING)
+                        | (
+                            (FlowRunModel.status == FlowRunStatus.SCHEDULED)
+                            & (FlowRunModel.flow_schedule_id >> None)
+                        )
+                    )
+                )
+                .exists()
+            )
+            if has_pending_run:
+                logger.info(f"Flow '{flow_model.name}' is triggered but it has already a pending run.")
+                continue
+
+            logger.info(f"Flow '{flow_model.name}' is triggered by '{trigger}'.")
+            triggered_flow_run_model.save(force_insert=True)
+            with FlowRunLogModel._meta.database.atomic():
+                FlowRunLogModel.create(
+                    ref_id=triggered_flow_run_model.id,
+                    ref_flow=flow_model.id,
+                    max_delay=triggered_flow_run_model.max_delay,
+                    is_manual=False,
+                    params=triggered_flow_run_model.params,
+                    status=triggered_flow_run_model.status,
+                    created_datetime=triggered_flow_run_model.created_datetime
+                )
+
+        triggered_flow_run_models.append(triggered_flow_run_model)
+
+    return triggered_flow_run_models
+
+
 def get_unfinished_flow_run_models():
     unfinished_flow_run_status = (
-        FlowRunStatus.SCHEDULED.name,
-        FlowRunStatus.SCHEDULED_BY_USER.name
+        FlowRunStatus.SCHEDULED,
+        FlowRunStatus.SCHEDULED_BY_USER
     )
     unfinished_flow_run_models = []
 
@@ -100,9 +276,11 @@ def get_unfinished_flow_run_models():
     )
     for flow_schedule_model in flow_schedule_models:
         scheduled_flow_run_models = list(
-            FlowRunModel.select()
+            FlowRunModel.select(FlowRunModel, FlowModel)
+            .join(FlowModel)
             .where(
                 (FlowRunModel.flow_schedule_id == flow_schedule_model.id)
+                & FlowRunModel.is_active()
                 & FlowRunModel.status.in_(unfinished_flow_run_status)
             )
         )
@@ -123,9 +301,11 @@ def get_unfinished_flow_run_models():
 
     logger.debug('Get unscheduled flow run.')
     unscheduled_flow_run_models = list(
-        FlowRunModel.select()
+        FlowRunModel.select(FlowRunModel, FlowModel)
+        .join(FlowModel)
         .where(
             (FlowRunModel.flow_schedule_id >> None)
+            & FlowRunModel.is_active()
             & FlowRunModel.status.in_(unfinished_flow_run_status)
         )
     )
@@ -138,6 +318,52 @@ def get_unfinished_flow_run_models():
     return unfinished_flow_run_models
 
 
+def get_due_waiting_flow_run_models() -> List[FlowRunModel]:
+    '''Poll conditions of all waiting task runs at once and return flow runs which should be resumed.'''
+    from .flow.extensions.sensor import is_sensor_due
+
+    logger.debug('Poll waiting task run.')
+    waiting_task_run_models = (
+        TaskRunModel.select(TaskRunModel, FlowRunModel, FlowModel)
+        .join(FlowRunModel)
+        .join(FlowModel)
+        .where(
+            TaskRunModel.is_active()
+            & (TaskRunModel.status == TaskRunStatus.WAITING)
+            & (FlowRunModel.status == FlowRunStatus.WAITING)
+        )
+    )
+
+    due_flow_run_models = dict()
+    sensor_cache = dict()
+    for task_run_model in waiting_task_run_models:
+        flow_run_model = task_run_model.flow_run
+        if flow_run_model.id in due_flow_run_models:
+            continue
+
+        params = json.loads(task_run_model.params) if task_run_model.params is not None else dict()
+        reference_datetime = flow_run_model.schedule_datetime
+        if reference_datetime is None:
+            reference_datetime = task_run_model.created_datetime
+
+        try:
+            is_due = is_sensor_due(
+                params,
+                reference_datetime=reference_datetime,
+                waiting_since=task_run_model.created_datetime,
+                cache=sensor_cache
+            )
+        except Exception as exc:
+            logger.error(f'{exc.__class__.__name__}: {exc}', exc_info=True)
+            continue
+
+        if is_due:
+            logger.info(f"Resume waiting flow run of '{flow_run_model.flow.name}'.")
+            due_flow_run_models[flow_run_model.id] = flow_run_model
+
+    return list(due_flow_run_models.values())
+
+
 class Scheduler:
     def __init__(
             self,
@@ -153,9 +379,16 @@ class Scheduler:
         logger = get_logger('scheduler', self.log_path)
         logger.debug(repr(self))
 
+        for version in migrate_database():
+            logger.info(f'Database schema has been migrated to version {version}.')
+
         self._create_scheduler_session()
 
         self._flow_models: List[FlowModel] = None
+        self._last_sensor_poll_time: float = None
+        self._last_checkpoint_time = time.monotonic()
+        self._last_maintenance_time = time.monotonic()
+        self._maintenance_thread: threading.Thread = None
 
     def _create_scheduler_session(self) -> None:
         self._model = SchedulerSessionModel(
@@ -175,6 +408,8 @@ class Scheduler:
         logger.debug('Start run routine by updating flow indexes from database.')
         updated_flow_models = index_all_flows(self._flow_models, self.log_path)
         self._flow_models = list(updated_flow_models.keys())
+        # Flow runs of this routine look up their flows from the identity map.
+        identity_map.add(self._flow_models)
         for flow_model in self._flow_models:
             if not flow_model.active \
                     or updated_flow_models[flow_model] in (
@@ -187,25 +422,43 @@ class Scheduler:
                 log_file_path=self.log_path
             )
 
-        for flow_run_model in get_unfinished_flow_run_models():
-            flow_run_model.status = FlowRunStatus.PENDING.name
-            flow_run_model.save()
+        flow_run_models = get_unfinished_flow_run_models()
+        if self._last_sensor_poll_time is None \
+                or time.monotonic() - self._last_sensor_poll_time >= GlobalContext.SENSOR_POLL_INTERVAL:
+            self._last_sensor_poll_time = time.monotonic()
+            flow_run_models += get_due_waiting_flow_run_models()
 
-            if executor is not None:
-                logger.info(f"Submit flow run of '{flow_run_model.flow.path}' to the executor.")
-                executor.submit(
-                    execute_and_reschedule_flow,
-                    flow_run_model,
-                    self.log_path
-                )
-            else:
-                execute_and_reschedule_flow(
-                    flow_run_model,
-                    self.log_path
-                )
+        for flow_run_model in flow_run_models:
+            if claim_flow_run(flow_run_model):
+                submit_flow_run(flow_run_model, self.log_path, executor)
+
+        if time.monotonic() - self._last_checkpoint_time >= GlobalContext.DATABASE_CHECKPOINT_INTERVAL:
+            self._last_checkpoint_time = time.monotonic()
+            logger.debug('Checkpoint database WAL files.')
+            checkpoint_databases()
+
+        if GlobalContext.MAINTENANCE_INTERVAL > 0 \
+                and time.monotonic() - self._last_maintenance_time >= GlobalContext.MAINTENANCE_INTERVAL \
+                and (self._maintenance_thread is None or not self._maintenance_thread.is_alive()):
+            self._last_maintenance_time = time.monotonic()
+            self._maintenance_thread = threading.Thread(target=self._run_maintenance, daemon=True)
+            self._maintenance_thread.start()
 
         logger.debug('Run routine has been completed.')
 
+    def _run_maintenance(self) -> None:
+        logger.info('Run maintenance of run history and databases.')
+        try:
+            summary = run_maintenance()
+            logger.info(
+                f"Maintenance has been completed. Deleted {summary['deleted_runs']} run(s), "
+                f"archived {summary['archived_runs']} run(s) "
+                f"and removed {summary['removed_files']} orphaned file(s)."
+            )
+
+        except Exception as exc:
+            logger.error(f'{exc.__class__.__name__}: {exc}', exc_info=True)
+
     async def _run_loop(
             self,
             executor: futures.ThreadPoolExecutor = None
@@ -221,6 +474,8 @@ class Scheduler:
         logger.info('Initialize update and schedule flow indexes from database.')
         updated_flow_models = index_all_flows(self._flow_models, self.log_path)
         self._flow_models = list(updated_flow_models.keys())
+        # Flow runs of this routine look up their flows from the identity map.
+        identity_map.add(self._flow_models)
         for flow_model in self._flow_models:
             schedule_flow(
                 flow_model,
@@ -0,0 +1,122 @@
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+PROFILE_TYPES = ('cpu', 'mem')
+
+
+def get_profile_path(log_file_path: Path, profile: str) -> Path:
+    '''Return path of the profile report which is placed next to the log file.'''
+    if profile == 'cpu':
+        return log_file_path.with_suffix('.prof')
+    elif profile == 'mem':
+        return log_file_path.with_suffix('.mem.txt')
+
+    raise ValueError(f"Profile should be one of {PROFILE_TYPES}, not '{profile}'.")
+
+
+@contextmanager
+def profile_run(
+        profile: str,
+        profile_path: Path,
+        limit: int = 50
+    ) -> Iterator[Optional[List[Any]]]:
+    '''Profile the block with cProfile (cpu) or tracemalloc (mem) and write its report.
+
+    cProfile only profiles the thread which enabled it, thus the cpu profile yields a list
+    of thread profilers, filled by 'profile_thread' in worker threads, which are merged into
+    the report. The mem profile yields None as tracemalloc traces all threads.
+    '''
+    if profile not in PROFILE_TYPES:
+        raise ValueError(f"Profile should be one of {PROFILE_TYPES}, not '{profile}'.")
+
+    profile_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if profile == 'cpu':
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        thread_profilers: List[cProfile.Profile] = []
+        profiler.enable()
+        try:
+            yield thread_profilers
+        finally:
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            for thread_profiler in thread_profilers:
+                stats.add(thread_profiler)
+            stats.dump_stats(profile_path)
+
+        return
+
+    import tracemalloc
+
+    is_tracing = tracemalloc.is_tracing()
+    if not is_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start_snapshot = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        end_snapshot = tracemalloc.take_snapshot()
+        _, peak_size = tracemalloc.get_traced_memory()
+        if not is_tracing:
+            tracemalloc.stop()
+
+        trace_filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = (
+            end_snapshot.filter_traces(trace_filters)
+            .compare_to(start_snapshot.filter_traces(trace_filters), 'lineno')
+        )
+        with open(profile_path, 'w') as f:
+            f.write(f'Peak traced memory: {peak_size / 1024:.1f} KiB\n')
+            f.write(f'Top {limit} allocation sites by size difference:\n')
+            for stat in stats[:limit]:
+                f.write(f'{stat}\n')
+
+
+@contextmanager
+def profile_thread(thread_profilers: Optional[List[Any]]) -> Iterator[None]:
+    '''Profile the block of a worker thread into the thread profilers of 'profile_run'.'''
+    if thread_profilers is None:
+        yield
+        return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Since Python 3.12, cProfile profiles all threads and only one profiler could be active.
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        thread_profilers.append(profiler)
+
+
+def read_profile_report(
+        profile_path: Path,
+        limit: int = 20,
+        sort_by: str = 'cumulative'
+    ) -> str:
+    '''Return the hottest functions or the top allocation sites from the profile report.'''
+    if profile_path.suffix == '.prof':
+        import pstats
+
+        stream = io.StringIO()
+        stats = pstats.Stats(str(profile_path), stream=stream)
+        stats.sort_stats(sort_by).print_stats(limit)
+        return stream.getvalue()
+
+    with open(profile_path) as f:
+        lines = f.read().splitlines()
+
+    return '\n'.join(lines[:limit + 2])
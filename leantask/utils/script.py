@@ -1,5 +1,5 @@
 import hashlib
-import importlib
+import importlib.util
 from pathlib import Path
 from typing import Union
 
@@ -1,6 +1,9 @@
+import os
 import re
+import secrets
+import time
 import uuid
-from typing import Any
+from typing import Any, Dict, Iterable
 
 SAFE_CHARS_PATTERN = r'^[a-zA-Z0-9-_.+,*`()$]+$'
 
@@ -34,3 +37,52 @@ def validate_use_safe_chars(value: str) -> str:
 
 def generate_uuid() -> str:
     return str(uuid.uuid4())
+
+
+def generate_uuid7() -> str:
+    '''Return a time-ordered UUID (version 7), thus later ids sort after earlier ones.'''
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (
+        (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76
+        | secrets.randbits(12) << 64
+        | 0b10 << 62
+        | secrets.randbits(62)
+    )
+    return str(uuid.UUID(int=value))
+
+
+def shortest_unique_prefixes(values: Iterable[str], min_length: int = 8) -> Dict[str, str]:
+    '''Return the shortest prefix of each value, at least 'min_length' long, which is not shared
+    by the other values.
+
+    Time-ordered ids created close together share their leading characters, thus a fixed
+    length prefix is not enough to tell them apart.
+    '''
+    sorted_values = sorted(set(values))
+    prefixes = dict()
+    for i, value in enumerate(sorted_values):
+        length = min_length
+        for neighbor in sorted_values[max(i - 1, 0):i] + sorted_values[i + 1:i + 2]:
+            length = max(length, len(os.path.commonprefix([value, neighbor])) + 1)
+
+        if value[length - 1:length] == '-':
+            length += 1
+        prefixes[value] = value[:length]
+
+    return prefixes
+
+
+def align_prefixes(prefixes: Dict[str, str], length: int = None) -> Dict[str, str]:
+    '''Extend the prefixes to the same length, the longest one unless given, thus ids listed
+    in a single table line up. Longer prefixes of unique prefixes are still unique.
+    '''
+    if length is None:
+        length = max((len(prefix) for prefix in prefixes.values()), default=0)
+
+    aligned_prefixes = dict()
+    for value in prefixes:
+        value_length = length + 1 if value[length - 1:length] == '-' else length
+        aligned_prefixes[value] = value[:value_length]
+
+    return aligned_prefixes
@@ -1,22 +1,165 @@
-from typing import Any, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 
 
-def sort_tree_nodes(nodes: List[Any], children_attr: str):
-    ordered_nodes = []
-    visited_nodes = set()
+class CycleError(ValueError):
+    '''Raised when nodes could not be sorted due to a cycle.'''
+    def __init__(self, path: List[Any], labels: List[str]) -> None:
+        self.path = path
+        super(CycleError, self).__init__('There is a cycle in the graph: ' + ' -> '.join(labels))
 
-    def dfs(node):
-        nonlocal visited_nodes
-        if node in visited_nodes:
-            return
 
-        visited_nodes.add(node)
+def _find_cycle(nodes: List[Any], children_attr: str) -> List[Any]:
+    remaining_nodes = set(nodes)
+    parents: Dict[Any, Any] = dict()
+    for node in nodes:
         for child_node in getattr(node, children_attr):
-            dfs(child_node)
+            if child_node in remaining_nodes and child_node not in parents:
+                parents[child_node] = node
 
-        ordered_nodes.append(node)
+    # Every remaining node has a remaining parent, thus walking through
+    # the parents will always end up visiting a node twice.
+    path = [nodes[0]]
+    path_positions = {nodes[0]: 0}
+    while True:
+        node = parents[path[-1]]
+        if node in path_positions:
+            cycle = path[path_positions[node]:][::-1]
+            cycle.append(cycle[0])
+            return cycle
 
-    for node in nodes:
-        dfs(node)
+        path_positions[node] = len(path)
+        path.append(node)
+
+
+def sort_tree_levels(
+        nodes: Iterable[Any],
+        children_attr: str,
+        key: Callable = None
+    ) -> List[List[Any]]:
+    '''Sort nodes into topological levels where nodes of a level only depend on nodes from previous levels.
+
+    Nodes within a level are ordered by 'key', or by their first seen order if it's not set.
+    '''
+    all_nodes = list(dict.fromkeys(nodes))
+    positions = {node: position for position, node in enumerate(all_nodes)}
+    position = 0
+    while position < len(all_nodes):
+        for child_node in getattr(all_nodes[position], children_attr):
+            if child_node not in positions:
+                positions[child_node] = len(all_nodes)
+                all_nodes.append(child_node)
+        position += 1
+
+    in_degrees = dict.fromkeys(all_nodes, 0)
+    for node in all_nodes:
+        for child_node in getattr(node, children_attr):
+            in_degrees[child_node] += 1
+
+    if key is None:
+        sort_key = positions.__getitem__
+    else:
+        def sort_key(node: Any):
+            return key(node), positions[node]
+
+    levels = []
+    total_sorted = 0
+    level = sorted((node for node in all_nodes if in_degrees[node] == 0), key=sort_key)
+    while len(level) > 0:
+        levels.append(level)
+        total_sorted += len(level)
+
+        next_level = []
+        for node in level:
+            for child_node in getattr(node, children_attr):
+                in_degrees[child_node] -= 1
+                if in_degrees[child_node] == 0:
+                    next_level.append(child_node)
+
+        level = sorted(next_level, key=sort_key)
+
+    if total_sorted < len(all_nodes):
+        cycle = _find_cycle(
+            [node for node in all_nodes if in_degrees[node] > 0],
+            children_attr
+        )
+        raise CycleError(
+            cycle,
+            [str(key(node)) if key is not None else repr(node) for node in cycle]
+        )
+
+    return levels
+
+
+def sort_tree_nodes(
+        nodes: Iterable[Any],
+        children_attr: str,
+        key: Callable = None
+    ) -> List[Any]:
+    '''Sort nodes topologically thus parent nodes always come before their children.'''
+    return [
+        node
+        for level in sort_tree_levels(nodes, children_attr, key=key)
+        for node in level
+    ]
+
+
+class DAGIndex:
+    '''Compiled index of a directed acyclic graph.
+
+    Nodes are numbered by their topological order, thus transitive children
+    are kept as integer bitsets and iterated in topological order as well.
+    '''
+    def __init__(
+            self,
+            nodes: Iterable[Any],
+            children_attr: str,
+            key_attr: str = None
+        ) -> None:
+        key = None
+        if key_attr is not None:
+            def key(node: Any) -> Any:
+                return getattr(node, key_attr)
+
+        self.levels: List[List[Any]] = sort_tree_levels(nodes, children_attr, key=key)
+        self.nodes: List[Any] = [node for level in self.levels for node in level]
+        self.node_ids: Dict[Any, int] = {
+            node: node_id
+            for node_id, node in enumerate(self.nodes)
+        }
+        self.children: List[List[int]] = [
+            sorted(self.node_ids[child_node] for child_node in getattr(node, children_attr))
+            for node in self.nodes
+        ]
+        self.keys: Dict[Any, Any] = dict()
+        if key_attr is not None:
+            self.keys = {getattr(node, key_attr): node for node in self.nodes}
+
+        self._descendants: List[int] = None
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def get(self, key: Any) -> Any:
+        return self.keys.get(key)
+
+    def descendants(self, node: Any) -> int:
+        '''Return bitset of all transitive children of the node.'''
+        if self._descendants is None:
+            descendants = [0] * len(self.nodes)
+            for node_id in range(len(self.nodes) - 1, -1, -1):
+                bits = 0
+                for child_id in self.children[node_id]:
+                    bits |= (1 << child_id) | descendants[child_id]
+                descendants[node_id] = bits
+
+            self._descendants = descendants
+
+        return self._descendants[self.node_ids[node]]
 
-    return ordered_nodes[::-1]
+    def iter_descendants(self, node: Any) -> Iterator[Any]:
+        '''Iterate all transitive children of the node once in topological order.'''
+        bit_string = bin(self.descendants(node))[:1:-1]
+        node_id = bit_string.find('1')
+        while node_id >= 0:
+            yield self.nodes[node_id]
+            node_id = bit_string.find('1', node_id + 1)
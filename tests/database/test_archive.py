@@ -0,0 +1,61 @@
+import uuid
+from datetime import datetime
+
+from leantask.context import GlobalContext
+from leantask.database import FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskRunModel
+from leantask.database.archive import (
+    MAX_ATTACHED_DATABASES, attach_archives, create_archive, get_archive_name, get_archive_names_of_id
+)
+from leantask.database.common import get_by_short_id, open_db_connection
+from leantask.enum import FlowRunStatus
+
+MODELS = [FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskRunModel]
+
+
+def uuid7_at(value: datetime) -> str:
+    timestamp_ms = int(value.timestamp() * 1000)
+    return str(uuid.UUID(int=timestamp_ms << 80 | 0x7 << 76 | 0b10 << 62 | uuid.uuid4().int >> 66))
+
+
+def create_monthly_archives(total_months: int) -> list:
+    run_ids = []
+    for month in range(total_months):
+        created_datetime = datetime(2023 + month // 12, month % 12 + 1, 15)
+        archive_name = get_archive_name(created_datetime)
+        archive_database = open_db_connection(create_archive(archive_name))
+        run_ids.append(uuid7_at(created_datetime))
+        archive_database.execute_sql(
+            'INSERT INTO flow_runs (id, flow_id, is_manual, status, created_datetime, modified_datetime) '
+            'VALUES (?, ?, 0, ?, ?, ?)',
+            (run_ids[-1], 'flow', FlowRunStatus.DONE.value, created_datetime, created_datetime)
+        )
+        archive_database.close()
+
+    return run_ids
+
+
+def test_attach_archives_of_run_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlobalContext, 'PROJECT_DIR', tmp_path)
+    run_ids = create_monthly_archives(MAX_ATTACHED_DATABASES + 2)
+    assert get_archive_names_of_id(run_ids[0][:13]) == ['archive_2023_01']
+    assert get_archive_names_of_id('not-an-id') == []
+
+    database = open_db_connection(tmp_path / 'leantask.db')
+    with database.bind_ctx(MODELS):
+        database.create_tables(MODELS)
+
+        # Only the newest archives are attached.
+        archive_names = attach_archives()
+        assert len(archive_names) == MAX_ATTACHED_DATABASES
+        assert 'archive_2023_01' not in archive_names
+        assert FlowRunModel.select().count() == MAX_ATTACHED_DATABASES
+    database.close()
+
+    database = open_db_connection(tmp_path / 'leantask.db')
+    with database.bind_ctx(MODELS):
+        # Archive of the looked up run takes the place of the oldest of the newest archives.
+        archive_names = attach_archives(run_ids[0][:13])
+        assert len(archive_names) == MAX_ATTACHED_DATABASES
+        assert 'archive_2023_01' in archive_names
+        assert get_by_short_id(FlowRunModel.select(), FlowRunModel.id, run_ids[0][:13]).id == run_ids[0]
+    database.close()
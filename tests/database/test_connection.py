@@ -0,0 +1,97 @@
+import pytest
+from peewee import OperationalError
+
+from leantask.context import GlobalContext
+from leantask.database import FlowModel, FlowLogModel, LOG_SCHEMA_NAME, attach_log_database
+from leantask.database import base
+from leantask.database.common import open_db_connection
+from leantask.flow.base import ModelMixin
+
+
+def test_open_db_connection_pragmas(tmp_path):
+    database = open_db_connection(tmp_path / 'leantask.db')
+    assert database.execute_sql('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert database.execute_sql('PRAGMA busy_timeout').fetchone()[0] > 0
+    database.checkpoint()
+    database.close()
+
+
+def test_read_only_connection(tmp_path):
+    database_path = tmp_path / 'leantask.db'
+    database = open_db_connection(database_path)
+    with database.bind_ctx([FlowModel]):
+        database.create_tables([FlowModel])
+        FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+
+        database.set_read_only()
+        assert FlowModel.select().count() == 1
+        with pytest.raises(OperationalError):
+            FlowModel.create(name='other', path='other.py', checksum='0' * 32)
+
+        database.set_read_only(False)
+        FlowModel.create(name='other', path='other.py', checksum='0' * 32)
+        assert FlowModel.select().count() == 2
+
+    database.close()
+
+
+class FlowRecord(ModelMixin):
+    __model__ = FlowModel
+    __refs__ = ('id', )
+    __slots__ = ('name', 'path', 'checksum')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.path = f'{name}.py'
+        self.checksum = '0' * 32
+        super(FlowRecord, self).__init__()
+
+
+def test_attach_log_database(tmp_path, monkeypatch):
+    # Log database is left in 'wal' mode by a former connection.
+    log_database = open_db_connection(tmp_path / 'leantask_log.db')
+    with log_database.bind_ctx([FlowLogModel]):
+        log_database.create_tables([FlowLogModel])
+    log_database.close()
+
+    monkeypatch.setattr(GlobalContext, 'DATABASE_JOURNAL_MODE', 'delete')
+    database = open_db_connection(tmp_path / 'leantask.db')
+    monkeypatch.setattr(base, 'database', database)
+    monkeypatch.setattr(base, 'log_database', log_database)
+    monkeypatch.setattr(GlobalContext, 'STATUS_JOURNAL', False)
+    for model_class in base._log_model_classes():
+        monkeypatch.setattr(model_class._meta, 'database', model_class._meta.database)
+        monkeypatch.setattr(model_class._meta, 'schema', model_class._meta.schema)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(GlobalContext, 'DATABASE_JOURNAL_MODE', 'wal')
+        with pytest.raises(ValueError):
+            attach_log_database()
+
+    with database.bind_ctx([FlowModel]):
+        database.create_tables([FlowModel])
+        attach_log_database()
+        assert FlowLogModel._meta.database is database
+        # A commit is only atomic across both files with a rollback journal.
+        assert database.execute_sql('PRAGMA main.journal_mode').fetchone()[0] == 'delete'
+        assert database.execute_sql(f'PRAGMA "{LOG_SCHEMA_NAME}".journal_mode').fetchone()[0] == 'delete'
+
+        def fail_log_insert(model, force_insert=False):
+            raise OperationalError('disk I/O error')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(FlowLogModel, 'save', fail_log_insert)
+            with pytest.raises(OperationalError):
+                FlowRecord('flow').save()
+
+        assert FlowModel.select().count() == 0
+        assert FlowLogModel.select().count() == 0
+
+        flow = FlowRecord('flow')
+        flow.save()
+        attach_log_database(False)
+
+    database.close()
+    rows = log_database.execute_sql('SELECT ref_id, name FROM flows').fetchall()
+    assert rows == [(flow.id, 'flow')]
+    log_database.close()
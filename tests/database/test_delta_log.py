@@ -0,0 +1,41 @@
+from peewee import SqliteDatabase
+
+from leantask.database import FlowRunLogModel
+from leantask.enum import FlowRunStatus
+
+
+def test_delta_log_snapshots(tmp_path):
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with log_database.bind_ctx([FlowRunLogModel]):
+        log_database.create_tables([FlowRunLogModel])
+
+        states = [
+            {'ref_id': 'run', 'ref_flow': 'flow', 'is_manual': False, 'params': '{"a": 1}',
+             'status': FlowRunStatus.SCHEDULED},
+            {'ref_id': 'run', 'ref_flow': 'flow', 'is_manual': False, 'params': '{"a": 1}',
+             'status': FlowRunStatus.RUNNING},
+            {'ref_id': 'run', 'ref_flow': 'flow', 'is_manual': False, 'params': None,
+             'status': FlowRunStatus.DONE},
+        ]
+        previous = dict()
+        for seq, state in enumerate(states):
+            kwargs = FlowRunLogModel.delta(previous, state)
+            FlowRunLogModel.create(seq=seq, **kwargs)
+            previous = state
+
+        assert FlowRunLogModel.delta(previous, states[-1]) is None
+
+        rows = list(FlowRunLogModel.select().order_by(FlowRunLogModel.seq))
+        assert rows[1].params is None and rows[1].is_manual is None
+        assert rows[1].status == FlowRunStatus.RUNNING
+        assert rows[2].null_fields == 'params'
+        assert all(row.ref_flow_id == 'flow' for row in rows)
+
+        snapshots = FlowRunLogModel.snapshots('run')
+        assert [snapshot['status'] for snapshot in snapshots] == [state['status'] for state in states]
+        assert [snapshot['params'] for snapshot in snapshots] == [state['params'] for state in states]
+        assert all(snapshot['is_manual'] is False for snapshot in snapshots)
+
+        full_kwargs = FlowRunLogModel.delta(None, states[-1])
+        assert full_kwargs['null_fields'] == 'params'
+        assert full_kwargs['is_manual'] is False
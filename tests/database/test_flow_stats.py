@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from peewee import SqliteDatabase
+
+from leantask.database import FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel
+from leantask.enum import FlowRunStatus
+
+MODELS = [FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel]
+
+
+def test_flow_stats_refresh(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    with database.bind_ctx(MODELS):
+        database.create_tables(MODELS)
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+
+        now = datetime.now()
+        for seconds, status in ((10, FlowRunStatus.DONE), (20, FlowRunStatus.FAILED), (30, FlowRunStatus.DONE)):
+            FlowRunModel.create(
+                flow=flow_model.id,
+                status=status,
+                started_datetime=now - timedelta(seconds=seconds),
+                modified_datetime=now
+            )
+
+        flow_stats_model = FlowStatsModel.get_by_id(flow_model.id)
+        assert flow_stats_model.finished_runs == 3
+        assert abs(flow_stats_model.success_rate - 2 / 3) < 1e-9
+        assert flow_stats_model.p50_seconds == 20
+        assert flow_stats_model.p95_seconds == 30
+        assert flow_stats_model.last_run_status in (FlowRunStatus.DONE, FlowRunStatus.FAILED)
+        assert flow_stats_model.next_schedule_datetime is None
+
+        schedule_datetime = (now + timedelta(hours=1)).replace(microsecond=0)
+        flow_schedule_model = FlowScheduleModel.create(flow=flow_model.id, schedule_datetime=schedule_datetime)
+        assert FlowStatsModel.get_by_id(flow_model.id).next_schedule_datetime == schedule_datetime
+
+        flow_run_model = FlowRunModel.create(
+            flow=flow_model.id,
+            status=FlowRunStatus.SCHEDULED,
+            flow_schedule_id=flow_schedule_model.id,
+            modified_datetime=now + timedelta(seconds=1)
+        )
+        flow_schedule_model.delete_instance()
+        assert FlowStatsModel.get_by_id(flow_model.id).next_schedule_datetime is None
+
+        # Bulk writes, e.g. by the status journal, refresh the summary through 'rows_written'.
+        flow_run_model.status = FlowRunStatus.RUNNING
+        flow_run_model.started_datetime = now
+        FlowRunModel.insert_many([flow_run_model.__data__]).on_conflict_replace().execute()
+        FlowRunModel.rows_written([flow_run_model.__data__])
+
+        flow_stats_model = FlowStatsModel.get_by_id(flow_model.id)
+        assert flow_stats_model.last_run_id == flow_run_model.id
+        assert flow_stats_model.last_run_status == FlowRunStatus.RUNNING
+        assert flow_stats_model.last_run_seconds is None
+        assert flow_stats_model.finished_runs == 3
+
+
+def test_flow_stats_record_runs(tmp_path, monkeypatch):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    with database.bind_ctx(MODELS):
+        database.create_tables(MODELS)
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+
+        now = datetime.now()
+        flow_run_model = FlowRunModel.create(flow=flow_model.id, status=FlowRunStatus.DONE, started_datetime=now)
+        assert FlowStatsModel.get_by_id(flow_model.id).finished_runs == 1
+
+        # Unfinished runs only update the last run, while the window is kept.
+        monkeypatch.setattr(
+            FlowStatsModel, '_summarize_window', lambda flow_id: pytest.fail('window recomputed')
+        )
+        running_run_model = FlowRunModel.create(
+            flow=flow_model.id,
+            status=FlowRunStatus.RUNNING,
+            started_datetime=now + timedelta(seconds=1),
+            modified_datetime=now + timedelta(seconds=1)
+        )
+        flow_stats_model = FlowStatsModel.get_by_id(flow_model.id)
+        assert flow_stats_model.last_run_id == running_run_model.id
+        assert flow_stats_model.finished_runs == 1
+
+        # Rows older than the last run don't replace it.
+        FlowStatsModel.record_runs([{**flow_run_model.__data__, 'status': FlowRunStatus.RUNNING}])
+        assert FlowStatsModel.get_by_id(flow_model.id).last_run_id == running_run_model.id
+        monkeypatch.undo()
+
+        running_run_model.status = FlowRunStatus.FAILED
+        running_run_model.modified_datetime = now + timedelta(seconds=3)
+        running_run_model.save()
+        flow_stats_model = FlowStatsModel.get_by_id(flow_model.id)
+        assert flow_stats_model.last_run_status == FlowRunStatus.FAILED
+        assert flow_stats_model.last_run_seconds == 2
+        assert flow_stats_model.finished_runs == 2
+        assert flow_stats_model.success_rate == 0.5
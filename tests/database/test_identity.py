@@ -0,0 +1,64 @@
+from peewee import SqliteDatabase
+
+from leantask.database import FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskModel
+from leantask.database.identity import identity_map
+from leantask.enum import FlowRunStatus
+
+
+def test_identity_map(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    with database.bind_ctx([FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskModel]):
+        database.create_tables([FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskModel])
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+        task_model = TaskModel.create(flow=flow_model.id, name='task')
+        for _ in range(2):
+            FlowRunModel.create(flow=flow_model.id, status=FlowRunStatus.DONE)
+
+        identity_map.invalidate()
+        first_run_model, second_run_model = FlowRunModel.select()
+        assert first_run_model.flow is second_run_model.flow
+        assert identity_map.get(FlowModel, flow_model.id) is first_run_model.flow
+        assert identity_map.get(FlowModel, 'missing') is None
+
+        assert identity_map.find(TaskModel, flow=flow_model.id, name='task') is None
+        identity_map.add(TaskModel.select())
+        assert identity_map.find(TaskModel, flow=flow_model.id, name='task').id == task_model.id
+
+        identity_map.invalidate(FlowModel, flow_model.id)
+        assert FlowRunModel.get_by_id(first_run_model.id).flow is not first_run_model.flow
+        assert len(identity_map) == 2
+
+        identity_map.invalidate(TaskModel)
+        assert len(identity_map) == 1
+        identity_map.invalidate()
+        assert len(identity_map) == 0
+
+
+def test_identity_map_find_index(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    with database.bind_ctx([FlowModel, TaskModel]):
+        database.create_tables([FlowModel, TaskModel])
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+        first_task_model = TaskModel.create(flow=flow_model.id, name='first')
+
+        identity_map.invalidate()
+        identity_map.add([first_task_model])
+        assert identity_map.find(TaskModel, flow=flow_model.id, name='first') is first_task_model
+
+        # Models kept after the first lookup are indexed as well.
+        second_task_model = TaskModel.create(flow=flow_model.id, name='second')
+        identity_map.add([second_task_model])
+        assert identity_map.find(TaskModel, name='second', flow=flow_model.id) is second_task_model
+
+        # A replaced model is indexed by its current fields only.
+        renamed_task_model = TaskModel.get_by_id(second_task_model.id)
+        renamed_task_model.name = 'renamed'
+        identity_map.add([renamed_task_model])
+        assert identity_map.find(TaskModel, flow=flow_model.id, name='second') is None
+        assert identity_map.find(TaskModel, flow=flow_model.id, name='renamed') is renamed_task_model
+
+        identity_map.invalidate(TaskModel, first_task_model.id)
+        assert identity_map.find(TaskModel, flow=flow_model.id, name='first') is None
+        identity_map.invalidate(TaskModel)
+        assert identity_map.find(TaskModel, flow=flow_model.id, name='renamed') is None
+        identity_map.invalidate()
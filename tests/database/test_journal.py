@@ -0,0 +1,73 @@
+import pytest
+from peewee import OperationalError, SqliteDatabase
+
+from leantask.database import FlowModel, FlowLogModel
+from leantask.database import journal as journal_module
+from leantask.database.journal import StatusJournal
+
+
+def test_status_journal_group_commit(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx([FlowModel]), log_database.bind_ctx([FlowLogModel]):
+        database.create_tables([FlowModel])
+        log_database.create_tables([FlowLogModel])
+
+        model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+
+        journal = StatusJournal(interval=60, batch_size=100)
+        for description in ('first', 'second', 'third'):
+            model.description = description
+            journal.put(model, {
+                'ref_id': model.id,
+                'name': model.name,
+                'path': model.path,
+                'checksum': model.checksum,
+                'description': description
+            })
+
+        assert FlowModel.get_by_id(model.id).description is None
+        assert len(journal) == 3
+
+        journal.flush()
+        assert len(journal) == 0
+        assert FlowModel.get_by_id(model.id).description == 'third'
+        assert FlowLogModel.select().count() == 3
+
+
+def test_status_journal_requeues_failed_write(tmp_path, monkeypatch):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx([FlowModel]), log_database.bind_ctx([FlowLogModel]):
+        database.create_tables([FlowModel])
+        log_database.create_tables([FlowLogModel])
+
+        model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+        journal = StatusJournal(interval=60, batch_size=100)
+        model.description = 'first'
+        journal.put(model, {'ref_id': model.id, 'name': model.name, 'description': 'first'})
+
+        write_by_database = journal_module._write_by_database
+
+        def fail_once(items):
+            monkeypatch.setattr(journal_module, '_write_by_database', write_by_database)
+            raise OperationalError('database is locked')
+
+        monkeypatch.setattr(journal_module, '_write_by_database', fail_once)
+        with pytest.raises(OperationalError):
+            journal.flush()
+        assert len(journal) == 1
+
+        # Updates queued after the failure are newer than the requeued ones.
+        model.description = 'second'
+        journal.put(model, {'ref_id': model.id, 'description': 'second'})
+        journal.flush()
+        assert len(journal) == 0
+        assert FlowModel.get_by_id(model.id).description == 'second'
+        assert [log_model.description for log_model in FlowLogModel.select().order_by(FlowLogModel.seq)] \
+            == ['first', 'second']
+
+        # Errors of background writes are raised by the next flush.
+        journal._error = OperationalError('disk I/O error')
+        with pytest.raises(RuntimeError):
+            journal.flush()
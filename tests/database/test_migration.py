@@ -0,0 +1,231 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from peewee import SqliteDatabase
+from playhouse.migrate import SqliteMigrator, migrate
+
+from leantask.database import (
+    FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, MetadataModel,
+    TaskModel, TaskDownstreamModel, TaskRunModel, TaskRunBatchModel,
+    FlowLogModel, FlowRunLogModel, TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel,
+    SchedulerSessionModel
+)
+from leantask.database.migration import (
+    LATEST_SCHEMA_VERSION, MIGRATIONS, get_schema_version, migrate_database, set_schema_version
+)
+from leantask.enum import FlowRunStatus, TaskRunStatus
+from tests.cli.main.test_init import init_project
+
+MODELS = [
+    FlowModel, FlowScheduleModel, FlowRunModel, MetadataModel,
+    TaskModel, TaskDownstreamModel, TaskRunModel, TaskRunBatchModel
+]
+LOG_MODELS = [
+    FlowLogModel, FlowRunLogModel, TaskLogModel, TaskDownstreamLogModel, TaskRunLogModel,
+    SchedulerSessionModel
+]
+
+
+def create_legacy_schema(database, log_database):
+    '''Create the tables as an unversioned project, without the newer columns and indexes.'''
+    database.create_tables(MODELS)
+    log_database.create_tables(LOG_MODELS)
+    database.drop_tables([TaskRunBatchModel])
+
+    for db, models in ((database, MODELS), (log_database, LOG_MODELS)):
+        for model in models:
+            foreign_key_columns = [[field.column_name] for field in model._meta.refs]
+            for index in db.get_indexes(model._meta.table_name):
+                if not index.unique and index.columns not in foreign_key_columns:
+                    db.execute_sql(f'DROP INDEX "{index.name}"')
+
+    migrate(SqliteMigrator(database).drop_column(FlowModel._meta.table_name, 'triggers'))
+    migrate(SqliteMigrator(log_database).drop_column(TaskRunLogModel._meta.table_name, 'queue_seconds'))
+    for db, model in (
+            (database, FlowRunModel), (database, TaskRunModel),
+            (log_database, FlowRunLogModel), (log_database, TaskRunLogModel)
+        ):
+        sql, params = model._schema._create_table(safe=False).query()
+        db.drop_tables([model])
+        db.execute_sql(sql.replace('"status" INTEGER', '"status" VARCHAR(50)'), params)
+
+    for model in (FlowLogModel, FlowRunLogModel, TaskLogModel, TaskRunLogModel):
+        migrator = SqliteMigrator(log_database)
+        migrate(
+            migrator.drop_column(model._meta.table_name, 'seq'),
+            migrator.drop_column(model._meta.table_name, 'null_fields')
+        )
+
+
+def index_name(model, *column_names) -> str:
+    return '_'.join((model._meta.name,) + column_names)
+
+
+def query_plan(database, query) -> str:
+    sql, params = query.sql()
+    rows = database.execute_sql('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    return ' '.join(row[-1] for row in rows)
+
+
+def test_migrate_legacy_project(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx(MODELS), log_database.bind_ctx(LOG_MODELS):
+        create_legacy_schema(database, log_database)
+        assert get_schema_version() == 0
+
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+        for status in ('DONE', 'RUNNING', 'FAILED_TIMEOUT_RUN', 'NOT_A_STATUS'):
+            database.execute_sql(
+                'INSERT INTO flow_runs (id, flow_id, is_manual, status, created_datetime, modified_datetime) '
+                'VALUES (?, ?, 0, ?, ?, ?)',
+                (status, flow_model.id, status, '2024-01-01 00:00:00', '2024-01-01 00:00:00')
+            )
+
+        for created_datetime, params, status in (
+                ('2024-01-01 00:00:00', '{}', 'RUNNING'),
+                ('2024-01-01 00:01:00', None, 'DONE')
+            ):
+            log_database.execute_sql(
+                'INSERT INTO flow_runs (id, ref_id, ref_flow_id, is_manual, params, status, created_datetime) '
+                'VALUES (?, ?, ?, 0, ?, ?, ?)',
+                (created_datetime, 'DONE', flow_model.id, params, status, created_datetime)
+            )
+
+        assert migrate_database() == list(range(1, LATEST_SCHEMA_VERSION + 1))
+        assert get_schema_version() == LATEST_SCHEMA_VERSION
+        assert migrate_database() == []
+
+        assert 'triggers' in {column.name for column in database.get_columns(FlowModel._meta.table_name)}
+        assert 'queue_seconds' in {
+            column.name for column in log_database.get_columns(TaskRunLogModel._meta.table_name)
+        }
+        assert TaskRunBatchModel.table_exists()
+
+        statuses = {model.id: model.status for model in FlowRunModel.select()}
+        assert statuses == {
+            'DONE': FlowRunStatus.DONE,
+            'RUNNING': FlowRunStatus.RUNNING,
+            'FAILED_TIMEOUT_RUN': FlowRunStatus.FAILED_TIMEOUT_RUN,
+            'NOT_A_STATUS': FlowRunStatus.UNKNOWN
+        }
+        rows = database.execute_sql('SELECT DISTINCT typeof(status) FROM flow_runs').fetchall()
+        assert rows == [('integer',)]
+
+        snapshots = FlowRunLogModel.snapshots('DONE')
+        assert [snapshot['seq'] for snapshot in snapshots] == [0, 1]
+        assert [snapshot['params'] for snapshot in snapshots] == ['{}', None]
+        assert [snapshot['status'] for snapshot in snapshots] == [FlowRunStatus.RUNNING, FlowRunStatus.DONE]
+
+        flow_stats_model = FlowStatsModel.get_by_id(flow_model.id)
+        assert flow_stats_model.finished_runs == 2
+        assert flow_stats_model.success_rate == 0.5
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx(MODELS), log_database.bind_ctx(LOG_MODELS):
+        create_legacy_schema(database, log_database)
+        migrate_database()
+
+        plan = query_plan(database, (
+            FlowRunModel.select()
+            .where(
+                (FlowRunModel.flow_schedule_id == 'id')
+                & FlowRunModel.is_active()
+                & FlowRunModel.status.in_((FlowRunStatus.SCHEDULED, FlowRunStatus.SCHEDULED_BY_USER))
+            )
+        ))
+        assert index_name(FlowRunModel, 'flow_schedule_id', 'status', 'active') in plan
+
+        plan = query_plan(database, (
+            FlowRunModel.select()
+            .where(
+                (FlowRunModel.flow == 'id')
+                & FlowRunModel.is_active()
+                & (FlowRunModel.status == FlowRunStatus.PENDING)
+            )
+        ))
+        assert index_name(FlowRunModel, 'flow_id', 'status', 'active') in plan
+
+        plan = query_plan(database, (
+            FlowRunModel.select()
+            .where(FlowRunModel.status == FlowRunStatus.DONE)
+            .order_by(FlowRunModel.modified_datetime.desc())
+        ))
+        assert index_name(FlowRunModel, 'status', 'modified_datetime') in plan
+        assert 'TEMP B-TREE' not in plan
+
+        plan = query_plan(database, (
+            FlowRunModel.select()
+            .order_by(FlowRunModel.modified_datetime.desc())
+            .limit(20)
+        ))
+        assert index_name(FlowRunModel, 'modified_datetime') in plan
+
+        plan = query_plan(database, (
+            FlowScheduleModel.select()
+            .where(FlowScheduleModel.schedule_datetime <= '2024-01-01')
+        ))
+        assert index_name(FlowScheduleModel, 'schedule_datetime') in plan
+
+        plan = query_plan(database, (
+            TaskRunModel.select()
+            .where(TaskRunModel.is_active() & (TaskRunModel.status == TaskRunStatus.WAITING))
+        ))
+        assert index_name(TaskRunModel, 'status', 'active') in plan
+
+        for log_model in (FlowRunLogModel, TaskRunLogModel):
+            plan = query_plan(log_database, log_model.select().where(log_model.ref_id == 'id'))
+            assert index_name(log_model, 'ref_id') in plan
+
+
+def run_command(project_dir, *args):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=project_dir,
+        env={**os.environ, 'PYTHONPATH': os.getcwd()},
+        capture_output=True,
+        text=True
+    )
+
+
+def test_cli_requires_migrated_schema(tmp_path):
+    assert init_project(tmp_path).returncode == 0
+    (tmp_path / 'flow.py').write_text(textwrap.dedent('''
+        from leantask import python_task, Flow
+
+        @python_task
+        def task():
+            pass
+
+        with Flow('flow') as flow:
+            task()
+    '''))
+
+    # Replace the databases by those of a project at schema version 1.
+    database_path = tmp_path / '.leantask' / 'leantask.db'
+    log_database_path = tmp_path / '.leantask' / 'leantask_log.db'
+    database_path.unlink()
+    log_database_path.unlink()
+    database = SqliteDatabase(str(database_path))
+    log_database = SqliteDatabase(str(log_database_path))
+    with database.bind_ctx(MODELS), log_database.bind_ctx(LOG_MODELS):
+        create_legacy_schema(database, log_database)
+        MIGRATIONS[0][2]()
+        set_schema_version(1)
+    database.close()
+    log_database.close()
+
+    for args in (('flow.py', 'status'), ('flow.py', 'index'), ('-m', 'leantask', 'flows', 'list')):
+        process = run_command(tmp_path, *args)
+        assert process.returncode == 1
+        assert 'leantask migrate' in process.stdout + process.stderr
+        assert 'Traceback' not in process.stderr
+
+    assert run_command(tmp_path, '-m', 'leantask', 'migrate').returncode == 0
+    assert run_command(tmp_path, 'flow.py', 'index').returncode == 0
+    assert run_command(tmp_path, 'flow.py', 'status').returncode == 0
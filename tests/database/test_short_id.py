@@ -0,0 +1,55 @@
+import pytest
+from peewee import SqliteDatabase
+
+from leantask.database import FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel
+from leantask.database.common import get_by_short_id, get_short_ids, prefix_range
+from leantask.enum import FlowRunStatus
+
+
+def test_get_by_short_id(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    with database.bind_ctx([FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel]):
+        database.create_tables([FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel])
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+        for flow_run_id in ('0190a1b2-0000', '0190a1b2-0001', '0190a1b3-0000'):
+            FlowRunModel.create(id=flow_run_id, flow=flow_model.id, status=FlowRunStatus.DONE)
+
+        assert get_by_short_id(FlowRunModel.select(), FlowRunModel.id, '0190A1B3').id == '0190a1b3-0000'
+        assert get_by_short_id(flow_model.flow_runs, FlowRunModel.id, '0190a1b2-0001').id == '0190a1b2-0001'
+
+        with pytest.raises(ValueError, match='0190a1b2-0000, 0190a1b2-0001'):
+            get_by_short_id(FlowRunModel.select(), FlowRunModel.id, '0190a1b2')
+        with pytest.raises(IndexError):
+            get_by_short_id(FlowRunModel.select(), FlowRunModel.id, '0190a1b4')
+
+        sql, params = FlowRunModel.select().where(prefix_range(FlowRunModel.id, '0190a1b2')).sql()
+        plan = ' '.join(row[-1] for row in database.execute_sql('EXPLAIN QUERY PLAN ' + sql, params))
+        assert 'USING INDEX' in plan and 'id>? AND id<?' in plan.replace('"', '')
+
+
+def test_get_short_ids_of_listed_runs(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    with database.bind_ctx([FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel]):
+        database.create_tables([FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel])
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+        other_flow_model = FlowModel.create(name='other', path='other.py', checksum='0' * 32)
+        FlowRunModel.create(id='0190a1b2-0000', flow=flow_model.id, status=FlowRunStatus.DONE)
+        FlowRunModel.create(id='0190a1b2-0001', flow=flow_model.id, status=FlowRunStatus.DONE)
+        FlowRunModel.create(id='0190a1b2-0002', flow=other_flow_model.id, status=FlowRunStatus.DONE)
+
+        # Only the latest run is listed, while its prefix still tells it apart from the older run.
+        short_ids = get_short_ids(flow_model.flow_runs, FlowRunModel.id, ['0190a1b2-0001'])
+        assert short_ids == {'0190a1b2-0001': '0190a1b2-0001'}
+        assert get_by_short_id(flow_model.flow_runs, FlowRunModel.id, short_ids['0190a1b2-0001']).id \
+            == '0190a1b2-0001'
+
+        # Runs of other flows are not in the scope of the lookup.
+        short_ids = get_short_ids(other_flow_model.flow_runs, FlowRunModel.id, ['0190a1b2-0002'])
+        assert short_ids == {'0190a1b2-0002': '0190a1b2'}
+        assert get_by_short_id(other_flow_model.flow_runs, FlowRunModel.id, '0190a1b2').id == '0190a1b2-0002'
+
+        # Ids listed along with them in the same table are told apart as well.
+        short_ids = get_short_ids(
+            other_flow_model.flow_runs, FlowRunModel.id, ['0190a1b2-0002'], other_ids=['0190a1b2-0001']
+        )
+        assert short_ids == {'0190a1b2-0002': '0190a1b2-0002'}
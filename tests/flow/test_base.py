@@ -0,0 +1,77 @@
+import pytest
+from peewee import IntegrityError, SqliteDatabase
+
+from leantask.context import GlobalContext
+from leantask.database import FlowModel, FlowLogModel
+from leantask.flow.base import ModelMixin
+
+
+class FlowRecord(ModelMixin):
+    __model__ = FlowModel
+    __refs__ = ('id', )
+    __slots__ = ('name', 'path', 'checksum', 'description')
+
+    def __init__(self, name: str, description: str = None) -> None:
+        self.name = name
+        self.path = f'{name}.py'
+        self.checksum = '0' * 32
+        self.description = description
+        super(FlowRecord, self).__init__()
+
+
+def select_rows(model, *field_names):
+    fields = [model._meta.fields[name] for name in field_names]
+    return sorted(model.select(*fields).order_by(*fields).tuples())
+
+
+def test_save_many_writes_rows_of_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlobalContext, 'STATUS_JOURNAL', False)
+    rows = dict()
+    for save_many in (False, True):
+        database = SqliteDatabase(str(tmp_path / f'leantask_{save_many}.db'))
+        log_database = SqliteDatabase(str(tmp_path / f'leantask_log_{save_many}.db'))
+        with database.bind_ctx([FlowModel]), log_database.bind_ctx([FlowLogModel]):
+            database.create_tables([FlowModel])
+            log_database.create_tables([FlowLogModel])
+            flows = [FlowRecord('first', 'description'), FlowRecord('second')]
+            if save_many:
+                FlowRecord.save_many(flows, batch_size=1)
+            else:
+                for flow in flows:
+                    flow.save()
+
+            assert all(flow._model_exists for flow in flows)
+            rows[save_many] = (
+                select_rows(FlowModel, 'name', 'path', 'checksum', 'description', 'active'),
+                select_rows(FlowLogModel, 'name', 'path', 'checksum', 'description', 'seq', 'null_fields')
+            )
+        database.close()
+        log_database.close()
+
+    assert rows[True] == rows[False]
+    assert len(rows[True][1]) == 2
+
+
+def test_save_many_rolls_back_failed_row(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlobalContext, 'STATUS_JOURNAL', False)
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx([FlowModel]), log_database.bind_ctx([FlowLogModel]):
+        database.create_tables([FlowModel])
+        log_database.create_tables([FlowLogModel])
+        FlowRecord('second').save()
+
+        flows = [FlowRecord('first'), FlowRecord('second')]
+        with pytest.raises(IntegrityError):
+            FlowRecord.save_many(flows)
+
+        assert not any(flow._model_exists for flow in flows)
+        assert select_rows(FlowModel, 'name') == [('second',)]
+        assert select_rows(FlowLogModel, 'name') == [('second',)]
+
+        # Saved objects are refused before anything is written.
+        saved_flow = flows[0]
+        saved_flow.save()
+        with pytest.raises(ValueError):
+            FlowRecord.save_many([FlowRecord('third'), saved_flow])
+        assert select_rows(FlowModel, 'name') == [('first',), ('second',)]
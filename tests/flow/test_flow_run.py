@@ -0,0 +1,198 @@
+import logging
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from peewee import SqliteDatabase
+
+from leantask import scheduler
+from leantask.database import (
+    FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskModel, TaskRunModel
+)
+from leantask.database.common import open_db_connection
+from leantask.database.identity import identity_map
+from leantask.enum import FlowRunStatus, TaskRunStatus
+from leantask.flow.output import StreamTaskOutput, TaskOutput
+from leantask.utils.string import quote
+from tests.cli.main.test_init import init_project
+
+
+def create_flow_project(project_dir: Path, flow_sources: dict) -> None:
+    '''Create a project with the flow files, given by their file names, and index the flows.'''
+    assert init_project(project_dir).returncode == 0
+    for file_name, source in flow_sources.items():
+        (project_dir / file_name).write_text(textwrap.dedent(source))
+        assert run_flow_command(project_dir, file_name, 'index') == 0
+
+
+def run_flow_command(project_dir: Path, file_name: str, *args: str, env: dict = None) -> int:
+    command = ' '.join(
+        ['export', f"PYTHONPATH={os.getcwd()}", '&&']
+        + [quote(sys.executable), quote(file_name)]
+        + list(args)
+    )
+    process = subprocess.run(
+        command,
+        shell=True,
+        cwd=project_dir,
+        env={**os.environ, **(env or dict())}
+    )
+    return process.returncode
+
+
+def open_project_database(project_dir: Path) -> SqliteDatabase:
+    return SqliteDatabase(str(project_dir / '.leantask' / 'leantask.db'))
+
+
+def test_task_run_persistence_seconds(tmp_path):
+    create_flow_project(tmp_path, {'flow.py': '''
+        from leantask import python_task, Flow
+
+        @python_task
+        def first():
+            return 1
+
+        @python_task
+        def second():
+            return 2
+
+        with Flow('persistence') as flow:
+            first() >> second()
+    '''})
+    assert run_flow_command(tmp_path, 'flow.py', 'run', '-F') == FlowRunStatus.DONE.value
+
+    database = open_project_database(tmp_path)
+    rows = database.execute_sql('SELECT id, status, persistence_seconds FROM task_runs').fetchall()
+    database.close()
+
+    assert len(rows) == 2
+    assert all(status == TaskRunStatus.DONE.value and seconds > 0 for _, status, seconds in rows)
+
+    # The time of the synchronous save of the final status is persisted by a later write.
+    log_database = SqliteDatabase(str(tmp_path / '.leantask' / 'leantask_log.db'))
+    for task_run_id, _, seconds in rows:
+        log_rows = log_database.execute_sql(
+            'SELECT status, persistence_seconds FROM task_runs WHERE ref_id = ? ORDER BY seq',
+            (task_run_id,)
+        ).fetchall()
+        done_index = [status for status, _ in log_rows].index(TaskRunStatus.DONE.value)
+        assert log_rows[-1] == (None, seconds)
+        assert done_index < len(log_rows) - 1
+        assert log_rows[done_index][1] is None or log_rows[done_index][1] < seconds
+    log_database.close()
+
+
+def test_stream_task_without_downstream(tmp_path):
+    create_flow_project(tmp_path, {'flow.py': '''
+        import time
+        from leantask import python_task, Flow
+
+        @python_task
+        def produce():
+            for i in range(20):
+                time.sleep(0.02)
+                yield i
+
+        with Flow('stream') as flow:
+            produce()
+    '''})
+    assert run_flow_command(tmp_path, 'flow.py', 'run', '-F') == FlowRunStatus.DONE.value
+
+    database = open_project_database(tmp_path)
+    status, output = database.execute_sql('SELECT status, output FROM task_runs').fetchone()
+    database.close()
+
+    assert status == TaskRunStatus.DONE.value
+    output = TaskOutput.loads(output)
+    assert isinstance(output, StreamTaskOutput)
+    assert list(output) == list(range(20))
+
+
+def test_waiting_flow_run_resumed(tmp_path, monkeypatch):
+    create_flow_project(tmp_path, {'flow.py': '''
+        from leantask import python_task, FileSensor, Flow
+
+        @python_task
+        def count_files(inputs):
+            return len(inputs['wait_for_sales'].get())
+
+        with Flow('sensor') as flow:
+            FileSensor('wait_for_sales', path='data/sales_*.csv') >> count_files()
+    '''})
+    # The flow process exits while its sensor waits, instead of holding a worker.
+    assert run_flow_command(tmp_path, 'flow.py', 'run', '-F') == FlowRunStatus.WAITING.value
+
+    monkeypatch.setattr(scheduler, 'logger', logging.getLogger(__name__))
+    models = [FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskModel, TaskRunModel]
+    database = open_db_connection(tmp_path / '.leantask' / 'leantask.db')
+    identity_map.invalidate()
+    with database.bind_ctx(models):
+        assert scheduler.get_due_waiting_flow_run_models() == []
+
+        (tmp_path / 'data').mkdir()
+        (tmp_path / 'data' / 'sales_1.csv').touch()
+        flow_run_model, = scheduler.get_due_waiting_flow_run_models()
+        assert flow_run_model.status == FlowRunStatus.WAITING
+
+        # As the scheduler does, the due run is set pending and continued by its id.
+        flow_run_model.status = FlowRunStatus.PENDING
+        flow_run_model.save()
+        assert run_flow_command(tmp_path, 'flow.py', 'run', '--run-id', flow_run_model.id, '-F') \
+            == FlowRunStatus.DONE.value
+
+        assert FlowRunModel.get_by_id(flow_run_model.id).status == FlowRunStatus.DONE
+        task_run_model = (
+            TaskRunModel.select()
+            .join(TaskModel)
+            .where((TaskRunModel.flow_run == flow_run_model.id) & (TaskModel.name == 'count_files'))
+            .get()
+        )
+        assert task_run_model.status == TaskRunStatus.DONE
+        assert TaskOutput.loads(task_run_model.output).get() == 1
+    database.close()
+    identity_map.invalidate()
+
+
+def test_continued_flow_run_reuses_task_runs(tmp_path):
+    create_flow_project(tmp_path, {'flow.py': '''
+        from leantask import python_task, FileSensor, Flow
+
+        @python_task
+        def first():
+            return 1
+
+        @python_task
+        def second(inputs):
+            return len(inputs['wait_for_file'].get()) + 1
+
+        with Flow('continued') as flow:
+            first() >> FileSensor('wait_for_file', path='ready.txt') >> second()
+    '''})
+    assert run_flow_command(tmp_path, 'flow.py', 'run', '-F') == FlowRunStatus.WAITING.value
+
+    database = open_project_database(tmp_path)
+    flow_run_id, = database.execute_sql('SELECT id FROM flow_runs').fetchone()
+    task_run_ids = {row[0] for row in database.execute_sql('SELECT id FROM task_runs')}
+    assert len(task_run_ids) == 3
+    done_task_runs = database.execute_sql(
+        'SELECT id, started_datetime FROM task_runs WHERE status = ?', (TaskRunStatus.DONE.value,)
+    ).fetchall()
+    assert len(done_task_runs) == 1
+    database.execute_sql('UPDATE flow_runs SET status = ?', (FlowRunStatus.PENDING.value,))
+
+    (tmp_path / 'ready.txt').touch()
+    assert run_flow_command(tmp_path, 'flow.py', 'run', '--run-id', flow_run_id, '-F') \
+        == FlowRunStatus.DONE.value
+
+    # Existing task runs are continued instead of being inserted again, and the done
+    # task run passes its output downstream without running again.
+    rows = database.execute_sql('SELECT id, attempt, status, output FROM task_runs').fetchall()
+    assert {row[0] for row in rows} == task_run_ids
+    assert all(attempt == 1 and status == TaskRunStatus.DONE.value for _, attempt, status, _ in rows)
+    assert sorted(TaskOutput.loads(output).get() for *_, output in rows if 'ready.txt' not in output) == [1, 2]
+    assert database.execute_sql(
+        'SELECT id, started_datetime FROM task_runs WHERE id = ?', (done_task_runs[0][0],)
+    ).fetchall() == done_task_runs
+    database.close()
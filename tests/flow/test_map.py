@@ -0,0 +1,99 @@
+from leantask.enum import FlowRunStatus, TaskRunStatus
+from leantask.flow.extensions.python_task import _iter_batches
+from leantask.flow.output import TaskOutput
+from leantask.utils.profile import read_profile_report
+from tests.flow.test_flow_run import create_flow_project, open_project_database, run_flow_command
+
+
+def test_iter_batches():
+    batches = list(_iter_batches(range(7), 3))
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_iter_batches_empty():
+    assert list(_iter_batches(iter([]), 3)) == []
+
+
+def test_mapped_task_run(tmp_path):
+    create_flow_project(tmp_path, {'flow.py': '''
+        import os
+        import time
+        from leantask import python_task, Flow
+
+        @python_task
+        def list_items():
+            return list(range(10))
+
+        @python_task
+        def square(item):
+            # Later items finish first, thus batches complete out of order.
+            time.sleep((10 - item) * 0.01)
+            if item == 7 and os.environ.get('FAIL_ITEM') == '7':
+                raise ValueError(f'Item {item} has failed.')
+            return item * item
+
+        @python_task
+        def total(inputs):
+            return sum(inputs['square'].get())
+
+        with Flow('mapped') as flow:
+            squares = square().map(list_items(), batch_size=3, max_workers=2)
+            squares >> total()
+    '''})
+    assert run_flow_command(tmp_path, 'flow.py', 'run', '-F', env={'FAIL_ITEM': '7'}) \
+        == FlowRunStatus.FAILED.value
+
+    database = open_project_database(tmp_path)
+
+    def select_task_runs(flow_run_id):
+        return {
+            name: (task_run_id, TaskRunStatus(status), output)
+            for task_run_id, name, status, output in database.execute_sql(
+                'SELECT task_runs.id, tasks.name, task_runs.status, task_runs.output FROM task_runs '
+                'JOIN tasks ON tasks.id = task_runs.task_id WHERE task_runs.flow_run_id = ?',
+                (flow_run_id,)
+            )
+        }
+
+    def select_batches(task_run_id):
+        return database.execute_sql(
+            'SELECT batch_index, size, status, error FROM task_run_batches '
+            'WHERE task_run_id = ? ORDER BY batch_index',
+            (task_run_id,)
+        ).fetchall()
+
+    failed_run_id, = database.execute_sql('SELECT id FROM flow_runs').fetchone()
+    task_runs = select_task_runs(failed_run_id)
+    assert task_runs['square'][1] == TaskRunStatus.FAILED
+    assert task_runs['total'][1] != TaskRunStatus.DONE
+
+    # One summary row per batch, where only the batch of the failed item has failed.
+    batches = select_batches(task_runs['square'][0])
+    assert [(batch_index, size, status) for batch_index, size, status, _ in batches] == [
+        (0, 3, TaskRunStatus.DONE.value),
+        (1, 3, TaskRunStatus.DONE.value),
+        (2, 3, TaskRunStatus.FAILED.value),
+        (3, 1, TaskRunStatus.DONE.value)
+    ]
+    assert 'Item 7 has failed.' in batches[2][3]
+
+    assert run_flow_command(
+        tmp_path, 'flow.py', 'run', '--run-id', failed_run_id, '--resume', '-F', '--profile', 'cpu'
+    ) == FlowRunStatus.DONE.value
+
+    resumed_run_id, = database.execute_sql(
+        'SELECT id FROM flow_runs WHERE id != ?', (failed_run_id,)
+    ).fetchone()
+    task_runs = select_task_runs(resumed_run_id)
+    assert all(status == TaskRunStatus.DONE for _, status, _ in task_runs.values())
+
+    # Results keep the order of the items regardless of the order the batches finished.
+    assert TaskOutput.loads(task_runs['square'][2]).get() == [item * item for item in range(10)]
+    assert TaskOutput.loads(task_runs['total'][2]).get() == sum(item * item for item in range(10))
+    assert [status for _, _, status, _ in select_batches(task_runs['square'][0])] \
+        == [TaskRunStatus.DONE.value] * 4
+    database.close()
+
+    # The profile of the mapped task includes the function run in the batch threads.
+    profile_path, = tmp_path.rglob(f"{task_runs['square'][0]}.prof")
+    assert 'square' in read_profile_report(profile_path, limit=50)
@@ -0,0 +1,130 @@
+import json
+import time
+import pytest
+from pathlib import Path
+
+from leantask.flow.output import (
+    ArrayTaskOutput, FileTaskOutput, JSONTaskOutput, StreamTaskOutput,
+    TaskOutput, UndefinedTaskOutput
+)
+
+
+def test_json_output_roundtrip():
+    output = JSONTaskOutput()
+    output.set({'message': 'hello', 'values': [1, 2, 3]})
+
+    restored = TaskOutput.loads(json.dumps(output.to_dict()))
+    assert isinstance(restored, JSONTaskOutput)
+    assert restored.get() == output.get()
+
+
+def test_file_output_roundtrip():
+    output = FileTaskOutput(Path('output.json'))
+
+    restored = TaskOutput.loads(json.dumps(output.to_dict()))
+    assert isinstance(restored, FileTaskOutput)
+    assert restored._output_path == Path('output.json').resolve()
+
+
+def test_undefined_output_loads():
+    assert isinstance(TaskOutput.loads(None), UndefinedTaskOutput)
+    assert isinstance(TaskOutput.loads(json.dumps({'type': 'unknown'})), UndefinedTaskOutput)
+
+
+def test_array_output_roundtrip(tmp_path: Path):
+    from array import array
+
+    output = ArrayTaskOutput(tmp_path / 'output')
+    output.set({'value': array('d', [0.5, 1.5, 2.5])})
+
+    restored = TaskOutput.loads(json.dumps(output.to_dict()))
+    assert isinstance(restored, ArrayTaskOutput)
+    assert restored.exists()
+
+    value = restored.get()['value']
+    assert value.readonly
+    assert list(value.cast('d')) == [0.5, 1.5, 2.5]
+
+
+def test_array_output_numpy_memmap(tmp_path: Path):
+    numpy = pytest.importorskip('numpy')
+
+    output = ArrayTaskOutput(tmp_path / 'output')
+    output.set(numpy.arange(10, dtype='float64'))
+
+    value = TaskOutput.loads(json.dumps(output.to_dict())).get()
+    assert isinstance(value, numpy.memmap)
+    assert not value.flags.writeable
+    assert value.sum() == 45.0
+
+
+def _generate_chunks(total: int, fail_on: int = None):
+    for i in range(total):
+        if i == fail_on:
+            raise ValueError('Fail to produce chunk.')
+        yield i
+
+
+def test_stream_output_queue():
+    output = StreamTaskOutput(buffer_size=2)
+    output.start(_generate_chunks(100))
+
+    assert list(output) == list(range(100))
+    assert output.join() is None
+    assert output.to_dict() is None
+
+    with pytest.raises(RuntimeError):
+        list(output)
+
+
+def test_stream_output_spool(tmp_path: Path):
+    output = StreamTaskOutput(spool_path=tmp_path / 'stream.pkl')
+    output.start(_generate_chunks(100))
+
+    assert list(output) == list(range(100))
+    assert list(output) == list(range(100))
+    assert output.join() is None
+
+    restored = TaskOutput.loads(json.dumps(output.to_dict()))
+    assert isinstance(restored, StreamTaskOutput)
+    assert list(restored) == list(range(100))
+
+
+def test_stream_output_error():
+
+    output = StreamTaskOutput(buffer_size=2)
+    output.start(_generate_chunks(100, fail_on=10))
+
+    with pytest.raises(RuntimeError):
+        list(output)
+
+    assert isinstance(output.join(), ValueError)
+
+
+def _generate_slow_chunks(total: int):
+    for i in range(total):
+        time.sleep(0.01)
+        yield i
+
+
+def test_stream_output_spool_finished_by_join(tmp_path: Path):
+    output = StreamTaskOutput(spool_path=tmp_path / 'stream.pkl')
+    output.start(_generate_slow_chunks(20))
+
+    assert not output.is_abandoned()
+    assert output.join() is None
+    assert output.to_dict()['count'] == 20
+    assert list(output) == list(range(20))
+
+
+def test_stream_output_queue_abandoned():
+    output = StreamTaskOutput(buffer_size=2)
+    output.start(_generate_chunks(100))
+
+    chunks = iter(output)
+    assert [next(chunks) for _ in range(3)] == [0, 1, 2]
+    assert output.is_abandoned()
+
+    output.close()
+    assert output.join(timeout=5) is None
+    assert output.to_dict() is None
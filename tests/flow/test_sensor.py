@@ -0,0 +1,47 @@
+import os
+from datetime import datetime, timedelta
+
+from leantask.flow.extensions.sensor import is_sensor_due, is_sensor_timed_out, match_sensor_files
+
+
+def test_match_sensor_files(tmp_path):
+    params = {'sensor': 'file', 'path': str(tmp_path / 'sales_*.csv')}
+    assert match_sensor_files(params, datetime.now()) == []
+
+    (tmp_path / 'sales_1.csv').touch()
+    (tmp_path / 'other.csv').touch()
+    assert match_sensor_files(params, datetime.now()) == [str(tmp_path / 'sales_1.csv')]
+
+
+def test_match_sensor_files_newer_than(tmp_path):
+    file_path = tmp_path / 'sales.csv'
+    file_path.touch()
+    old_timestamp = (datetime.now() - timedelta(days=2)).timestamp()
+    os.utime(file_path, (old_timestamp, old_timestamp))
+
+    params = {'sensor': 'file', 'path': str(file_path), 'newer_than': 24 * 60 * 60}
+    assert match_sensor_files(params, datetime.now()) == []
+
+    params['newer_than'] = (datetime.now() - timedelta(days=3)).isoformat()
+    assert match_sensor_files(params, datetime.now()) == [str(file_path)]
+
+
+def test_match_sensor_files_cache(tmp_path):
+    params = {'sensor': 'file', 'path': str(tmp_path / '*.csv')}
+    cache = dict()
+    assert match_sensor_files(params, datetime.now(), cache) == []
+
+    (tmp_path / 'sales.csv').touch()
+    assert match_sensor_files(params, datetime.now(), cache) == []
+
+
+def test_is_sensor_due(tmp_path):
+    params = {'sensor': 'file', 'path': str(tmp_path / 'sales.csv'), 'timeout': 60}
+    now = datetime.now()
+    assert not is_sensor_due(params, now, waiting_since=now)
+    assert is_sensor_timed_out(params, now - timedelta(seconds=61))
+    assert is_sensor_due(params, now, waiting_since=now - timedelta(seconds=61))
+
+    (tmp_path / 'sales.csv').touch()
+    assert is_sensor_due(params, now, waiting_since=now)
+    assert not is_sensor_due({'path': params['path']}, now, waiting_since=now)
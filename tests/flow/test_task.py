@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from tests.flow.test_flow_run import create_flow_project
+
+
+def run_flow_script(project_dir, source: str, env: dict = None) -> dict:
+    '''Run a script importing the project flow in-process, it prints its checks as JSON.'''
+    (project_dir / 'script.py').write_text(textwrap.dedent(source))
+    process = subprocess.run(
+        [sys.executable, 'script.py'],
+        cwd=project_dir,
+        env={**os.environ, 'PYTHONPATH': os.getcwd(), **(env or dict())},
+        capture_output=True,
+        text=True
+    )
+    assert process.returncode == 0, process.stderr
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+FLOW_SOURCE = '''
+    from leantask import Flow
+    from leantask.flow.extensions.python_task import PythonTask
+    from leantask.flow.extensions.sensor import FileSensor
+
+    class TaggedTask(PythonTask):
+        pass
+
+    class SlottedTaggedTask(PythonTask):
+        __slots__ = ('tag',)
+
+    def first():
+        return 1
+
+    def second():
+        return 2
+
+    def third():
+        return 3
+
+    with Flow('slots') as flow:
+        tagged_task = TaggedTask(second)
+        tagged_task.tag = 'extension'
+        slotted_task = SlottedTaggedTask(third)
+        slotted_task.tag = 'slotted'
+        PythonTask(first) >> tagged_task >> slotted_task
+        FileSensor('wait_for_file', path='flow.py')
+'''
+
+
+def test_run_history_keeps_newest_runs(tmp_path):
+    create_flow_project(tmp_path, {'flow.py': FLOW_SOURCE})
+    result = run_flow_script(tmp_path, '''
+        import json
+        from flow import flow
+
+        flow_runs = [flow.run() for _ in range(5)]
+        task = flow.get_task('first')
+        print(json.dumps({
+            'flow_run_ids': [flow_run.id for flow_run in flow_runs],
+            'kept_flow_run_ids': [flow_run.id for flow_run in flow.runs],
+            'kept_task_run_flow_run_ids': [task_run.flow_run.id for task_run in task.runs],
+        }))
+    ''', env={'LEANTASK_RUN_HISTORY_SIZE': '3'})
+
+    assert result['kept_flow_run_ids'] == result['flow_run_ids'][-3:]
+    assert result['kept_task_run_flow_run_ids'] == result['flow_run_ids'][-3:]
+
+
+def test_slotted_objects_pickle_and_repr(tmp_path):
+    create_flow_project(tmp_path, {'flow.py': FLOW_SOURCE})
+    result = run_flow_script(tmp_path, '''
+        import json
+        import pickle
+        from flow import flow
+
+        flow_run = flow.run()
+        task = flow.get_task('first')
+        task_run = task.runs[-1]
+
+        checks = dict()
+        for obj in (flow, task, flow.get_task('wait_for_file'), flow_run, task_run):
+            copied_obj = pickle.loads(pickle.dumps(obj))
+            checks[type(obj).__name__] = [repr(obj), repr(copied_obj), copied_obj.id == obj.id]
+
+        tagged_task = pickle.loads(pickle.dumps(flow.get_task('second')))
+        slotted_task = pickle.loads(pickle.dumps(flow.get_task('third')))
+        try:
+            slotted_task.untagged = True
+            has_dict = True
+        except AttributeError:
+            has_dict = False
+
+        print(json.dumps({
+            'checks': checks,
+            'status': flow_run.status.name,
+            'tags': [tagged_task.tag, slotted_task.tag],
+            'slotted_has_dict': has_dict,
+        }))
+    ''')
+
+    assert result['status'] == 'DONE'
+    assert set(result['checks']) == {'Flow', 'PythonTask', 'FileSensor', 'FlowRun', 'TaskRun'}
+    for name, (obj_repr, copied_obj_repr, is_same_id) in result['checks'].items():
+        assert obj_repr.startswith(f'{name}(')
+        assert copied_obj_repr == obj_repr
+        assert is_same_id
+
+    # Extensions without slots keep a dict, slotted extensions are limited to their slots.
+    assert result['tags'] == ['extension', 'slotted']
+    assert not result['slotted_has_dict']
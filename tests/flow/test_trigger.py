@@ -0,0 +1,16 @@
+import pytest
+
+from leantask.flow.trigger import parse_trigger, validate_triggers
+
+
+def test_parse_trigger():
+    assert parse_trigger('upstream.v2') == ('upstream.v2', None)
+    assert parse_trigger('upstream:export_file') == ('upstream', 'export_file')
+
+
+def test_validate_triggers():
+    assert validate_triggers(None) == []
+    assert validate_triggers('upstream') == ['upstream']
+
+    with pytest.raises(ValueError):
+        validate_triggers(['upstream:'])
@@ -0,0 +1,27 @@
+from peewee import SqliteDatabase
+
+from leantask.context import GlobalContext
+from leantask.database import FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskModel
+from leantask.database.identity import identity_map
+from leantask.discover import index_all_flows
+from leantask.enum import FlowRunStatus
+
+MODELS = [FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, TaskModel]
+
+
+def test_index_all_flows_removes_flow_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlobalContext, 'PROJECT_DIR', tmp_path)
+    monkeypatch.setattr(GlobalContext, 'FLOWS_DIR', tmp_path)
+    monkeypatch.setattr(GlobalContext, 'DISCOVER', True)
+
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    with database.bind_ctx(MODELS):
+        database.create_tables(MODELS)
+        flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+        FlowRunModel.create(flow=flow_model.id, status=FlowRunStatus.DONE)
+        assert FlowStatsModel.select().count() == 1
+
+        assert index_all_flows() == dict()
+        assert FlowModel.select().count() == 0
+        assert FlowStatsModel.select().count() == 0
+    identity_map.invalidate()
@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from pathlib import Path
+
+from leantask import logging as logging_module
+from leantask.logging import BufferedFileHandler, get_logger, release_logger
+
+
+def test_buffered_file_handler_opens_lazily(tmp_path: Path):
+    file_path = tmp_path / 'log' / 'task.log'
+    handler = BufferedFileHandler(file_path, flush_interval=60, buffer_size=1024)
+    assert not file_path.exists()
+
+    logger = logging.Logger('test')
+    logger.addHandler(handler)
+    logger.info('first')
+    assert not file_path.exists()
+
+    logger.error('second')
+    assert file_path.read_text() == 'first\nsecond\n'
+    handler.close()
+
+
+def test_logger_flushes_error_synchronously(tmp_path: Path):
+    file_path = tmp_path / 'task.log'
+    logger = get_logger('test', file_path)
+    assert not file_path.exists()
+
+    logger.info('info message')
+    logger.error('error message')
+    log_text = file_path.read_text()
+    assert 'info message' in log_text
+    assert 'error message' in log_text
+
+
+def test_logger_writes_error_when_listener_is_stuck(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(logging_module, 'ERROR_WRITE_TIMEOUT', 0.1)
+
+    stuck_logger = get_logger('test', tmp_path / 'stuck.log')
+    stuck_target = next(
+        handler.target for handler in stuck_logger.handlers if hasattr(handler, 'target')
+    )
+    is_stuck = threading.Event()
+    is_released = threading.Event()
+
+    def handle_stuck(record):
+        is_stuck.set()
+        is_released.wait(10)
+        return BufferedFileHandler.handle(stuck_target, record)
+
+    monkeypatch.setattr(stuck_target, 'handle', handle_stuck)
+    stuck_logger.info('stuck message')
+    assert is_stuck.wait(10)
+
+    file_path = tmp_path / 'task.log'
+    logger = get_logger('test', file_path)
+    start_time = time.monotonic()
+    logger.error('error message')
+    assert time.monotonic() - start_time < 5
+    assert file_path.read_text().count('error message') == 1
+
+    # The listener skips the record which has been written by the caller thread.
+    is_released.set()
+    logger.error('next error message')
+    log_lines = file_path.read_text().splitlines()
+    assert len(log_lines) == 2
+    assert log_lines[1].endswith('next error message')
+
+    release_logger(logger)
+    release_logger(stuck_logger)
+
+
+def test_logger_registry_and_open_files_cap(tmp_path: Path, monkeypatch):
+    from leantask.context import GlobalContext
+    from leantask.logging import _open_file_handlers
+
+    monkeypatch.setattr(GlobalContext, 'LOG_MAX_OPEN_FILES', 2)
+
+    loggers = [get_logger('test', tmp_path / f'{i}.log') for i in range(4)]
+    assert get_logger('test', tmp_path / '0.log') is loggers[0]
+
+    for i, logger in enumerate(loggers):
+        logger.error(f'message {i}')
+    assert len(_open_file_handlers) <= 2
+
+    loggers[0].error('reopened')
+    assert (tmp_path / '0.log').read_text().count('\n') == 2
+
+    for logger in loggers:
+        release_logger(logger)
+    assert get_logger('test', tmp_path / '0.log') is not loggers[0]
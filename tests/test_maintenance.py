@@ -0,0 +1,184 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from peewee import SqliteDatabase
+
+from leantask.context import GlobalContext
+from leantask.database import (
+    FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel,
+    TaskModel, TaskRunModel, TaskRunBatchModel,
+    FlowLogModel, FlowRunLogModel, TaskLogModel, TaskRunLogModel
+)
+from leantask.database.archive import attach_archives, get_archive_name
+from leantask.database.common import open_db_connection
+from leantask.enum import FlowRunStatus, TaskRunStatus
+from leantask.maintenance import (
+    ORPHAN_GRACE_SECONDS, archive_flow_runs, prune_flow_runs, remove_orphaned_files, run_maintenance,
+    vacuum_database
+)
+
+MODELS = [
+    FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel,
+    TaskModel, TaskRunModel, TaskRunBatchModel
+]
+LOG_MODELS = [FlowLogModel, FlowRunLogModel, TaskLogModel, TaskRunLogModel]
+
+
+def create_flow_runs(statuses, days_ago):
+    flow_model = FlowModel.create(name='flow', path='flow.py', checksum='0' * 32)
+    task_model = TaskModel.create(flow=flow_model.id, name='task')
+    FlowLogModel.create(ref_id=flow_model.id, name='flow', path='flow.py', checksum='0' * 32)
+    TaskLogModel.create(ref_id=task_model.id, ref_flow=flow_model.id, name='task')
+
+    flow_run_models = []
+    for status, days in zip(statuses, days_ago):
+        run_datetime = datetime.now() - timedelta(days=days)
+        flow_run_model = FlowRunModel.create(
+            flow=flow_model.id,
+            status=status,
+            created_datetime=run_datetime,
+            modified_datetime=run_datetime
+        )
+        task_run_model = TaskRunModel.create(
+            flow_run=flow_run_model.id,
+            task=task_model.id,
+            attempt=1,
+            status=TaskRunStatus.DONE
+        )
+        FlowRunLogModel.create(ref_id=flow_run_model.id, ref_flow=flow_model.id, status=status)
+        TaskRunLogModel.create(
+            ref_id=task_run_model.id,
+            ref_flow_run=flow_run_model.id,
+            ref_task=task_model.id,
+            attempt=1,
+            status=TaskRunStatus.DONE
+        )
+        flow_run_models.append(flow_run_model)
+
+    return flow_model, flow_run_models
+
+
+def test_prune_flow_runs(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx(MODELS), log_database.bind_ctx(LOG_MODELS):
+        database.create_tables(MODELS)
+        log_database.create_tables(LOG_MODELS)
+
+        flow_model, flow_run_models = create_flow_runs(
+            statuses=[
+                FlowRunStatus.DONE, FlowRunStatus.FAILED, FlowRunStatus.DONE,
+                FlowRunStatus.RUNNING, FlowRunStatus.DONE
+            ],
+            days_ago=[0, 2, 3, 40, 50]
+        )
+
+        assert prune_flow_runs() == dict()
+        assert FlowStatsModel.get_by_id(flow_model.id).finished_runs == 4
+        assert prune_flow_runs(keep_runs=2, batch_size=1) == {'flow': 2}
+        flow_stats_model = FlowStatsModel.get_by_id(flow_model.id)
+        assert flow_stats_model.finished_runs == 2
+        assert flow_stats_model.success_rate == 0.5
+        assert [model.id for model in FlowRunModel.select().order_by(FlowRunModel.created_datetime.desc())] \
+            == [flow_run_models[0].id, flow_run_models[1].id, flow_run_models[3].id]
+        assert TaskRunModel.select().count() == 3
+        assert FlowRunLogModel.select().count() == 3
+        assert TaskRunLogModel.select().count() == 3
+
+        # Active runs are kept regardless of their age.
+        assert prune_flow_runs(keep_days=1) == {'flow': 1}
+        assert [model.id for model in FlowRunModel.select().order_by(FlowRunModel.created_datetime.desc())] \
+            == [flow_run_models[0].id, flow_run_models[3].id]
+
+
+def test_remove_orphaned_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlobalContext, 'PROJECT_DIR', tmp_path)
+
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx(MODELS), log_database.bind_ctx(LOG_MODELS):
+        database.create_tables(MODELS)
+        log_database.create_tables(LOG_MODELS)
+
+        flow_model, flow_run_models = create_flow_runs(
+            statuses=[FlowRunStatus.DONE, FlowRunStatus.DONE],
+            days_ago=[1, 2]
+        )
+        task_run_models = list(TaskRunModel.select())
+
+        old_time = time.time() - ORPHAN_GRACE_SECONDS - 1
+        paths = []
+        for flow_run_model in flow_run_models:
+            paths.append(GlobalContext.get_flow_run_log_file_path(flow_model.id, flow_run_model.id))
+            output_dir = GlobalContext.get_task_run_output_dir(flow_model.id, flow_run_model.id, 'task')
+            output_dir.mkdir(parents=True)
+            paths.append(output_dir.parent)
+        for task_run_model in task_run_models:
+            log_file_path = GlobalContext.get_task_run_log_file_path(flow_model.id, 'task', task_run_model.id)
+            profile_path = log_file_path.with_suffix('.prof')
+            profile_path.touch()
+            paths += [log_file_path, profile_path]
+        for path in paths:
+            os.utime(path, (old_time, old_time))
+
+        assert remove_orphaned_files() == 0
+
+        prune_flow_runs(keep_runs=1)
+        assert remove_orphaned_files() == 4
+        assert [path.exists() for path in paths] == [True, True, False, False, True, True, False, False]
+
+        summary = run_maintenance(keep_runs=0)
+        assert summary == {'deleted_runs': 1, 'archived_runs': 0, 'removed_files': 4}
+        assert not (GlobalContext.log_dir() / 'flow_runs' / flow_model.id).exists()
+
+
+def test_new_database_uses_incremental_vacuum(tmp_path):
+    database = open_db_connection(tmp_path / 'leantask.db')
+    assert database.execute_sql('PRAGMA auto_vacuum').fetchone()[0] == 2
+    database.close()
+
+
+def test_archive_flow_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlobalContext, 'PROJECT_DIR', tmp_path)
+
+    database = open_db_connection(tmp_path / 'leantask.db')
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'))
+    with database.bind_ctx(MODELS), log_database.bind_ctx(LOG_MODELS):
+        database.create_tables(MODELS)
+        log_database.create_tables(LOG_MODELS)
+
+        flow_model, flow_run_models = create_flow_runs(
+            statuses=[FlowRunStatus.DONE, FlowRunStatus.FAILED, FlowRunStatus.RUNNING, FlowRunStatus.DONE],
+            days_ago=[0, 40, 50, 80]
+        )
+
+        archived_runs = archive_flow_runs(archive_days=30, batch_size=1)
+        archive_names = {get_archive_name(model.created_datetime) for model in flow_run_models[1::2]}
+        assert set(archived_runs) == archive_names
+        assert sum(archived_runs.values()) == 2
+        assert [model.id for model in FlowRunModel.select().order_by(FlowRunModel.created_datetime.desc())] \
+            == [flow_run_models[0].id, flow_run_models[2].id]
+        assert TaskRunModel.select().count() == 2
+        assert FlowRunLogModel.select().count() == 4
+        assert FlowStatsModel.get_by_id(flow_model.id).finished_runs == 1
+        assert archive_flow_runs(archive_days=30) == dict()
+
+        assert sorted(attach_archives()) == sorted(archive_names)
+        flow_run_ids = [model.id for model in FlowRunModel.select().order_by(FlowRunModel.created_datetime.desc())]
+        assert flow_run_ids == [model.id for model in flow_run_models]
+        assert FlowRunModel.get_by_id(flow_run_models[3].id).task_runs.count() == 1
+        database.close()
+
+
+def test_vacuum_database(tmp_path):
+    database = SqliteDatabase(str(tmp_path / 'leantask.db'))
+    database.execute_sql('CREATE TABLE rows (value TEXT)')
+
+    # A full VACUUM is only run on request, e.g. by the maintenance command.
+    vacuum_database(database)
+    assert database.execute_sql('PRAGMA auto_vacuum').fetchone()[0] == 0
+    vacuum_database(database, full=True)
+    assert database.execute_sql('PRAGMA auto_vacuum').fetchone()[0] == 2
+    vacuum_database(database, pages=1)
+    database.close()
@@ -0,0 +1,69 @@
+import json
+import logging
+from concurrent import futures
+
+from peewee import SqliteDatabase
+
+from leantask import scheduler
+from leantask.database import (
+    FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel, FlowRunLogModel
+)
+from leantask.database.common import open_db_connection
+from leantask.database.identity import identity_map
+from leantask.enum import FlowRunStatus
+
+MODELS = [FlowModel, FlowScheduleModel, FlowRunModel, FlowStatsModel]
+
+
+def test_create_triggered_flow_run_models(tmp_path, monkeypatch):
+    database = open_db_connection(tmp_path / 'leantask.db')
+    log_database = SqliteDatabase(str(tmp_path / 'leantask_log.db'), check_same_thread=False)
+    monkeypatch.setattr(scheduler, 'database', database)
+    monkeypatch.setattr(scheduler, 'logger', logging.getLogger(__name__))
+    identity_map.invalidate()
+    with database.bind_ctx(MODELS), log_database.bind_ctx([FlowRunLogModel]):
+        database.create_tables(MODELS)
+        log_database.create_tables([FlowRunLogModel])
+
+        upstream_flow_model = FlowModel.create(name='upstream', path='upstream.py', checksum='0' * 32)
+        flow_model = FlowModel.create(
+            name='downstream',
+            path='downstream.py',
+            checksum='0' * 32,
+            triggers=json.dumps(['upstream']),
+            active=True
+        )
+        upstream_run_models = [
+            FlowRunModel.create(flow=upstream_flow_model.id, status=FlowRunStatus.DONE)
+            for _ in range(4)
+        ]
+
+        assert scheduler.create_triggered_flow_run_models(upstream_run_models[0], FlowRunStatus.FAILED) == []
+
+        # Upstream runs finishing at once must not trigger more than one pending run.
+        with futures.ThreadPoolExecutor(len(upstream_run_models)) as executor:
+            triggered_flow_run_models = sum(executor.map(
+                lambda model: scheduler.create_triggered_flow_run_models(model, FlowRunStatus.DONE),
+                upstream_run_models
+            ), [])
+
+        assert len(triggered_flow_run_models) == 1
+        triggered_flow_run_model = triggered_flow_run_models[0]
+        flow_run_models = list(FlowRunModel.select().where(FlowRunModel.flow == flow_model.id))
+        assert [model.id for model in flow_run_models] == [triggered_flow_run_model.id]
+        assert flow_run_models[0].status == FlowRunStatus.SCHEDULED
+        assert json.loads(flow_run_models[0].params)['trigger'] == 'upstream'
+        assert FlowRunLogModel.select().count() == 1
+        assert scheduler.create_triggered_flow_run_models(upstream_run_models[0], FlowRunStatus.DONE) == []
+
+        # The triggered run is picked up by the run routine if the scheduler stopped before
+        # submitting it, and it's only claimed once.
+        unfinished_flow_run_models = scheduler.get_unfinished_flow_run_models()
+        assert [model.id for model in unfinished_flow_run_models] == [triggered_flow_run_model.id]
+        assert scheduler.claim_flow_run(unfinished_flow_run_models[0])
+        assert not scheduler.claim_flow_run(triggered_flow_run_model)
+        assert FlowRunModel.get_by_id(triggered_flow_run_model.id).status == FlowRunStatus.PENDING
+        assert scheduler.get_unfinished_flow_run_models() == []
+        assert scheduler.create_triggered_flow_run_models(upstream_run_models[0], FlowRunStatus.DONE) == []
+    database.close()
+    identity_map.invalidate()
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from leantask.utils.profile import get_profile_path, profile_run, profile_thread, read_profile_report
+
+
+def _allocate():
+    return [str(i) for i in range(10_000)]
+
+
+def test_profile_run_cpu(tmp_path):
+    profile_path = get_profile_path(tmp_path / 'run.log', 'cpu')
+    assert profile_path.name == 'run.prof'
+
+    with profile_run('cpu', profile_path):
+        _allocate()
+
+    assert '_allocate' in read_profile_report(profile_path, limit=10)
+
+
+def _allocate_in_thread():
+    return _allocate()
+
+
+def test_profile_run_cpu_threads(tmp_path):
+    profile_path = get_profile_path(tmp_path / 'run.log', 'cpu')
+
+    def run_thread(thread_profilers):
+        with profile_thread(thread_profilers):
+            _allocate_in_thread()
+
+    with profile_run('cpu', profile_path) as thread_profilers:
+        threads = [threading.Thread(target=run_thread, args=(thread_profilers,)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert '_allocate_in_thread' in read_profile_report(profile_path, limit=50)
+
+
+def test_profile_run_mem(tmp_path):
+    profile_path = get_profile_path(tmp_path / 'run.log', 'mem')
+    assert profile_path.name == 'run.mem.txt'
+
+    with profile_run('mem', profile_path):
+        values = _allocate()
+
+    report = read_profile_report(profile_path, limit=5)
+    assert report.startswith('Peak traced memory')
+    assert 'test_profile.py' in report
+    assert len(values) == 10_000
+
+
+def test_profile_run_invalid(tmp_path):
+    with pytest.raises(ValueError):
+        with profile_run('disk', tmp_path / 'run.log'):
+            pass
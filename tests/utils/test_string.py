@@ -0,0 +1,46 @@
+import uuid
+
+from leantask.utils.string import align_prefixes, generate_uuid7, shortest_unique_prefixes
+
+
+def test_generate_uuid7_is_time_ordered():
+    ids = [generate_uuid7() for _ in range(1000)]
+    assert all(uuid.UUID(value).version == 7 for value in ids)
+    assert len(set(ids)) == len(ids)
+
+    prefixes = [value[:13] for value in ids]
+    assert prefixes == sorted(prefixes)
+
+
+def test_shortest_unique_prefixes():
+    values = [
+        '0190a1b2-c3d4-7e5f-8a6b-1c2d3e4f5a6b',
+        '0190a1b2-c3d4-7f00-8a6b-1c2d3e4f5a6b',
+        '0190a1b2-9999-7000-8000-000000000000',
+        'ffffffff-0000-4000-8000-000000000000'
+    ]
+    prefixes = shortest_unique_prefixes(values)
+    assert prefixes == {
+        values[0]: '0190a1b2-c3d4-7e',
+        values[1]: '0190a1b2-c3d4-7f',
+        values[2]: '0190a1b2-9',
+        values[3]: 'ffffffff'
+    }
+
+
+def test_align_prefixes():
+    flow_run_id = '0190a1b2-c3d4-7e5f-8a6b-1c2d3e4f5a6b'
+    task_run_ids = [
+        '0190a1b3-0000-7e5f-8a6b-1c2d3e4f5a6b',
+        '0190a1b3-0000-7f00-8a6b-1c2d3e4f5a6b'
+    ]
+    prefixes = align_prefixes({
+        flow_run_id: '0190a1b2',
+        **shortest_unique_prefixes(task_run_ids)
+    })
+    assert prefixes == {
+        flow_run_id: '0190a1b2-c3d4-7e',
+        task_run_ids[0]: '0190a1b3-0000-7e',
+        task_run_ids[1]: '0190a1b3-0000-7f'
+    }
+    assert align_prefixes({flow_run_id: '0190a1b2'}, length=9) == {flow_run_id: '0190a1b2-c'}
@@ -0,0 +1,66 @@
+import pytest
+
+from leantask.utils.tree import CycleError, DAGIndex, sort_tree_levels, sort_tree_nodes
+
+
+class Node:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.children = []
+
+
+def _diamond():
+    a, b, c, d = Node('a'), Node('b'), Node('c'), Node('d')
+    a.children = [b, c]
+    b.children = [d]
+    c.children = [d]
+    return a, b, c, d
+
+
+def test_dag_index_descendants_are_deduplicated():
+    a, b, c, d = _diamond()
+    index = DAGIndex([d, c, b, a], 'children', key_attr='name')
+
+    descendants = list(index.iter_descendants(a))
+    assert len(descendants) == 3
+    assert set(descendants) == {b, c, d}
+    assert descendants[-1] is d
+    assert list(index.iter_descendants(d)) == []
+
+
+def test_dag_index_keys():
+    a, b, c, d = _diamond()
+    index = DAGIndex([a, b, c, d], 'children', key_attr='name')
+
+    assert index.get('c') is c
+    assert index.get('e') is None
+    assert index.nodes[0] is a
+
+
+def test_sort_tree_levels_is_stable():
+    a, b, c, d = _diamond()
+    key = lambda node: node.name
+
+    assert sort_tree_levels([d, c, b, a], 'children', key=key) == [[a], [b, c], [d]]
+    assert sort_tree_nodes({a, b, c, d}, 'children', key=key) == [a, b, c, d]
+
+
+def test_sort_tree_nodes_deep_chain():
+    nodes = [Node(str(i)) for i in range(10_000)]
+    for node, child_node in zip(nodes, nodes[1:]):
+        node.children = [child_node]
+
+    assert sort_tree_nodes(nodes[::-1], 'children') == nodes
+
+
+def test_sort_tree_nodes_cycle():
+    a, b, c, d = _diamond()
+    d.children = [a]
+
+    with pytest.raises(CycleError) as exc_info:
+        sort_tree_nodes([a, b, c, d], 'children', key=lambda node: node.name)
+
+    path = exc_info.value.path
+    assert path[0] is path[-1]
+    assert d in path and a in path
+    assert ' -> ' in str(exc_info.value)